@@ -7,6 +7,7 @@ import os
 import sys
 from logging.config import fileConfig
 
+from alembic import context
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -17,7 +18,9 @@ from app.config import get_settings
 from app.models import Base
 
 # this is the Alembic Config object
-config = fileConfig(os.path.join(os.path.dirname(__file__), '..', 'alembic.ini'))
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
 
 # set the sqlalchemy.url from .env
 settings = get_settings()
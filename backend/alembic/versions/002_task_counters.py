@@ -0,0 +1,48 @@
+"""Maintained task counters per user, project and status
+
+Revision ID: 002_task_counters
+Revises: 001_initial
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002_task_counters'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'project_id', 'status'),
+    )
+
+    # Backfill every rollup level in one pass; project 0 / status '*' mean "all".
+    op.execute(
+        """
+        INSERT INTO task_counters (user_id, project_id, status, count)
+        SELECT user_id,
+               COALESCE(project_id, 0),
+               COALESCE(lower(status::text), '*'),
+               count(*)
+        FROM tasks
+        GROUP BY GROUPING SETS (
+            (user_id, project_id, status),
+            (user_id, project_id),
+            (user_id, status),
+            (user_id)
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_counters')
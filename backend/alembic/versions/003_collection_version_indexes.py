@@ -0,0 +1,23 @@
+"""Indexes backing collection ETags
+
+Revision ID: 003_collection_version_indexes
+Revises: 002_task_counters
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '003_collection_version_indexes'
+down_revision = '002_task_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_user_id_updated_at', 'tasks', ['user_id', 'updated_at'], unique=False)
+    op.create_index(op.f('ix_projects_user_id'), 'projects', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_projects_user_id'), table_name='projects')
+    op.drop_index('ix_tasks_user_id_updated_at', table_name='tasks')
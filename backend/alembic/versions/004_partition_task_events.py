@@ -0,0 +1,121 @@
+"""Partition task_events by month, add history index and SNAPSHOT events
+
+Revision ID: 004_partition_task_events
+Revises: 003_collection_version_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '004_partition_task_events'
+down_revision = '003_collection_version_indexes'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _create_partition(start: date) -> None:
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS task_events_p{start:%Y%m} PARTITION OF task_events "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_next_month(start).isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Match the label convention already used by the enum (member names vs values)
+    labels = bind.execute(sa.text(
+        "SELECT enumlabel FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid WHERE t.typname = 'taskeventtype'"
+    )).scalars().all()
+    snapshot = 'SNAPSHOT' if 'CREATED' in labels else 'snapshot'
+    op.execute(f"ALTER TYPE taskeventtype ADD VALUE IF NOT EXISTS '{snapshot}'")
+
+    op.rename_table('task_events', 'task_events_legacy')
+    op.execute("ALTER SEQUENCE task_events_id_seq RENAME TO task_events_legacy_id_seq")
+    op.execute("ALTER INDEX task_events_pkey RENAME TO task_events_legacy_pkey")
+    op.drop_index('ix_task_events_id', table_name='task_events_legacy')
+
+    # The partition key must be part of the primary key
+    op.execute(
+        """
+        CREATE TABLE task_events (
+            id integer GENERATED BY DEFAULT AS IDENTITY,
+            task_id integer NOT NULL REFERENCES tasks (id),
+            event_type taskeventtype NOT NULL,
+            payload jsonb,
+            created_at timestamp without time zone NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    # Rows outside every monthly partition (clock skew, missed maintenance) land here
+    op.execute("CREATE TABLE task_events_default PARTITION OF task_events DEFAULT")
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM task_events_legacy")).scalar()
+    month = _month_start(oldest.date() if oldest else date.today())
+    last = _month_start(date.today())
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        _create_partition(month)
+        month = _next_month(month)
+
+    op.execute(
+        """
+        INSERT INTO task_events (id, task_id, event_type, payload, created_at)
+        SELECT id, task_id, event_type, payload, created_at FROM task_events_legacy
+        """
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('task_events', 'id'), "
+        "COALESCE((SELECT max(id) FROM task_events), 0) + 1, false)"
+    )
+    op.drop_table('task_events_legacy')
+
+    # History reads: one task's events in (created_at, id) order
+    op.create_index(
+        'ix_task_events_task_id_created_at_id', 'task_events', ['task_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.rename_table('task_events', 'task_events_partitioned')
+    op.execute("ALTER SEQUENCE task_events_id_seq RENAME TO task_events_partitioned_id_seq")
+    op.execute("ALTER INDEX task_events_pkey RENAME TO task_events_partitioned_pkey")
+    op.create_table(
+        'task_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', postgresql.ENUM(name='taskeventtype', create_type=False), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_events_id'), 'task_events', ['id'], unique=False)
+    # SNAPSHOT rows are kept; Postgres cannot drop the enum label anyway.
+    op.execute(
+        """
+        INSERT INTO task_events (id, task_id, event_type, payload, created_at)
+        SELECT id, task_id, event_type, payload, created_at FROM task_events_partitioned
+        """
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('task_events', 'id'), "
+        "COALESCE((SELECT max(id) FROM task_events), 0) + 1, false)"
+    )
+    op.drop_table('task_events_partitioned')
@@ -0,0 +1,23 @@
+"""Version column on tasks for optimistic concurrency
+
+Revision ID: 005_task_version
+Revises: 004_partition_task_events
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '005_task_version'
+down_revision = '004_partition_task_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Constant default: no table rewrite on Postgres 11+
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('tasks', 'version')
@@ -0,0 +1,46 @@
+"""Materialized per-user agenda
+
+Revision ID: 007_agenda_entries
+Revises: 006_jobs
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '007_agenda_entries'
+down_revision = '006_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'agenda_entries',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('next_rollover_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('task_id'),
+    )
+    op.create_index(op.f('ix_agenda_entries_next_rollover_at'), 'agenda_entries', ['next_rollover_at'], unique=False)
+    op.create_index('ix_agenda_entries_user_id_due_at', 'agenda_entries', ['user_id', 'due_at'], unique=False)
+
+    # Backfill open tasks with a due date. Scores are computed in Python, so rows
+    # start unscored and due for rollover; the first agenda_rollover job scores them.
+    op.execute(
+        """
+        INSERT INTO agenda_entries (task_id, user_id, due_at, score, next_rollover_at)
+        SELECT id, user_id, due_at, 0, now() AT TIME ZONE 'UTC' FROM tasks
+        WHERE due_at IS NOT NULL AND status::text NOT IN ('DONE', 'done')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_agenda_entries_user_id_due_at', table_name='agenda_entries')
+    op.drop_index(op.f('ix_agenda_entries_next_rollover_at'), table_name='agenda_entries')
+    op.drop_table('agenda_entries')
@@ -0,0 +1,24 @@
+"""Shard placement in the users directory
+
+Revision ID: 009_user_shards
+Revises: 008_revoked_tokens
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009_user_shards'
+down_revision = '008_revoked_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('shard', sa.String(), nullable=True))
+    op.add_column('users', sa.Column('shard_moving', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'shard_moving')
+    op.drop_column('users', 'shard')
@@ -0,0 +1,30 @@
+"""Agenda entries indexed in response order
+
+Revision ID: 010_agenda_score_index
+Revises: 009_user_shards
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '010_agenda_score_index'
+down_revision = '009_user_shards'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /agenda orders by score and stops at LIMIT instead of reading every overdue entry
+    op.create_index(
+        'ix_agenda_entries_user_id_score',
+        'agenda_entries',
+        ['user_id', sa.text('score DESC'), 'due_at', 'task_id'],
+        unique=False,
+    )
+    op.drop_index('ix_agenda_entries_user_id_due_at', table_name='agenda_entries')
+
+
+def downgrade() -> None:
+    op.create_index('ix_agenda_entries_user_id_due_at', 'agenda_entries', ['user_id', 'due_at'], unique=False)
+    op.drop_index('ix_agenda_entries_user_id_score', table_name='agenda_entries')
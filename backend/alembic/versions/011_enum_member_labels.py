@@ -0,0 +1,35 @@
+"""Enum labels as the member names SQLAlchemy's Enum columns store
+
+Revision ID: 011_enum_member_labels
+Revises: 010_agenda_score_index
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '011_enum_member_labels'
+down_revision = '010_agenda_score_index'
+branch_labels = None
+depends_on = None
+
+# 001 created these with the member values ('todo'); the models read and write
+# the member names ('TODO'), so every task insert failed on a migrated database.
+# Databases built with create_all already have the names and are left alone.
+ENUMS = ('taskstatus', 'taskeventtype')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for name in ENUMS:
+        labels = bind.execute(sa.text(
+            "SELECT enumlabel FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid WHERE t.typname = :name"
+        ), {"name": name}).scalars().all()
+        for label in labels:
+            if label != label.upper() and label.upper() not in labels:
+                op.execute(f"ALTER TYPE {name} RENAME VALUE '{label}' TO '{label.upper()}'")
+
+
+def downgrade() -> None:
+    # The lowercase labels never matched the models; nothing to restore
+    pass
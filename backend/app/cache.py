@@ -0,0 +1,32 @@
+import logging
+from typing import Optional
+
+import redis
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+
+
+def init_redis() -> Optional[redis.Redis]:
+    """Create the shared Redis client (no-op when REDIS_URL is unset)."""
+    global _client
+    settings = get_settings()
+    if _client is None and settings.redis_url:
+        _client = redis.Redis.from_url(settings.redis_url, socket_timeout=1.0, health_check_interval=30)
+        logger.info("Redis client initialized")
+    return _client
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Get the shared Redis client, or None when Redis is not configured."""
+    return _client if _client is not None else init_redis()
+
+
+def close_redis() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -11,8 +11,121 @@ class Settings(BaseSettings):
         case_sensitive=False,
     )
     
+    # App
+    app_name: str = "TaskFlow"
+    debug: bool = False
+
     # Database
-    database_url: str = "postgresql://user:password@db:5432/taskflow"
+    database_url: str = "postgresql+psycopg://taskflow:taskflow@db:5432/taskflow"
+
+    # Connection pool (per worker process)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 10.0
+    db_pool_recycle: int = 1800  # seconds; replaces per-checkout pre-ping for stale connections
+    db_pool_pre_ping: bool = False
+    # Transaction-pooling safe mode for PgBouncer: no server-side prepared statements
+    db_pgbouncer_mode: bool = False
+    db_pool_warm_connections: int = 2  # opened per worker before /readyz reports ready
+
+    # Read replicas (GET handlers and read-only service calls)
+    database_replica_urls: List[str] = Field(default_factory=list)
+    replica_selection: str = "round_robin"  # "round_robin" or "least_latency"
+    replica_max_lag_seconds: float = 5.0
+    replica_check_interval_seconds: float = 5.0
+    read_your_writes_seconds: float = 5.0  # stick a user to the primary after a write
+
+    # Sharding: more databases for per-user data, named shard1, shard2, ... The primary
+    # (DATABASE_URL) is shard "primary" as well as the users directory. Empty = unsharded.
+    database_shard_urls: List[str] = Field(default_factory=list)
+    shard_virtual_nodes: int = 64  # points per shard on the consistent hash ring
+    shard_directory_ttl_seconds: float = 5.0  # how long a process caches a user's shard
+
+    # Server (app.server production launcher)
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: int = 0  # worker processes; 0 = one per available CPU
+    shutdown_delay_seconds: float = 5.0  # report draining on /readyz before closing the listener
+    graceful_timeout_seconds: int = 30  # max wait for in-flight requests on shutdown
+
+    # Readiness (probed in the background, /readyz serves the cached result)
+    readiness_interval_seconds: float = 5.0
+    readiness_probe_timeout_seconds: float = 2.0
+    readiness_ai_interval_seconds: float = 60.0
+    readiness_max_pool_saturation: float = 0.9  # checked-out / (pool size + overflow)
+    readiness_max_loop_lag_ms: float = 250.0
+
+    # Response compression (brotli when installed and accepted, else gzip)
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Profiling: stack profile + SQL log for requests sent with "X-Profile: <admin token>"
+    # or picked by the sample rate. Off by default; no middleware or SQL hooks when disabled.
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0  # fraction of requests profiled
+    profiling_slow_ms: float = 500.0  # sampled captures kept only when at least this slow
+    profiling_interval_seconds: float = 0.001  # pyinstrument sampling interval
+    profiling_buffer_size: int = 50  # captures kept in memory per worker
+
+    # OpenTelemetry tracing (needs the opentelemetry packages; no-op otherwise)
+    tracing_enabled: bool = False
+    tracing_service_name: str = "taskflow-api"
+    tracing_exporter: str = "otlp"  # "otlp" (HTTP), "console" or "file" (JSON lines)
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "traces.jsonl"
+    tracing_sample_ratio: float = 1.0  # fraction of new traces recorded; callers' decisions are kept
+
+    # Admin endpoints (/admin/...) require "X-Admin-Token: <admin_token>"; disabled when empty
+    admin_token: str = ""
+
+    # Merge PATCHes to the same task arriving within this window into one write; 0 = off
+    task_update_coalesce_ms: float = 0.0
+    # Concurrent identical task list reads and AI prioritizations share one computation
+    singleflight_enabled: bool = True
+
+    # Task event log maintenance (python -m app.services.events)
+    event_compact_after_days: int = 30  # fold older UPDATED events into monthly snapshots; 0 = never
+    event_retention_days: int = 365  # drop events (whole partitions on Postgres) older than this; 0 = keep
+    event_partition_months_ahead: int = 3  # monthly partitions created ahead of time
+
+    # Background jobs (python -m app.worker)
+    job_worker_concurrency: int = 2  # claim loops (threads) per worker process
+    job_poll_interval_seconds: float = 1.0  # idle wait between claim attempts
+    job_max_attempts: int = 3
+    job_backoff_seconds: float = 10.0  # retry delay, doubled per failed attempt
+    job_backoff_max_seconds: float = 600.0
+    job_lease_seconds: float = 900.0  # running jobs older than this are presumed lost and requeued
+    job_retention_days: int = 7  # finished jobs are purged after this
+    job_stream_poll_seconds: float = 1.0  # status polling for GET /jobs/{id}/stream
+    # Periodic jobs enqueued by the workers, interval in seconds; 0 disables one
+    job_reconcile_counters_seconds: int = 3600
+    job_agenda_rollover_seconds: int = 300  # rescore agenda entries past a deadline bucket
+    job_events_maintenance_seconds: int = 86400
+    # Timed re-prioritization; off by default since the urgency index rescores (rule-based)
+    # a scored task when it crosses a deadline bucket
+    job_refresh_scores_seconds: int = 0
+    urgency_index_enabled: bool = True  # worker emits deadline-bucket changes as they happen
+    job_purge_seconds: int = 3600
+    # POST /ai/prioritize-saved runs as a job (202 Accepted) with ?background=true,
+    # or automatically from this many open tasks; 0 = only when asked
+    ai_background_task_threshold: int = 0
+
+    # Redis
+    redis_url: str = ""
+
+    # Rate limiting: token buckets keyed by user id (client IP when unauthenticated).
+    # Rates must be positive; turn limiting off with RATE_LIMIT_ENABLED instead.
+    rate_limit_enabled: bool = True
+    rate_limit_crud_per_minute: int = Field(300, gt=0)
+    rate_limit_crud_burst: int = Field(60, ge=1)
+    rate_limit_auth_per_minute: int = Field(20, gt=0)
+    rate_limit_auth_burst: int = Field(10, ge=1)
+    rate_limit_ai_per_minute: int = Field(20, gt=0)
+    rate_limit_ai_burst: int = Field(5, ge=1)
+    # Sliding-window quota on AI calls per user
+    ai_quota_calls: int = Field(200, ge=0)
+    ai_quota_window_seconds: int = Field(86400, gt=0)
     
     # CORS - with default fallback
     cors_origins: List[str] = Field(
@@ -23,6 +136,23 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-change-this-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    jwt_secret: str = "your-secret-key-change-this-in-production"
+    jwt_algorithm: str = "HS256"
+    jwt_expiration_hours: int = 24
+    bcrypt_rounds: int = 12  # password hashing cost (log2); tests lower it
+    jwt_claims_cache_size: int = 10000  # decoded claims of recently seen tokens, until they expire; 0 = off
+    # Revoked token ids (logout, refresh rotation): bloom filter sizing (unexpired
+    # revocations), how often each process loads revocations made elsewhere (Redis,
+    # when set, shares them at once) and how often the filter is rebuilt without expired ones
+    jwt_revocation_capacity: int = 100000
+    jwt_revocation_error_rate: float = 0.01
+    jwt_revocation_sync_seconds: float = 5.0
+    jwt_revocation_rebuild_seconds: float = 3600.0
+
+    # AI
+    openai_api_key: str = ""
+    openai_base_url: str = ""  # OpenAI-compatible endpoint override (proxies, benchmarks)
+    ai_provider: str = "openai"
     
     @field_validator('cors_origins', mode='before')
     @classmethod
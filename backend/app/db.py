@@ -0,0 +1,221 @@
+import itertools
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Pool metrics, labelled by pool name ("primary", replica/shard names, ...)
+pool_wait = Histogram(
+    "taskflow_db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+)
+pool_timeouts = Counter("taskflow_db_pool_timeouts_total", "Pool checkouts that timed out", ["pool"])
+pool_checked_out = Gauge("taskflow_db_pool_checked_out", "Connections currently checked out", ["pool"])
+pool_capacity = Gauge("taskflow_db_pool_capacity", "Pool size plus max overflow", ["pool"])
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time and timeouts."""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts.labels(self.metrics_name).inc()
+            raise
+        finally:
+            pool_wait.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+
+@lru_cache(maxsize=None)
+def _pool_class(name: str) -> type:
+    # A named subclass survives engine.dispose(), which rebuilds the pool from its class.
+    return type(f"InstrumentedQueuePool_{name}", (InstrumentedQueuePool,), {"metrics_name": name})
+
+
+def engine_options(url: str, settings: Settings, name: str = "primary") -> dict:
+    """Build create_engine() keyword arguments from pool settings."""
+    options = {"echo": settings.debug}
+    if url.startswith("sqlite"):
+        # SQLite uses its own single-connection pools; sizing options don't apply.
+        return options
+
+    options.update(
+        poolclass=_pool_class(name),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if settings.db_pgbouncer_mode:
+        # PgBouncer transaction pooling hands each transaction a different server
+        # connection, so prepared statements cannot be reused (psycopg 3 option).
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
+def build_engine(url: str, settings: Settings, name: str = "primary") -> Engine:
+    """Create an engine with the configured pool and export its pool gauges."""
+    engine = create_engine(url, **engine_options(url, settings, name))
+    if isinstance(engine.pool, QueuePool):
+        pool_checked_out.labels(name).set_function(lambda: engine.pool.checkedout())
+        pool_capacity.labels(name).set(settings.db_pool_size + settings.db_max_overflow)
+    return engine
+
+
+def warm_pool(engine: Engine, connections: int) -> None:
+    """Open up to ``connections`` pooled connections so the first requests don't pay for connect."""
+    if not isinstance(engine.pool, QueuePool) or connections <= 0:
+        return
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+# Replica lag in seconds; zero when the replica has replayed everything it received.
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+replica_reads = Counter("taskflow_db_replica_reads_total", "Read sessions served, by target", ["target"])
+
+# A replica whose last probe is older than this many check intervals is not
+# used (no HealthMonitor running in this process, or its probes are stuck)
+REPLICA_STALE_INTERVALS = 3
+
+
+class Replica:
+    """A read replica with its own pool and last probe results."""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.healthy = True
+        self.latency = 0.0  # EWMA of probe round trip, seconds
+        self.lag = 0.0
+        self.checked_at: Optional[float] = None  # monotonic time of the last probe
+
+
+class ReplicaRouter:
+    """
+    Picks a read replica for read-only sessions.
+
+    Replicas are probed for lag and latency in the background (HealthMonitor,
+    every ``replica_check_interval_seconds``); picking one only reads the cached
+    results and skips replicas that are unhealthy, lagging or not probed lately.
+    Callers that wrote recently are pinned to the primary for
+    ``read_your_writes_seconds`` so they see their own changes. Stickiness is
+    tracked per worker process.
+    """
+
+    def __init__(self, settings: Settings, urls: List[str]):
+        self.settings = settings
+        self.replicas = [
+            Replica(f"replica{i}", build_engine(url, settings, name=f"replica{i}"))
+            for i, url in enumerate(urls)
+        ]
+        self._round_robin = itertools.count()
+        self._recent_writes: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def note_write(self, key: str) -> None:
+        """Pin ``key`` to the primary for the read-your-writes window."""
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[key] = now + self.settings.read_your_writes_seconds
+            if len(self._recent_writes) > 10_000:
+                self._recent_writes = {k: t for k, t in self._recent_writes.items() if t > now}
+
+    def recently_wrote(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        expires = self._recent_writes.get(key)
+        return expires is not None and expires > time.monotonic()
+
+    def check(self, replica: Replica) -> None:
+        """Probe a replica's lag and latency and update its health."""
+        start = time.perf_counter()
+        try:
+            with replica.engine.connect() as conn:
+                lag = float(conn.execute(REPLICA_LAG_SQL).scalar() or 0)
+        except exc.SQLAlchemyError as e:
+            if replica.healthy:
+                logger.warning(f"Replica {replica.name} failed health check: {e}")
+            replica.healthy = False
+        else:
+            elapsed = time.perf_counter() - start
+            replica.latency = elapsed if not replica.latency else 0.8 * replica.latency + 0.2 * elapsed
+            replica.lag = lag
+            replica.healthy = lag <= self.settings.replica_max_lag_seconds
+            if not replica.healthy:
+                logger.warning(f"Replica {replica.name} lagging by {lag:.1f}s")
+        replica.checked_at = time.monotonic()
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            self.check(replica)
+
+    def _candidates(self) -> List[Replica]:
+        oldest = time.monotonic() - REPLICA_STALE_INTERVALS * self.settings.replica_check_interval_seconds
+        healthy = [r for r in self.replicas if r.healthy and r.checked_at is not None and r.checked_at >= oldest]
+        if not healthy:
+            return []
+        if self.settings.replica_selection == "least_latency":
+            return sorted(healthy, key=lambda r: r.latency)
+        start = next(self._round_robin) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def session(self, key: Optional[str] = None) -> Optional[Session]:
+        """Open a session on a healthy replica, or None to read from the primary."""
+        if not self.enabled or self.recently_wrote(key):
+            replica_reads.labels("primary").inc()
+            return None
+
+        for replica in self._candidates():
+            db = replica.session_factory()
+            try:
+                db.connection()  # check out now so a dead replica falls through
+            except exc.SQLAlchemyError as e:
+                db.close()
+                replica.healthy = False
+                logger.warning(f"Replica {replica.name} unavailable, trying next: {e}")
+                continue
+            db.info["replica"] = replica.name
+            replica_reads.labels(replica.name).inc()
+            return db
+
+        replica_reads.labels("primary").inc()
+        return None
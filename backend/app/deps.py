@@ -1,35 +1,106 @@
+import hmac
+import math
+import uuid
+from functools import lru_cache
 from typing import Generator, Optional
 from datetime import datetime, timedelta
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy import create_engine
+from jose import JWTError
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.config import get_settings
+from app.db import ReplicaRouter, build_engine
 from app.models import Base, User
+from app.sharding import ShardMoving, ShardRouter
+from app.tokens import RevocationList, verifier
 
 settings = get_settings()
 
-# Database setup
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    echo=settings.debug,
-)
+# Database setup (pool sizing and PgBouncer mode come from Settings)
+engine = build_engine(settings.database_url, settings)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replicas; an empty DATABASE_REPLICA_URLS keeps every read on the primary
+replicas = ReplicaRouter(settings, settings.database_replica_urls)
+
+# User data shards; the primary is the users directory (and the only shard by default)
+shards = ShardRouter(settings, engine, SessionLocal)
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _pin_writer_to_primary(session: Session) -> None:
+    """Route the committing user's reads to the primary for a short window."""
+    key = session.info.get("routing_key")
+    if key is not None and replicas.enabled:
+        replicas.note_write(key)
+
+
+def _routing_key(request: Request) -> Optional[str]:
+    """User id from the bearer token, used only to pick a database (not to authenticate)."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from jose import jwt  # deferred like every jose.jwt use: it loads the crypto backends
+
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
 
 def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+    """Initialize database tables (on the primary and every shard)."""
+    for shard in shards.shards.values():
+        try:
+            Base.metadata.create_all(bind=shard.engine)
+        except SQLAlchemyError:
+            # Another worker created the schema between our existence check and CREATE;
+            # a second pass sees the tables and is a no-op.
+            Base.metadata.create_all(bind=shard.engine)
+
+
+def _user_id(routing_key: Optional[str]) -> Optional[int]:
+    try:
+        return int(routing_key) if routing_key is not None else None
+    except ValueError:
+        return None
+
+
+def get_db(request: Request) -> Generator[Session, None, None]:
+    """
+    Get database session dependency: the primary of the caller's shard (the
+    primary database when unsharded or anonymous). Writes are refused with
+    503 while the caller's data is moving between shards.
+    """
+    routing_key = _routing_key(request)
+    user_id = _user_id(routing_key)
+    if user_id is not None and request.method not in READ_METHODS:
+        try:
+            shards.check_writable(user_id)
+        except ShardMoving:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Your data is being moved, retry shortly",
+                headers={"Retry-After": str(math.ceil(shards.ttl) or 1)},
+            )
+    db = shards.open_session(user_id, write=request.method not in READ_METHODS)
+    db.info["routing_key"] = routing_key
+    try:
+        yield db
+    finally:
+        db.close()
 
 
-def get_db() -> Generator[Session, None, None]:
-    """Get database session dependency."""
+def get_directory_db() -> Generator[Session, None, None]:
+    """Session on the primary for directory tables (users, jobs, revoked tokens), whatever the caller's shard."""
     db = SessionLocal()
     try:
         yield db
@@ -37,59 +108,108 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def get_read_db(request: Request, primary: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    """
+    Get a session for read-only work.
+
+    Uses a healthy read replica when one is configured, unless the caller wrote
+    recently; otherwise shares the request's primary session. Sessions connect
+    lazily, so the unused primary session costs nothing. Replicas belong to the
+    primary database, so callers on other shards always share their session.
+    """
+    if primary.get_bind() is not engine:
+        yield primary
+        return
+    db = replicas.session(primary.info.get("routing_key"))
+    if db is None:
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Password hashing; passlib and bcrypt are imported on first use, not at startup
+@lru_cache(maxsize=None)
+def pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 
 
 def hash_password(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 # JWT handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Revoked token ids, confirmed against the primary
+revocations = RevocationList(SessionLocal, settings)
+
 
 def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    from jose import jwt
+
     if expires_delta is None:
         expires_delta = timedelta(hours=settings.jwt_expiration_hours)
 
     expire = datetime.utcnow() + expires_delta
-    to_encode = {"sub": str(user_id), "exp": expire}
+    to_encode = {"sub": str(user_id), "exp": expire, "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 
 def create_refresh_token(user_id: int) -> str:
     """Create a JWT refresh token (longer expiration)."""
+    from jose import jwt
+
     expire = datetime.utcnow() + timedelta(days=7)
-    to_encode = {"sub": str(user_id), "exp": expire, "type": "refresh"}
+    to_encode = {"sub": str(user_id), "exp": expire, "type": "refresh", "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get the current authenticated user from JWT token."""
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)) -> User:
+    """
+    Get the current authenticated user from JWT token.
+    Claims of recently seen tokens come from the verifier's cache; revoked
+    tokens (logout, rotated refresh tokens) are rejected.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        payload = verifier.verify(token)
     except JWTError:
         raise credentials_exception
+    user_id: str = payload.get("sub")
+    if user_id is None or payload.get("type") == "refresh" or revocations.is_revoked(payload.get("jti")):
+        raise credentials_exception
 
     user = db.query(User).filter(User.id == int(user_id)).first()
+    if user is None and "replica" in db.info:
+        # A just-registered user may not have replicated yet
+        with SessionLocal() as primary:
+            user = primary.query(User).filter(User.id == int(user_id)).first()
     if user is None:
         raise credentials_exception
     return user
+
+
+def require_admin(x_admin_token: str = Header("")) -> None:
+    """Guard for /admin endpoints; they do not exist unless ADMIN_TOKEN is set."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
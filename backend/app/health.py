@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.config import Settings
+from app.db import ReplicaRouter
+from app.schemas import DependencyCheck
+
+logger = logging.getLogger(__name__)
+
+ready_gauge = Gauge("taskflow_ready", "1 when this worker reports ready")
+loop_lag_gauge = Gauge("taskflow_event_loop_lag_seconds", "Event loop scheduling lag")
+pool_saturation_gauge = Gauge("taskflow_db_pool_saturation", "Primary pool checked-out / capacity")
+
+
+def pool_saturation(engine: Engine) -> float:
+    """Fraction of the pool's capacity (size + overflow) currently checked out."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0.0
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return pool.checkedout() / capacity if capacity else 0.0
+
+
+class HealthMonitor:
+    """
+    Probes dependencies on a background interval and caches the result.
+
+    /readyz only reads the cached snapshot, so a burst of health checks never adds
+    load to a struggling database. Read replicas are probed on their own interval
+    for the ReplicaRouter, which likewise only reads the results. The worker reports not-ready when a critical
+    dependency fails, the pool is saturated, or the event loop is lagging.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        engine: Engine,
+        replicas: Optional[ReplicaRouter] = None,
+        redis_client: Callable = lambda: None,
+        ai_client: Callable = lambda: None,
+    ):
+        self.settings = settings
+        self.engine = engine
+        self.replicas = replicas
+        self.redis_client = redis_client
+        self.ai_client = ai_client
+        self.checks: Dict[str, DependencyCheck] = {}
+        self.loop_lag = 0.0
+        self.checked_at: Optional[datetime] = None
+        self._ai_checked_at = 0.0
+        self._tasks: list[asyncio.Task] = []
+
+    async def _probe(self, name: str, probe: Callable[[], None], critical: bool = True) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.to_thread(probe), timeout=self.settings.readiness_probe_timeout_seconds
+            )
+        except Exception as e:
+            if self.checks.get(name, DependencyCheck(ok=True)).ok:
+                logger.warning(f"Readiness probe {name} failed: {e!r}")
+            self.checks[name] = DependencyCheck(ok=False, critical=critical, detail=repr(e)[:200])
+        else:
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.checks[name] = DependencyCheck(ok=True, critical=critical, latency_ms=round(latency_ms, 2))
+
+    def _probe_database(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    async def probe_once(self) -> None:
+        """Run every due probe once and refresh the cached snapshot."""
+        probes = [self._probe("database", self._probe_database)]
+
+        redis_client = self.redis_client()
+        if redis_client is not None:
+            # Rate limiting falls back to in-memory buckets, so Redis is not critical.
+            probes.append(self._probe("redis", redis_client.ping, critical=False))
+
+        ai_client = self.ai_client()
+        now = time.monotonic()
+        if ai_client is not None and now - self._ai_checked_at >= self.settings.readiness_ai_interval_seconds:
+            # The rule-based fallback keeps /ai working without the provider.
+            self._ai_checked_at = now
+            probes.append(self._probe("ai_provider", ai_client.models.list, critical=False))
+
+        await asyncio.gather(*probes)
+        self.checked_at = datetime.utcnow()
+
+    async def _probe_loop(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except Exception:
+                logger.exception("Readiness probing failed")
+            ready_gauge.set(1 if self.is_healthy() else 0)
+            await asyncio.sleep(self.settings.readiness_interval_seconds)
+
+    async def _replica_loop(self) -> None:
+        # Replica routing only reads these results, so no request waits on a probe
+        while True:
+            try:
+                await asyncio.to_thread(self.replicas.check_all)
+            except Exception:
+                logger.exception("Replica probing failed")
+            await asyncio.sleep(self.settings.replica_check_interval_seconds)
+
+    async def _lag_loop(self, interval: float = 0.5) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - start - interval)
+            # Rise immediately, decay gradually, so one slow tick is not forgotten at once.
+            self.loop_lag = lag if lag > self.loop_lag else 0.7 * self.loop_lag + 0.3 * lag
+            loop_lag_gauge.set(self.loop_lag)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._probe_loop()),
+            asyncio.create_task(self._lag_loop()),
+        ]
+        if self.replicas is not None and self.replicas.enabled:
+            self._tasks.append(asyncio.create_task(self._replica_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def saturation(self) -> float:
+        saturation = pool_saturation(self.engine)
+        pool_saturation_gauge.set(saturation)
+        return saturation
+
+    def overloaded(self) -> bool:
+        return (
+            self.saturation() >= self.settings.readiness_max_pool_saturation
+            or self.loop_lag * 1000 >= self.settings.readiness_max_loop_lag_ms
+        )
+
+    def is_healthy(self) -> bool:
+        dependencies_ok = all(check.ok for check in self.checks.values() if check.critical)
+        return dependencies_ok and not self.overloaded()
@@ -0,0 +1,252 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, distinct, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import Settings, get_settings
+from app.deps import shards
+from app.models import Job, JobStatus, Task, TaskStatus
+from app.services.agenda import refresh_rollovers
+from app.services.counters import reconcile_counters
+from app.services.events import run_maintenance
+from app.services.scoring import score_saved_tasks
+from app.tokens import purge_expired
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+# kind -> handler(db, payload) returning a JSON-serializable result
+Handler = Callable[[Session, Dict[str, Any]], Any]
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register the function that runs jobs of ``kind``."""
+
+    def register(fn: Handler) -> Handler:
+        HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+# ============ Queue ============
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    user_id: Optional[int] = None,
+    run_at: Optional[datetime] = None,
+    dedupe_key: Optional[str] = None,
+) -> Optional[Job]:
+    """Queue a job and commit; returns None if ``dedupe_key`` was already enqueued."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        user_id=user_id,
+        run_at=run_at or datetime.utcnow(),
+        dedupe_key=dedupe_key,
+        max_attempts=settings.job_max_attempts,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    logger.info(f"Job {job.id} ({kind}) enqueued")
+    return job
+
+
+def find_active(db: Session, kind: str, user_id: int) -> Optional[Job]:
+    """A user's queued or running job of ``kind``, so repeat requests can share it."""
+    return db.scalars(
+        select(Job)
+        .where(Job.kind == kind, Job.user_id == user_id, Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+        .order_by(Job.id)
+        .limit(1)
+    ).first()
+
+
+def claim(db: Session, worker_id: str) -> Optional[Job]:
+    """
+    Take the oldest due job and mark it running.
+    SKIP LOCKED lets concurrent workers pass over rows another worker is
+    claiming instead of queueing behind its lock.
+    """
+    now = datetime.utcnow()
+    job = db.scalars(
+        select(Job)
+        .where(Job.status == JobStatus.QUEUED, Job.run_at <= now)
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if job is None:
+        db.rollback()
+        return None
+    job.status = JobStatus.RUNNING
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = now
+    db.commit()
+    return job
+
+
+def _finish(db: Session, job: Job, worker_id: str, **values) -> bool:
+    # Only the worker holding the lease may record the outcome
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == JobStatus.RUNNING, Job.locked_by == worker_id)
+        .values(**values)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def complete(db: Session, job: Job, worker_id: str, result: Any) -> bool:
+    return _finish(
+        db, job, worker_id,
+        status=JobStatus.SUCCEEDED, result=result, error=None, locked_by=None, finished_at=datetime.utcnow(),
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff after the given number of attempts."""
+    return min(settings.job_backoff_seconds * 2 ** (attempts - 1), settings.job_backoff_max_seconds)
+
+
+def fail(db: Session, job: Job, worker_id: str, error: str) -> bool:
+    """Record a failed attempt: requeue with backoff, or fail for good after max_attempts."""
+    now = datetime.utcnow()
+    if job.attempts < job.max_attempts:
+        return _finish(
+            db, job, worker_id,
+            status=JobStatus.QUEUED, error=error, locked_by=None,
+            run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+        )
+    return _finish(db, job, worker_id, status=JobStatus.FAILED, error=error, locked_by=None, finished_at=now)
+
+
+def requeue_stale(db: Session, lease_seconds: float) -> int:
+    """
+    Recover jobs whose worker died mid-run (lease expired): requeue them, or
+    fail them if they are out of attempts. Returns the number recovered.
+    """
+    now = datetime.utcnow()
+    stale = (Job.status == JobStatus.RUNNING, Job.locked_at < now - timedelta(seconds=lease_seconds))
+    failed = db.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.FAILED, error="Worker lease expired", locked_by=None, finished_at=now)
+    ).rowcount
+    requeued = db.execute(
+        update(Job).where(*stale).values(status=JobStatus.QUEUED, locked_by=None, run_at=now)
+    ).rowcount
+    db.commit()
+    if failed or requeued:
+        logger.warning(f"Recovered stale jobs: {requeued} requeued, {failed} failed")
+    return failed + requeued
+
+
+def purge_finished(db: Session, before: datetime) -> int:
+    result = db.execute(delete(Job).where(Job.status.in_(FINISHED), Job.finished_at < before))
+    db.commit()
+    return result.rowcount
+
+
+# ============ Handlers ============
+
+# Handlers get a primary session (the jobs table); user data is read and
+# written on the user's shard, or on every shard for maintenance jobs. Writes
+# for one user go through a fenced session (ShardMoving fails the attempt,
+# which is retried after the move); maintenance passes skip users mid-move.
+
+def each_shard(fn: Callable[[Session], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run ``fn`` on every shard in turn and add up (counts) or concatenate (lists) what it returns."""
+    totals: Dict[str, Any] = {}
+    for shard_db in shards.sessions():
+        for key, value in fn(shard_db).items():
+            totals[key] = totals[key] + value if key in totals else value
+    return totals
+
+
+@handler("prioritize_saved")
+def _prioritize_saved(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    with shards.session(payload["user_id"], write=True) as user_db:
+        outcome = score_saved_tasks(user_db, user_db, payload["user_id"], payload.get("project_id"))
+    if outcome is None:
+        return {"results": [], "plan": []}
+    scored, plan = outcome
+    return {"results": [item.to_dict() for item in scored], "plan": plan}
+
+
+@handler("reconcile_counters")
+def _reconcile_counters(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = payload.get("user_id")
+    if user_id is not None:
+        with shards.session(user_id, write=True) as user_db:
+            return {"repaired": reconcile_counters(user_db, user_id)}
+    return each_shard(lambda shard_db: {"repaired": reconcile_counters(shard_db, users=shards.settled_users(shard_db))})
+
+
+@handler("events_maintenance")
+def _events_maintenance(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return each_shard(lambda shard_db: run_maintenance(shard_db, settings))
+
+
+@handler("agenda_rollover")
+def _agenda_rollover(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return each_shard(lambda shard_db: {"rescored": refresh_rollovers(shard_db, users=shards.settled_users(shard_db))})
+
+
+def scored_users(db: Session) -> List[int]:
+    """Users with open tasks that carry an ai_score."""
+    return db.scalars(
+        select(distinct(Task.user_id)).where(Task.status != TaskStatus.DONE, Task.ai_score.is_not(None))
+    ).all()
+
+
+def refresh_user_scores(db: Session, user_ids: Iterable[int]) -> int:
+    """Queue a prioritize_saved job per user, unless one is already pending; returns the number queued."""
+    enqueued = 0
+    for user_id in user_ids:
+        if find_active(db, "prioritize_saved", user_id) is None:
+            enqueue(db, "prioritize_saved", {"user_id": user_id, "project_id": None}, user_id=user_id)
+            enqueued += 1
+    return enqueued
+
+
+@handler("refresh_scores")
+def _refresh_scores(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-prioritize, one job per user, the users whose open tasks have been scored before."""
+    user_ids = {user_id for shard_db in shards.sessions() for user_id in scored_users(shard_db)}
+    return {"enqueued": refresh_user_scores(db, sorted(user_ids))}
+
+
+@handler("purge_jobs")
+def _purge_jobs(db: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "purged": purge_finished(db, datetime.utcnow() - timedelta(days=settings.job_retention_days)),
+        "revocations_purged": purge_expired(db),
+    }
+
+
+def periodic_jobs(settings: Settings) -> Dict[str, int]:
+    """Scheduled job kinds and their intervals in seconds (0 disables one)."""
+    schedule = {
+        "reconcile_counters": settings.job_reconcile_counters_seconds,
+        "agenda_rollover": settings.job_agenda_rollover_seconds,
+        "events_maintenance": settings.job_events_maintenance_seconds,
+        "refresh_scores": settings.job_refresh_scores_seconds,
+        "purge_jobs": settings.job_purge_seconds,
+    }
+    return {kind: seconds for kind, seconds in schedule.items() if seconds > 0}
@@ -0,0 +1,25 @@
+import threading
+
+# Process lifecycle state shared by the lifespan handler, /readyz and app.server
+_ready = threading.Event()
+_draining = threading.Event()
+
+
+def mark_ready() -> None:
+    """Startup finished: dependencies initialized and pools warmed."""
+    _ready.set()
+
+
+def mark_draining() -> None:
+    """Shutdown requested: stop receiving new traffic, finish in-flight requests."""
+    _draining.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set() and not _draining.is_set()
+
+
+def phase() -> str:
+    if _draining.is_set():
+        return "draining"
+    return "ready" if _ready.is_set() else "starting"
@@ -1,28 +1,78 @@
+import asyncio
 import logging
+import math
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, status
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from prometheus_client import Counter, Histogram, generate_latest, CollectorRegistry, REGISTRY
 import time
 
+from app import lifecycle
+from app.cache import close_redis, get_redis, init_redis
 from app.config import get_settings
-from app.deps import init_db
-from app.routers import auth, tasks, projects, ai
-from app.schemas import HealthResponse
+from app.db import warm_pool
+from app.deps import engine, init_db, replicas, shards
+from app.health import HealthMonitor
+from app.middleware import CompressionMiddleware
+from app.profiling import ProfilingMiddleware, install_sql_capture
+from app.routers import auth, tasks, projects, agenda, ai, admin, jobs
+from app.tracing import init_tracing, shutdown_tracing
+from app.schemas import HealthResponse, ReadinessResponse
+from app.sharding import ShardMoving
+from app.services import ai as ai_service
+from app.services.ai import close_openai_client, init_openai_client
 
 settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
-# Initialize database
-init_db()
+health_monitor = HealthMonitor(
+    settings,
+    engine,
+    replicas=replicas,
+    redis_client=get_redis,
+    ai_client=lambda: ai_service.openai_client,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize dependencies and warm pools before reporting ready; release them on shutdown."""
+    await asyncio.to_thread(init_db)
+    init_openai_client()
+    init_redis()
+    for shard in shards.shards.values():
+        await asyncio.to_thread(warm_pool, shard.engine, settings.db_pool_warm_connections)
+    for replica in replicas.replicas:
+        await asyncio.to_thread(warm_pool, replica.engine, settings.db_pool_warm_connections)
+    await health_monitor.probe_once()
+    health_monitor.start()
+    lifecycle.mark_ready()
+    logger.info("Startup complete")
+
+    yield
+
+    lifecycle.mark_draining()
+    await health_monitor.stop()
+    close_openai_client()
+    close_redis()
+    shutdown_tracing()
+    for shard in shards.shards.values():
+        shard.engine.dispose()
+    for replica in replicas.replicas:
+        replica.engine.dispose()
+    logger.info("Shutdown complete")
+
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="AI-assisted task manager with cloud-ready architecture",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -34,6 +84,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression (gzip/brotli) for large JSON responses, streaming included
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_min_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
+# Opt-in request profiling (outermost, so compression is included in the capture)
+if settings.profiling_enabled:
+    install_sql_capture()
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=settings.admin_token,
+        sample_rate=settings.profiling_sample_rate,
+        slow_ms=settings.profiling_slow_ms,
+        interval=settings.profiling_interval_seconds,
+    )
+
+# OpenTelemetry: HTTP server, SQL and Redis spans plus the service-level spans in app.services
+init_tracing(
+    settings,
+    app,
+    [*(shard.engine for shard in shards.shards.values()), *(replica.engine for replica in replicas.replicas)],
+)
+
 # Prometheus metrics
 request_count = Counter("taskflow_requests_total", "Total requests", ["method", "endpoint"])
 request_duration = Histogram("taskflow_request_duration_seconds", "Request duration", ["method", "endpoint"])
@@ -52,11 +128,24 @@ async def metrics_middleware(request, call_next):
     return response
 
 
+@app.exception_handler(ShardMoving)
+async def shard_moving_handler(request: Request, exc: ShardMoving):
+    """A write reached the user's shard after a move froze it (get_db refuses most up front)."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Your data is being moved, retry shortly"},
+        headers={"Retry-After": str(math.ceil(shards.ttl) or 1)},
+    )
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(tasks.router)
 app.include_router(projects.router)
+app.include_router(agenda.router)
 app.include_router(ai.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
 
 
 # Health check endpoints
@@ -66,10 +155,27 @@ async def health_check():
     return HealthResponse(status="healthy", timestamp=datetime.utcnow())
 
 
-@app.get("/readyz", response_model=HealthResponse)
-async def readiness_check():
-    """Readiness check endpoint."""
-    return HealthResponse(status="ready", timestamp=datetime.utcnow())
+@app.get("/readyz", response_model=ReadinessResponse)
+async def readiness_check(response: Response):
+    """
+    Readiness check endpoint.
+    Serves the background-probed snapshot; 503 while starting, draining,
+    when a critical dependency is down, or when the worker is overloaded.
+    """
+    phase = lifecycle.phase()
+    if phase == "ready" and not health_monitor.is_healthy():
+        phase = "overloaded" if health_monitor.overloaded() else "degraded"
+    if phase != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return ReadinessResponse(
+        status=phase,
+        timestamp=datetime.utcnow(),
+        checks=health_monitor.checks,
+        pool_saturation=round(health_monitor.saturation(), 3),
+        loop_lag_ms=round(health_monitor.loop_lag * 1000, 2),
+        checked_at=health_monitor.checked_at,
+    )
 
 
 @app.get("/metrics")
@@ -91,5 +197,5 @@ async def root():
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from app.server import main
+    main()
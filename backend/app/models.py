@@ -1,7 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum, Float
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum, Float, Index, JSON, false, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -9,6 +8,9 @@ import enum
 
 Base = declarative_base()
 
+# JSONB on Postgres, plain JSON elsewhere (the SQLite test database)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 
 class User(Base):
     """User model for authentication."""
@@ -19,6 +21,9 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Where the user's projects, tasks and events live (app.sharding); NULL = the primary
+    shard = Column(String, nullable=True)
+    shard_moving = Column(Boolean, default=False, server_default=false(), nullable=False)
 
     # Relationships
     projects = relationship("Project", back_populates="owner", cascade="all, delete-orphan")
@@ -32,7 +37,7 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -60,18 +65,26 @@ class Task(Base):
     due_at = Column(DateTime, nullable=True)
     estimated_minutes = Column(Integer, nullable=True)
     priority = Column(Integer, default=3)  # 1-5, 1 = lowest
-    tags = Column(JSONB, default=list)  # ["tag1", "tag2", ...]
+    tags = Column(JSONType, default=list)  # ["tag1", "tag2", ...]
     ai_score = Column(Float, nullable=True)  # AI prioritization score
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Optimistic concurrency: ORM updates check and bump it (StaleDataError on conflict)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     project = relationship("Project", back_populates="tasks")
     owner = relationship("User", back_populates="tasks")
     events = relationship("TaskEvent", back_populates="task", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Collection ETags: max(updated_at) per user
+        Index("ix_tasks_user_id_updated_at", "user_id", "updated_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
 
 class TaskEventType(str, enum.Enum):
     """Task event types."""
@@ -80,17 +93,112 @@ class TaskEventType(str, enum.Enum):
     STATUS_CHANGED = "status_changed"
     PRIORITIZED = "prioritized"
     DELETED = "deleted"
+    SNAPSHOT = "snapshot"  # compacted run of older UPDATED events
 
 
 class TaskEvent(Base):
-    """Event log for task changes."""
+    """Event log for task changes.
+
+    On Postgres the table is range-partitioned by month on created_at, with
+    primary key (id, created_at); see migration 004 and app.services.events.
+    """
     __tablename__ = "task_events"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     event_type = Column(Enum(TaskEventType), nullable=False)
-    payload = Column(JSONB, nullable=True)  # JSON payload of the event
+    payload = Column(JSONType, nullable=True)  # JSON payload of the event
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     task = relationship("Task", back_populates="events")
+
+    __table_args__ = (
+        # Task history, keyset-paginated on (created_at, id)
+        Index("ix_task_events_task_id_created_at_id", "task_id", "created_at", "id"),
+    )
+
+
+class TaskCounter(Base):
+    """Maintained task totals per user, project and status.
+
+    Rollup rows use project_id = 0 (all projects) and status = "*" (all statuses),
+    so every filter combination served by the task list is a single-row lookup.
+    """
+    __tablename__ = "task_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class AgendaEntry(Base):
+    """Materialized agenda: one row per open task with a due date, with its urgency score.
+
+    Maintained by app.services.agenda on task writes. The score depends on time
+    left before the deadline, so it is refreshed once next_rollover_at passes.
+    """
+    __tablename__ = "agenda_entries"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    score = Column(Float, nullable=False)
+    next_rollover_at = Column(DateTime, nullable=True, index=True)
+
+    __table_args__ = (
+        # GET /agenda: a user's entries in response order, read up to LIMIT
+        Index("ix_agenda_entries_user_id_score", "user_id", text("score DESC"), "due_at", "task_id"),
+    )
+
+
+class JobStatus(str, enum.Enum):
+    """Background job states."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base):
+    """Background job, claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED.
+
+    See app.jobs (queue and handlers) and app.worker (worker loop and scheduler).
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONType, nullable=True)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    # Scheduled jobs use "<kind>@<slot>" so each slot is enqueued once across workers
+    dedupe_key = Column(String, nullable=True, unique=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    result = Column(JSONType, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Claim order: due queued jobs, oldest first
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+
+class RevokedToken(Base):
+    """A revoked JWT (logout, refresh rotation, compromise), kept until it would have expired.
+
+    The exact record behind the revocation bloom filter in app.tokens.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
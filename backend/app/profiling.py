@@ -0,0 +1,248 @@
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+try:
+    from pyinstrument import Profiler as Pyinstrument
+except ImportError:  # optional: falls back to cProfile
+    Pyinstrument = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MAX_STATEMENTS = 200  # per request; the rest are only counted
+MAX_STATEMENT_CHARS = 2000
+PROFILE_HEADER = "x-profile"
+# Never sampled: probes, scrapes and the profile viewer itself
+UNSAMPLED_PREFIXES = ("/admin", "/healthz", "/readyz", "/metrics")
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+@dataclass
+class Statement:
+    sql: str
+    duration_ms: float
+    rows: int
+    executemany: bool
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    query: str
+    trigger: str  # "header" or "sample"
+    started_at: datetime
+    status: int = 0
+    duration_ms: float = 0.0
+    sql_ms: float = 0.0
+    statements: List[Statement] = field(default_factory=list)
+    dropped_statements: int = 0
+    profiler: str = ""
+    profile: str = ""
+
+    def detail(self) -> dict:
+        data = asdict(self)
+        data["statement_count"] = len(self.statements) + self.dropped_statements
+        return data
+
+    def summary(self) -> dict:
+        data = self.detail()
+        del data["statements"], data["profile"]
+        return data
+
+
+class ProfileStore:
+    """Bounded, thread-safe ring buffer of captured request profiles."""
+
+    def __init__(self, size: int):
+        self._items: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._items.append(profile)
+
+    def list(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._items))
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((p for p in self._items if p.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+store = ProfileStore(settings.profiling_buffer_size)
+
+# cProfile hooks the whole thread, so only one capture can run at a time.
+_cprofile_lock = threading.Lock()
+
+
+class _StackProfiler:
+    """pyinstrument when installed (per-request with async_mode), else cProfile."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.name = ""
+        self._pyinstrument = None
+        self._cprofile = None
+
+    def start(self) -> None:
+        if Pyinstrument is not None:
+            self._pyinstrument = Pyinstrument(interval=self.interval, async_mode="enabled")
+            self._pyinstrument.start()
+            self.name = "pyinstrument"
+        elif _cprofile_lock.acquire(blocking=False):
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+            self.name = "cProfile"
+
+    def stop(self) -> str:
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+            return self._pyinstrument.output_text(unicode=False, color=False)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            _cprofile_lock.release()
+            out = io.StringIO()
+            pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(40)
+            return out.getvalue()
+        return "(skipped: another cProfile capture was running)"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None or not conn.info.get("profile_query_start"):
+        return
+    duration_ms = (time.perf_counter() - conn.info["profile_query_start"].pop()) * 1000
+    profile.sql_ms += duration_ms
+    if len(profile.statements) >= MAX_STATEMENTS:
+        profile.dropped_statements += 1
+        return
+    profile.statements.append(Statement(
+        sql=statement[:MAX_STATEMENT_CHARS],
+        duration_ms=round(duration_ms, 3),
+        rows=cursor.rowcount,
+        executemany=executemany,
+    ))
+
+
+def install_sql_capture() -> None:
+    """Time statements on every engine (primary and replicas) for profiled requests."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    """
+    Capture a stack profile and SQL statement log for selected requests.
+
+    A request is profiled when it sends ``X-Profile: <admin token>`` or is
+    picked by ``sample_rate``; sampled captures are kept only if the request
+    took at least ``slow_ms``. Captures go to ``store``; header-triggered
+    responses carry ``X-Profile-Id`` for lookup via /admin/profiles/{id}.
+    Only added to the app when profiling is enabled.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str = "",
+        sample_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        interval: float = 0.001,
+    ):
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval = interval
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if self.token:
+            header = Headers(scope=scope).get(PROFILE_HEADER)
+            if header and hmac.compare_digest(header, self.token):
+                return "header"
+        if (
+            self.sample_rate
+            and not scope["path"].startswith(UNSAMPLED_PREFIXES)
+            and random.random() < self.sample_rate
+        ):
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            id=store.next_id(),
+            method=scope["method"],
+            path=scope["path"],
+            query=scope.get("query_string", b"").decode("latin-1"),
+            trigger=trigger,
+            started_at=datetime.utcnow(),
+        )
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if trigger == "header":
+                    MutableHeaders(raw=message["headers"])["X-Profile-Id"] = str(profile.id)
+            await send(message)
+
+        token = _current.set(profile)
+        profiler = _StackProfiler(self.interval)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.profile = profiler.stop()
+            profile.profiler = profiler.name
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 3)
+            profile.sql_ms = round(profile.sql_ms, 3)
+            _current.reset(token)
+            if trigger == "header" or profile.duration_ms >= self.slow_ms:
+                store.add(profile)
+                logger.info(
+                    "Profiled %s %s: %.1f ms, %d statements (%.1f ms SQL), id=%d",
+                    profile.method, profile.path, profile.duration_ms,
+                    len(profile.statements) + profile.dropped_statements, profile.sql_ms, profile.id,
+                )
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from jose import JWTError
+
+from app import profiling
+from app.deps import require_admin, revocations
+from app.schemas import ProfileDetail, ProfileSummary, TokenRevoke
+from app.tokens import verifier
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles", response_model=list[ProfileSummary])
+async def list_profiles():
+    """List captured request profiles in this worker, newest first."""
+    return [profile.summary() for profile in profiling.store.list()]
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileDetail)
+async def get_profile(profile_id: int):
+    """Get a captured profile with its stack profile and SQL statement log."""
+    profile = profiling.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile.detail()
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_profiles():
+    """Drop all captured profiles in this worker."""
+    profiling.store.clear()
+
+
+@router.post("/tokens/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_token(token_data: TokenRevoke):
+    """Revoke a compromised access or refresh token until it expires."""
+    try:
+        claims = verifier.verify(token_data.token)
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired token")
+    if claims.get("jti") is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token has no id and cannot be revoked")
+    revocations.revoke_claims(claims)
@@ -0,0 +1,30 @@
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.deps import get_read_db, get_current_user
+from app.models import User
+from app.schemas import AgendaResponse
+from app.services.agenda import end_of_day, get_agenda
+from app.utils.ratelimit import rate_limit
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/agenda", tags=["agenda"], dependencies=[Depends(rate_limit("crud"))])
+
+
+@router.get("", response_model=AgendaResponse)
+async def agenda_endpoint(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    tz_offset: int = Query(0, ge=-720, le=840, description="Minutes east of UTC that define 'today'"),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """
+    Today's agenda: open tasks that are overdue or due before the end of the
+    local day, most urgent first. Served from the materialized agenda_entries
+    table, so the cost does not grow with the user's total task count.
+    """
+    until = end_of_day(datetime.utcnow(), tz_offset)
+    return AgendaResponse(items=get_agenda(db, current_user.id, until, limit), until=until)
@@ -1,14 +1,23 @@
+import asyncio
 import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user
-from app.models import User, Task
-from app.schemas import PrioritizationRequest, PrioritizationResponse, TaskForPrioritization
+from app.config import get_settings
+from app.deps import get_db, get_directory_db, get_read_db, get_current_user
+from app.jobs import enqueue, find_active
+from app.models import TaskStatus, User
+from app.schemas import JobAccepted, PrioritizationRequest, PrioritizationResponse
+from app.services import counters
 from app.services.ai import prioritize_tasks
+from app.services.scoring import score_saved_tasks
+from app.utils.ratelimit import rate_limit, ai_quota
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/ai", tags=["ai"])
+router = APIRouter(prefix="/ai", tags=["ai"], dependencies=[Depends(rate_limit("ai")), Depends(ai_quota)])
+settings = get_settings()
 
 
 @router.post("/prioritize", response_model=PrioritizationResponse)
@@ -24,7 +33,8 @@ async def prioritize_endpoint(
     Output: Prioritized results with scores/rationales and a daily plan
     """
     try:
-        results, plan = prioritize_tasks(request.tasks)
+        # Off the event loop, so identical requests arriving meanwhile can join this run
+        results, plan = await asyncio.to_thread(prioritize_tasks, request.tasks, current_user.id)
         
         logger.info(f"Prioritized {len(request.tasks)} tasks for user {current_user.id}")
         
@@ -38,50 +48,53 @@ async def prioritize_endpoint(
         )
 
 
-@router.post("/prioritize-saved")
+@router.post(
+    "/prioritize-saved",
+    response_model=PrioritizationResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": JobAccepted}},
+)
 async def prioritize_saved_tasks(
     project_id: int = None,
+    background: bool = False,
     db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
+    directory_db: Session = Depends(get_directory_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Prioritize tasks from the database (saved tasks).
+    The task scan may be served by a read replica; scores are written to the primary
+    of the user's shard. Jobs are queued on the primary database.
+
+    With ``background=true``, or from AI_BACKGROUND_TASK_THRESHOLD open tasks,
+    the work is queued instead: 202 Accepted with the job's status and stream
+    URLs (GET /jobs/{id}, GET /jobs/{id}/stream). A job already queued for the
+    same user and project is reused.
     """
-    query = db.query(Task).filter(Task.user_id == current_user.id, Task.status != "done")
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
-    
-    tasks = query.all()
-    if not tasks:
+    threshold = settings.ai_background_task_threshold
+    if not background and threshold:
+        open_tasks = counters.get_count(read_db, current_user.id, project_id) - counters.get_count(
+            read_db, current_user.id, project_id, TaskStatus.DONE
+        )
+        background = open_tasks >= threshold
+    if background:
+        payload = {"user_id": current_user.id, "project_id": project_id}
+        job = find_active(directory_db, "prioritize_saved", current_user.id)
+        if job is None or job.payload != payload:
+            job = enqueue(directory_db, "prioritize_saved", payload, user_id=current_user.id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/jobs/{job.id}"},
+            content=JobAccepted(
+                job_id=job.id, status=job.status, status_url=f"/jobs/{job.id}", stream_url=f"/jobs/{job.id}/stream"
+            ).model_dump(mode="json"),
+        )
+
+    outcome = await asyncio.to_thread(score_saved_tasks, db, read_db, current_user.id, project_id)
+    if outcome is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No tasks found to prioritize"
         )
-
-    # Convert DB tasks to prioritization request format
-    task_inputs = [
-        TaskForPrioritization(
-            title=task.title,
-            description=task.description,
-            due_at=task.due_at,
-            estimated_minutes=task.estimated_minutes,
-            importance=task.priority,
-        )
-        for task in tasks
-    ]
-
-    results, plan = prioritize_tasks(task_inputs)
-    
-    # Update AI scores in database
-    for result in results:
-        task = next((t for t in tasks if t.title == result.title), None)
-        if task:
-            task.ai_score = result.score
-    
-    db.commit()
-    logger.info(f"Prioritized {len(tasks)} saved tasks for user {current_user.id}")
-
-    return {
-        "results": results,
-        "plan": plan,
-    }
+    scored, plan = outcome
+    return PrioritizationResponse(results=[item.to_result() for item in scored], plan=plan)
@@ -1,5 +1,8 @@
 import logging
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.deps import (
@@ -10,14 +13,18 @@ from app.deps import (
     create_refresh_token,
     oauth2_scheme,
     get_current_user,
+    revocations,
+    shards,
 )
 from app.models import User
 from app.schemas import UserRegister, UserLogin, TokenResponse, TokenRefresh
-from jose import jwt, JWTError
+from jose import JWTError
 from app.config import get_settings
+from app.tokens import verifier
+from app.utils.ratelimit import rate_limit
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], dependencies=[Depends(rate_limit("auth"))])
 settings = get_settings()
 
 
@@ -32,18 +39,18 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
 
-    # Create user
+    # Create user; RETURNING hands back the id without reloading the row
     hashed_password = hash_password(user_data.password)
-    db_user = User(email=user_data.email, password_hash=hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    user_id = db.scalar(
+        insert(User).values(email=user_data.email, password_hash=hashed_password).returning(User.id)
+    )
+    shards.place_new_user(db, user_id)  # commits
 
-    logger.info(f"User registered: {db_user.email}")
+    logger.info(f"User registered: {user_data.email}")
 
     # Return tokens
-    access_token = create_access_token(db_user.id)
-    refresh_token = create_refresh_token(db_user.id)
+    access_token = create_access_token(user_id)
+    refresh_token = create_refresh_token(user_id)
     return TokenResponse(access_token=access_token, refresh_token=refresh_token)
 
 
@@ -66,26 +73,52 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh(token_data: TokenRefresh):
-    """Refresh access token using refresh token."""
+    """
+    Refresh access token using refresh token.
+    Refresh tokens are rotated: the one presented is revoked, so it works once.
+    """
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token"
+    )
     try:
-        payload = jwt.decode(token_data.refresh_token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        user_id: int = int(payload.get("sub"))
-        if payload.get("type") != "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type"
-            )
+        payload = verifier.verify(token_data.refresh_token)
     except JWTError:
+        raise invalid_token
+    if payload.get("type") != "refresh":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token"
+            detail="Invalid token type"
         )
+    user_id: int = int(payload.get("sub"))
+    # Revoking is also the reuse check: a token revoked before (by an earlier
+    # refresh, a concurrent one or logout) can't be revoked again
+    if payload.get("jti") is not None and not revocations.revoke_claims(payload):
+        raise invalid_token
 
     access_token = create_access_token(user_id)
     refresh_token = create_refresh_token(user_id)
     return TokenResponse(access_token=access_token, refresh_token=refresh_token)
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token_data: Optional[TokenRefresh] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+):
+    """Revoke the bearer access token and, if given, the refresh token issued with it."""
+    revocations.revoke_claims(verifier.verify(token))
+    if token_data is not None:
+        try:
+            claims = verifier.verify(token_data.refresh_token)
+        except JWTError:
+            return  # expired or invalid: nothing left to revoke
+        if claims.get("type") == "refresh" and claims.get("sub") == str(current_user.id):
+            revocations.revoke_claims(claims)
+    logger.info(f"User logged out: {current_user.id}")
+
+
 @router.get("/me")
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current authenticated user."""
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.deps import SessionLocal, get_directory_db, get_current_user
+from app.jobs import FINISHED
+from app.models import Job, User
+from app.schemas import JobResponse
+from app.utils.ratelimit import rate_limit
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(rate_limit("crud"))])
+settings = get_settings()
+
+
+def _get_job(db: Session, job_id: int, user_id: int) -> Optional[Job]:
+    return db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: Session = Depends(get_directory_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get a background job's status (and result once it has succeeded)."""
+    job = _get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/stream")
+async def stream_job(
+    job_id: int,
+    request: Request,
+    db: Session = Depends(get_directory_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Server-sent events for a job: a "status" event with the JobResponse
+    whenever it changes, ending after the job succeeds or fails.
+    """
+    if not _get_job(db, job_id, current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    user_id = current_user.id
+
+    def poll() -> Optional[JobResponse]:
+        # Fresh session per poll: no connection is held while waiting
+        with SessionLocal() as poll_db:
+            job = _get_job(poll_db, job_id, user_id)
+            return JobResponse.model_validate(job) if job else None
+
+    async def events():
+        last = None
+        while True:
+            # In a worker thread: every open stream polls, and none may block the event loop
+            snapshot = await asyncio.to_thread(poll)
+            if snapshot is None:
+                return
+            data = snapshot.model_dump_json()
+            if data != last:
+                last = data
+                yield f"event: status\ndata: {data}\n\n"
+            if snapshot.status in FINISHED or await request.is_disconnected():
+                return
+            await asyncio.sleep(settings.job_stream_poll_seconds)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,13 +1,17 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func, insert, update
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user
+from app.deps import get_db, get_read_db, get_current_user
 from app.models import User, Project
 from app.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
+from app.services import agenda, counters
+from app.utils.conditional import check_conditional, make_etag, validators
+from app.utils.ratelimit import rate_limit
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/projects", tags=["projects"])
+router = APIRouter(prefix="/projects", tags=["projects"], dependencies=[Depends(rate_limit("crud"))])
 
 
 @router.post("", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
@@ -17,28 +21,42 @@ async def create_project(
     current_user: User = Depends(get_current_user),
 ):
     """Create a new project."""
-    db_project = Project(**project_data.dict(), user_id=current_user.id)
-    db.add(db_project)
+    # RETURNING gives back the stored row, so no refresh SELECT after commit
+    project = db.execute(
+        insert(Project)
+        .values(**project_data.dict(), user_id=current_user.id)
+        .returning(*Project.__table__.c)
+    ).mappings().one()
     db.commit()
-    db.refresh(db_project)
-    logger.info(f"Project {db_project.id} created for user {current_user.id}")
-    return db_project
+    logger.info(f"Project {project['id']} created for user {current_user.id}")
+    return project
 
 
 @router.get("", response_model=list[ProjectResponse])
 async def list_projects(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    """List all projects for the current user."""
+    """List all projects for the current user (supports If-None-Match revalidation)."""
+    latest, count = db.query(func.max(Project.updated_at), func.count(Project.id)).filter(
+        Project.user_id == current_user.id
+    ).one()
+    etag = make_etag("projects", current_user.id, latest, count)
+    not_modified = check_conditional(request, etag)
+    if not_modified is not None:
+        return not_modified
+
     projects = db.query(Project).filter(Project.user_id == current_user.id).all()
+    response.headers.update(validators(etag))
     return projects
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get a project by ID."""
@@ -59,19 +77,19 @@ async def update_project(
     current_user: User = Depends(get_current_user),
 ):
     """Update a project."""
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
+    owned = (Project.id == project_id, Project.user_id == current_user.id)
+    update_data = project_data.dict(exclude_unset=True)
+    if update_data:
+        # One UPDATE ... RETURNING: no load before or refresh after
+        project = db.execute(
+            update(Project).where(*owned).values(**update_data).returning(*Project.__table__.c)
+        ).mappings().first()
+    else:
+        project = db.query(Project).filter(*owned).first()
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
-    update_data = project_data.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(project, field, value)
-
     db.commit()
-    db.refresh(project)
     logger.info(f"Project {project_id} updated for user {current_user.id}")
     return project
 
@@ -90,6 +108,8 @@ async def delete_project(
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
 
+    counters.record_project_deleted(db, current_user.id, project_id)
+    agenda.remove_project(db, current_user.id, project_id)
     db.delete(project)
     db.commit()
     logger.info(f"Project {project_id} deleted for user {current_user.id}")
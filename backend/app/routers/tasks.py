@@ -1,23 +1,35 @@
+import asyncio
 import logging
 from datetime import datetime
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user
+from app.config import get_settings
+from app.deps import get_db, get_read_db, get_current_user, shards
 from app.models import User
-from app.schemas import TaskCreate, TaskUpdate, TaskResponse
+from app.schemas import TaskCreate, TaskUpdate, TaskResponse, TaskPage, TaskEventPage
+from app.services.coalescing import task_updates
+from app.services.events import list_task_events
 from app.services.tasks import (
     create_task,
     get_task,
+    get_task_fields,
     list_tasks,
+    parse_fields,
+    task_collection_version,
     update_task,
     delete_task,
+    TaskConflictError,
 )
+from app.utils.conditional import check_conditional, make_etag, validators
+from app.utils.ratelimit import rate_limit
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/tasks", tags=["tasks"])
+router = APIRouter(prefix="/tasks", tags=["tasks"], dependencies=[Depends(rate_limit("crud"))])
+settings = get_settings()
 
 
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
@@ -34,9 +46,10 @@ async def create_task_endpoint(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
-@router.get("", response_model=dict)
+@router.get("", response_model=TaskPage, response_class=ORJSONResponse)
 async def list_tasks_endpoint(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     status_filter: Optional[str] = Query(None, alias="status"),
     project_id: Optional[int] = None,
@@ -44,9 +57,29 @@ async def list_tasks_endpoint(
     due_to: Optional[datetime] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to return, e.g. title,status"),
 ):
-    """List tasks with filters and pagination."""
-    tasks, total = list_tasks(
+    """
+    List tasks with filters and pagination.
+    Rows come back as plain dicts and are encoded directly with orjson; TaskPage
+    documents the shape without re-validating every item. With ``fields``, only
+    those columns (plus id) are selected and returned.
+    Supports If-None-Match revalidation against the collection version.
+    """
+    try:
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    latest, count = task_collection_version(db, current_user.id)
+    etag = make_etag("tasks", current_user.id, latest, count, request.url.query)
+    not_modified = check_conditional(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    # In the threadpool, so identical requests arriving meanwhile can join this query
+    items, total = await asyncio.to_thread(
+        list_tasks,
         db,
         current_user.id,
         status=status_filter,
@@ -55,28 +88,70 @@ async def list_tasks_endpoint(
         due_to=due_to,
         skip=skip,
         limit=limit,
+        fields=columns,
+        version=(latest, count),
+    )
+    return ORJSONResponse(
+        {"items": items, "total": total, "skip": skip, "limit": limit},
+        headers=validators(etag),
     )
-    return {
-        "items": [TaskResponse.from_orm(t) for t in tasks],
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-    }
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task_endpoint(
     task_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to return, e.g. title,status"),
 ):
-    """Get a task by ID."""
+    """Get a task by ID (optionally only the requested fields)."""
+    try:
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if columns is not None:
+        wanted = columns if "updated_at" in columns else columns + ["updated_at"]
+        row = get_task_fields(db, task_id, current_user.id, wanted)
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        updated_at = row["updated_at"] if "updated_at" in columns else row.pop("updated_at")
+        etag = make_etag("task", task_id, updated_at, fields)
+        return check_conditional(request, etag, updated_at) or ORJSONResponse(
+            row, headers=validators(etag, updated_at)
+        )
+
     db_task = get_task(db, task_id, current_user.id)
     if not db_task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    etag = make_etag("task", task_id, db_task.updated_at, None)
+    not_modified = check_conditional(request, etag, db_task.updated_at)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(validators(etag, db_task.updated_at))
     return db_task
 
 
+@router.get("/{task_id}/events", response_model=TaskEventPage)
+async def list_task_events_endpoint(
+    task_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """Task history, newest first, with cursor pagination."""
+    if get_task_fields(db, task_id, current_user.id, ["id"]) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    try:
+        events, next_cursor = list_task_events(db, task_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return TaskEventPage(items=events, next_cursor=next_cursor)
+
+
 @router.patch("/{task_id}", response_model=TaskResponse)
 async def update_task_endpoint(
     task_id: int,
@@ -84,13 +159,31 @@ async def update_task_endpoint(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Update a task."""
-    db_task = update_task(db, task_id, current_user.id, task_data)
+    """Update a task (with TASK_UPDATE_COALESCE_MS, bursts of PATCHes share one write)."""
+    try:
+        if settings.task_update_coalesce_ms > 0:
+            db_task = await task_updates.submit(
+                (current_user.id, task_id),
+                task_data,
+                lambda patch: _write_coalesced(task_id, current_user.id, patch),
+            )
+        else:
+            db_task = update_task(db, task_id, current_user.id, task_data)
+    except TaskConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     if not db_task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     return db_task
 
 
+def _write_coalesced(task_id: int, user_id: int, patch: TaskUpdate) -> Optional[TaskResponse]:
+    """Apply a merged burst in its own session; the result is shared by every request in the burst."""
+    with shards.session(user_id, write=True) as db:
+        db.info["routing_key"] = str(user_id)
+        db_task = update_task(db, task_id, user_id, patch)
+        return TaskResponse.model_validate(db_task) if db_task else None
+
+
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task_endpoint(
     task_id: int,
@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from pydantic import BaseModel, EmailStr, Field
 
-from app.models import TaskStatus
+from app.models import JobStatus, TaskEventType, TaskStatus
 
 
 # ============ Auth Schemas ============
@@ -31,6 +31,11 @@ class TokenRefresh(BaseModel):
     refresh_token: str
 
 
+class TokenRevoke(BaseModel):
+    """Token to revoke (e.g. a leaked one)."""
+    token: str
+
+
 # ============ Project Schemas ============
 
 class ProjectCreate(BaseModel):
@@ -103,6 +108,43 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class TaskPage(BaseModel):
+    """Paginated task list response."""
+    items: List[TaskResponse]
+    total: int
+    skip: int
+    limit: int
+
+
+class TaskEventResponse(BaseModel):
+    """Task history entry."""
+    id: int
+    event_type: TaskEventType
+    payload: Optional[Dict[str, Any]]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TaskEventPage(BaseModel):
+    """Page of task history, newest first; pass next_cursor to get older events."""
+    items: List[TaskEventResponse]
+    next_cursor: Optional[str] = None
+
+
+class AgendaItem(TaskResponse):
+    """Agenda task with its current urgency score."""
+    agenda_score: float
+    overdue: bool
+
+
+class AgendaResponse(BaseModel):
+    """Overdue and due-today tasks, most urgent first."""
+    items: List[AgendaItem]
+    until: datetime  # end of the requested day, UTC
+
+
 # ============ AI Schemas ============
 
 class TaskForPrioritization(BaseModel):
@@ -132,9 +174,84 @@ class PrioritizationResponse(BaseModel):
     plan: List[str]
 
 
+# ============ Job Schemas ============
+
+class JobResponse(BaseModel):
+    """Background job status; result is set once it has succeeded."""
+    id: int
+    kind: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    run_at: datetime
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobAccepted(BaseModel):
+    """Work queued as a background job (202 Accepted)."""
+    job_id: int
+    status: JobStatus
+    status_url: str
+    stream_url: str
+
+
 # ============ Health & Observability ============
 
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
     timestamp: datetime
+
+
+class DependencyCheck(BaseModel):
+    """Result of a single dependency probe."""
+    ok: bool
+    critical: bool = True
+    latency_ms: Optional[float] = None
+    detail: Optional[str] = None
+
+
+class ReadinessResponse(HealthResponse):
+    """Readiness check response with cached dependency probes."""
+    checks: Dict[str, DependencyCheck] = Field(default_factory=dict)
+    pool_saturation: float = 0.0
+    loop_lag_ms: float = 0.0
+    checked_at: Optional[datetime] = None
+
+
+# ============ Admin ============
+
+class ProfiledStatement(BaseModel):
+    """SQL statement executed during a profiled request."""
+    sql: str
+    duration_ms: float
+    rows: int
+    executemany: bool
+
+
+class ProfileSummary(BaseModel):
+    """Captured request profile, without the profile and SQL log."""
+    id: int
+    method: str
+    path: str
+    query: str
+    trigger: str
+    started_at: datetime
+    status: int
+    duration_ms: float
+    sql_ms: float
+    statement_count: int
+    dropped_statements: int
+    profiler: str
+
+
+class ProfileDetail(ProfileSummary):
+    """Captured request profile with stack profile and SQL log."""
+    statements: List[ProfiledStatement]
+    profile: str
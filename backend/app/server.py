@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import os
+import signal
+from types import FrameType
+from typing import Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app import lifecycle
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count(configured: int) -> int:
+    """Worker processes to run: the configured number, or one per CPU available to us."""
+    if configured > 0:
+        return configured
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    Uvicorn server that drains before it stops listening.
+
+    On the first SIGTERM/SIGINT the worker flips /readyz to "draining" and keeps
+    serving for ``shutdown_delay_seconds`` so the load balancer can take it out
+    of rotation; uvicorn then stops accepting connections and waits up to
+    ``graceful_timeout_seconds`` for in-flight requests. A second signal exits
+    immediately.
+    """
+
+    def __init__(self, config: uvicorn.Config, shutdown_delay: float):
+        super().__init__(config)
+        self.shutdown_delay = shutdown_delay
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        if lifecycle.phase() == "draining" or self.shutdown_delay <= 0:
+            super().handle_exit(sig, frame)
+            return
+
+        lifecycle.mark_draining()
+        logger.info(f"Received {signal.Signals(sig).name}, draining for {self.shutdown_delay:.0f}s")
+        asyncio.get_event_loop().call_later(self.shutdown_delay, super().handle_exit, sig, frame)
+
+
+class DrainingMultiprocess(Multiprocess):
+    """Signal every worker before waiting, so workers drain in parallel rather than one by one."""
+
+    def shutdown(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+
+
+def main() -> None:
+    """Run the API with one uvicorn worker process per CPU."""
+    settings = get_settings()
+    config = uvicorn.Config(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=worker_count(settings.web_concurrency),
+        lifespan="on",
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.graceful_timeout_seconds,
+    )
+    server = DrainingServer(config, shutdown_delay=settings.shutdown_delay_seconds)
+
+    if config.workers > 1:
+        # Same supervisor uvicorn.run() uses, but children run our server subclass.
+        sock = config.bind_socket()
+        DrainingMultiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.models import AgendaEntry, Task, TaskStatus
+from app.services import urgency
+from app.services.ai import TaskSnapshot, next_urgency_change, rule_based_score
+from app.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Task fields the agenda entry depends on; writes touching none of them skip the upsert
+AGENDA_FIELDS = frozenset({"status", "due_at", "priority", "estimated_minutes"})
+ROLLOVER_BATCH = 1000
+
+_SCORE_COLUMNS = (Task.id, Task.due_at, Task.priority, Task.estimated_minutes)
+
+
+def agenda_score(task: Mapping[str, Any], now: datetime) -> float:
+    """The rule-based priority score, as of ``now``."""
+    return rule_based_score(
+        TaskSnapshot(task["id"], "", task["due_at"], task["estimated_minutes"], task["priority"]), now
+    )
+
+
+def _entry(task: Mapping[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    if task["due_at"] is None or task["status"] == TaskStatus.DONE:
+        return None
+    return {
+        "task_id": task["id"],
+        "user_id": task["user_id"],
+        "due_at": task["due_at"],
+        "score": agenda_score(task, now),
+        "next_rollover_at": next_urgency_change(task["due_at"], now),
+    }
+
+
+def sync_task(db: Session, task: Mapping[str, Any], created: bool = False) -> None:
+    """
+    Add, rescore or drop a task's agenda entry inside the caller's transaction.
+    ``task`` holds the task's columns after the write (a TASK_LIST_COLUMNS row).
+    """
+    entry = _entry(task, datetime.utcnow())
+    if entry is None:
+        if not created:
+            remove_task(db, task["id"])
+        return
+    urgency.announce(db, task["id"], task["user_id"], task["due_at"], entry["next_rollover_at"])
+
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(AgendaEntry).values(entry)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AgendaEntry.task_id],
+        set_={name: stmt.excluded[name] for name in ("due_at", "score", "next_rollover_at")},
+    )
+    db.execute(stmt)
+
+
+def remove_task(db: Session, task_id: int) -> None:
+    db.execute(delete(AgendaEntry).where(AgendaEntry.task_id == task_id))
+    if urgency.index.running:
+        urgency.index.discard(task_id)
+
+
+def remove_project(db: Session, user_id: int, project_id: int) -> None:
+    db.execute(
+        delete(AgendaEntry).where(
+            AgendaEntry.user_id == user_id,
+            AgendaEntry.task_id.in_(select(Task.id).where(Task.project_id == project_id)),
+        )
+    )
+
+
+@traced()
+def get_agenda(db: Session, user_id: int, until: datetime, limit: int) -> List[Dict[str, Any]]:
+    """
+    The user's open tasks due before ``until`` (overdue included), most urgent
+    first. Walks ix_agenda_entries_user_id_score in response order and stops
+    at ``limit``, however large the user's overdue backlog. Scores are as
+    stored: the urgency index and the agenda_rollover job rescore entries
+    whose deadline bucket has rolled over.
+    """
+    now = datetime.utcnow()
+    rows = db.execute(
+        select(*Task.__table__.c, AgendaEntry.score.label("agenda_score"))
+        .join(AgendaEntry, AgendaEntry.task_id == Task.id)
+        .where(AgendaEntry.user_id == user_id, AgendaEntry.due_at < until)
+        .order_by(AgendaEntry.score.desc(), AgendaEntry.due_at, AgendaEntry.task_id)
+        .limit(limit)
+    ).mappings().all()
+    return [{**row, "overdue": row["due_at"] <= now} for row in rows]
+
+
+def refresh_rollovers(
+    db: Session,
+    now: Optional[datetime] = None,
+    task_ids: Optional[Iterable[int]] = None,
+    users: Optional[Select] = None,
+) -> int:
+    """
+    Rescore entries whose deadline bucket has rolled over (all of them, or
+    only ``task_ids`` / the users selected by ``users``); returns the number rescored.
+    """
+    now = now or datetime.utcnow()
+    entries = AgendaEntry.__table__
+    conditions = [AgendaEntry.next_rollover_at <= now]
+    if task_ids is not None:
+        conditions.append(AgendaEntry.task_id.in_(list(task_ids)))
+    if users is not None:
+        conditions.append(AgendaEntry.user_id.in_(users))
+    refreshed = 0
+    while True:
+        rows = db.execute(
+            select(*_SCORE_COLUMNS)
+            .join(AgendaEntry, AgendaEntry.task_id == Task.id)
+            .where(*conditions)
+            .limit(ROLLOVER_BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        db.execute(
+            update(entries)
+            .where(entries.c.task_id == bindparam("entry_id"))
+            .values(score=bindparam("new_score"), next_rollover_at=bindparam("next_at")),
+            [
+                {
+                    "entry_id": row["id"],
+                    "new_score": agenda_score(row, now),
+                    "next_at": next_urgency_change(row["due_at"], now),
+                }
+                for row in rows
+            ],
+        )
+        db.commit()
+        refreshed += len(rows)
+    if refreshed:
+        logger.info(f"Rescored {refreshed} agenda entries past a deadline bucket")
+    return refreshed
+
+
+def end_of_day(now: datetime, tz_offset_minutes: int = 0) -> datetime:
+    """End of the local day containing ``now`` (UTC), as naive UTC, for a fixed UTC offset."""
+    offset = timedelta(minutes=tz_offset_minutes)
+    local = now + offset
+    return datetime.combine(local.date() + timedelta(days=1), datetime.min.time()) - offset
@@ -1,21 +1,89 @@
 import logging
-from datetime import datetime
-from typing import List
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
 import json
 
-from openai import OpenAI, APIError
-
 from app.config import get_settings
 from app.schemas import TaskForPrioritization, PrioritizationResult
+from app.singleflight import SingleFlight
+from app.tracing import span, traced
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Initialize OpenAI client if API key provided
-openai_client = OpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
+# OpenAI client, created by the app lifespan (or lazily on first use outside the API)
+openai_client: "OpenAI | None" = None
+
+prioritizations = SingleFlight("prioritize")
+
+# OpenAI request parameters (part of the prioritization single-flight key)
+OPENAI_MODEL = "gpt-4o"
+OPENAI_TEMPERATURE = 0.7
+OPENAI_MAX_TOKENS = 1000
+
+
+def init_openai_client() -> "OpenAI | None":
+    """
+    Create the shared OpenAI client if an API key is configured. The SDK (and
+    httpx under it) is only imported here, so processes without a key never
+    load it.
+    """
+    global openai_client
+    if openai_client is None and settings.openai_api_key:
+        from openai import OpenAI
+
+        openai_client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
+    return openai_client
+
+
+def close_openai_client() -> None:
+    global openai_client
+    if openai_client is not None:
+        openai_client.close()
+        openai_client = None
 
 
-def calculate_deadline_urgency(due_at: datetime | None) -> float:
+@dataclass(slots=True)
+class TaskSnapshot:
+    """
+    The task fields scoring and planning read, built straight from a narrow
+    column select (see scoring.load_snapshots). Used instead of ORM objects
+    and TaskForPrioritization inside the service; pydantic models are only
+    built for API responses.
+    """
+    id: int
+    title: str
+    due_at: Optional[datetime]
+    estimated_minutes: Optional[int]
+    importance: int
+
+
+Scorable = TaskSnapshot | TaskForPrioritization
+
+
+@dataclass(slots=True)
+class ScoredTask:
+    """A task with its priority score and rationale."""
+    task: Scorable
+    score: float
+    rationale: str
+
+    def to_result(self) -> PrioritizationResult:
+        return PrioritizationResult(title=self.task.title, score=self.score, rationale=self.rationale)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"title": self.task.title, "score": self.score, "rationale": self.rationale}
+
+
+# (hours left before the deadline, urgency below it), tightest first
+DEADLINE_BUCKETS = ((1, 0.95), (6, 0.80), (24, 0.60), (72, 0.40))
+
+
+def calculate_deadline_urgency(due_at: datetime | None, now: datetime | None = None) -> float:
     """
     Calculate deadline urgency score (0-1).
     Higher score = more urgent.
@@ -23,22 +91,31 @@ def calculate_deadline_urgency(due_at: datetime | None) -> float:
     if due_at is None:
         return 0.1
 
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
     if due_at <= now:
         return 1.0  # Overdue
 
     hours_until_due = (due_at - now).total_seconds() / 3600
 
-    if hours_until_due < 1:
-        return 0.95
-    elif hours_until_due < 6:
-        return 0.80
-    elif hours_until_due < 24:
-        return 0.60
-    elif hours_until_due < 72:
-        return 0.40
-    else:
-        return 0.20
+    for hours, urgency in DEADLINE_BUCKETS:
+        if hours_until_due < hours:
+            return urgency
+    return 0.20
+
+
+def next_urgency_change(due_at: datetime | None, now: datetime | None = None) -> datetime | None:
+    """
+    When calculate_deadline_urgency(due_at) next changes: the next bucket
+    boundary (due - 72h, 24h, 6h, 1h, then due). None without a deadline or once overdue.
+    """
+    if due_at is None:
+        return None
+    now = now or datetime.utcnow()
+    for hours in [hours for hours, _ in reversed(DEADLINE_BUCKETS)] + [0]:
+        boundary = due_at - timedelta(hours=hours)
+        if boundary > now:
+            return boundary
+    return None
 
 
 def calculate_effort_inverse(estimated_minutes: int | None) -> float:
@@ -61,13 +138,13 @@ def calculate_effort_inverse(estimated_minutes: int | None) -> float:
         return 0.30
 
 
-def rule_based_score(task: TaskForPrioritization) -> float:
+def rule_based_score(task: Scorable, now: datetime | None = None) -> float:
     """
     Calculate task priority score using rule-based heuristic.
     Combines: deadline urgency, importance, and effort inverse.
     Returns score in [0, 1].
     """
-    deadline_urgency = calculate_deadline_urgency(task.due_at)
+    deadline_urgency = calculate_deadline_urgency(task.due_at, now)
     importance_norm = task.importance / 5.0  # Normalize to 0-1
     effort_inverse = calculate_effort_inverse(task.estimated_minutes)
 
@@ -81,13 +158,13 @@ def rule_based_score(task: TaskForPrioritization) -> float:
     return min(1.0, max(0.0, score))
 
 
-def generate_rule_based_rationale(task: TaskForPrioritization) -> str:
+def generate_rule_based_rationale(task: Scorable, now: datetime | None = None) -> str:
     """Generate a rule-based rationale for task prioritization."""
     factors = []
 
     # Deadline
     if task.due_at:
-        now = datetime.utcnow()
+        now = now or datetime.utcnow()
         hours_until = (task.due_at - now).total_seconds() / 3600
         if hours_until < 0:
             factors.append("overdue")
@@ -114,13 +191,16 @@ def generate_rule_based_rationale(task: TaskForPrioritization) -> str:
     return "; ".join(factors) + "."
 
 
-def prioritize_with_openai(tasks: List[TaskForPrioritization]) -> tuple[List[PrioritizationResult], List[str]]:
+@traced()
+def prioritize_with_openai(tasks: Sequence[Scorable]) -> tuple[List[PrioritizationResult], List[str]]:
     """
     Use OpenAI GPT-4 to prioritize tasks and generate a daily plan.
     Falls back to rule-based if API fails.
     """
-    if not openai_client or settings.ai_provider != "openai":
+    client = init_openai_client()
+    if not client or settings.ai_provider != "openai":
         return prioritize_rule_based(tasks)
+    from openai import APIError
 
     try:
         # Build task list for the prompt
@@ -150,12 +230,17 @@ Respond ONLY with a valid JSON object (no markdown, no extra text):
   "plan": ["09:00-10:30 Task 1", "10:45-11:15 Task 2", ...]
 }}"""
 
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=1000,
-        )
+        attributes = {"gen_ai.system": "openai", "gen_ai.request.model": OPENAI_MODEL, "taskflow.task_count": len(tasks)}
+        with span("openai.chat.completions", **attributes) as call:
+            response = client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=OPENAI_TEMPERATURE,
+                max_tokens=OPENAI_MAX_TOKENS,
+            )
+            if call is not None and response.usage is not None:
+                call.set_attribute("gen_ai.usage.input_tokens", response.usage.prompt_tokens)
+                call.set_attribute("gen_ai.usage.output_tokens", response.usage.completion_tokens)
 
         response_text = response.choices[0].message.content.strip()
 
@@ -172,39 +257,85 @@ Respond ONLY with a valid JSON object (no markdown, no extra text):
         return prioritize_rule_based(tasks)
 
 
-def prioritize_rule_based(tasks: List[TaskForPrioritization]) -> tuple[List[PrioritizationResult], List[str]]:
+def rank_rule_based(tasks: Sequence[Scorable], now: datetime | None = None) -> tuple[List[ScoredTask], List[str]]:
     """
-    Prioritize tasks using rule-based heuristic (no external API).
+    Score and sort tasks with the rule-based heuristic, and plan the top five.
+    Each result keeps its own task, so the plan needs no lookup by title.
     """
-    results = []
-    for task in tasks:
-        score = rule_based_score(task)
-        rationale = generate_rule_based_rationale(task)
-        results.append(PrioritizationResult(title=task.title, score=score, rationale=rationale))
+    now = now or datetime.utcnow()
+    scored = [
+        ScoredTask(task, rule_based_score(task, now), generate_rule_based_rationale(task, now))
+        for task in tasks
+    ]
 
     # Sort by score descending
-    results.sort(key=lambda x: x.score, reverse=True)
+    scored.sort(key=lambda item: item.score, reverse=True)
 
     # Generate simple daily plan from top tasks
     plan = []
     current_hour = 9  # Start at 9 AM
-    for i, result in enumerate(results[:5]):  # Plan top 5 tasks
-        # Find original task to get estimated time
-        orig_task = next((t for t in tasks if t.title == result.title), None)
-        duration = orig_task.estimated_minutes // 60 if orig_task and orig_task.estimated_minutes else 1
+    for item in scored[:5]:  # Plan top 5 tasks
+        minutes = item.task.estimated_minutes
+        duration = minutes // 60 if minutes else 1
         end_hour = min(current_hour + duration, 18)  # Don't go past 6 PM
-        plan.append(f"{current_hour:02d}:00-{end_hour:02d}:00 {result.title}")
+        plan.append(f"{current_hour:02d}:00-{end_hour:02d}:00 {item.task.title}")
         current_hour = end_hour + 1  # 1 hour break
 
-    return results, plan
+    return scored, plan
 
 
-def prioritize_tasks(tasks: List[TaskForPrioritization]) -> tuple[List[PrioritizationResult], List[str]]:
+@traced()
+def prioritize_rule_based(tasks: Sequence[Scorable]) -> tuple[List[PrioritizationResult], List[str]]:
+    """
+    Prioritize tasks using rule-based heuristic (no external API).
+    """
+    scored, plan = rank_rule_based(tasks)
+    return [item.to_result() for item in scored], plan
+
+
+@traced()
+def prioritize_tasks(
+    tasks: List[TaskForPrioritization], user_id: Optional[int] = None
+) -> tuple[List[PrioritizationResult], List[str]]:
     """
     Main function to prioritize tasks.
     Delegates to OpenAI or rule-based depending on settings.
+    Concurrent calls by the same user with the same tasks, provider and model
+    parameters share one prioritization (and one OpenAI request).
     """
-    if settings.ai_provider == "openai" and openai_client:
+    key = (
+        user_id,
+        settings.ai_provider,
+        OPENAI_MODEL,
+        OPENAI_TEMPERATURE,
+        OPENAI_MAX_TOKENS,
+        tuple((task.title, task.description, task.due_at, task.estimated_minutes, task.importance) for task in tasks),
+    )
+    return prioritizations.do(key, _prioritize_tasks, tasks)
+
+
+def _prioritize_tasks(tasks: List[TaskForPrioritization]) -> tuple[List[PrioritizationResult], List[str]]:
+    if settings.ai_provider == "openai" and init_openai_client():
         return prioritize_with_openai(tasks)
     else:
         return prioritize_rule_based(tasks)
+
+
+@traced()
+def prioritize_snapshots(tasks: List[TaskSnapshot]) -> tuple[List[ScoredTask], List[str]]:
+    """
+    prioritize_tasks for snapshots of saved tasks, without building pydantic
+    models. OpenAI results are matched back to tasks by title (first task wins
+    for duplicate titles) so every result carries its task id.
+    """
+    if settings.ai_provider == "openai" and init_openai_client():
+        results, plan = prioritize_with_openai(tasks)
+        by_title: Dict[str, TaskSnapshot] = {}
+        for task in tasks:
+            by_title.setdefault(task.title, task)
+        return [
+            ScoredTask(by_title[result.title], result.score, result.rationale)
+            for result in results
+            if result.title in by_title
+        ], plan
+    return rank_rule_based(tasks)
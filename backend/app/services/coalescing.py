@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Set, Tuple
+
+from prometheus_client import Counter
+
+from app.config import get_settings
+from app.schemas import TaskUpdate
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+coalesced_updates = Counter(
+    "taskflow_task_updates_coalesced_total", "Task PATCHes merged into another request's write"
+)
+
+BurstKey = Tuple[int, int]  # (user_id, task_id)
+
+
+class _Burst:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.patch: Dict[str, Any] = {}
+        self.requests = 0
+        self.result: asyncio.Future = loop.create_future()
+        # Nobody may be left awaiting (all clients gone); don't warn about it
+        self.result.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+
+class UpdateCoalescer:
+    """
+    Merge bursts of PATCHes to the same task into one write.
+
+    The first PATCH for a task opens a burst that is flushed ``window_ms``
+    later; PATCHes arriving meanwhile fold their fields into it (later values
+    win, as if applied in order). The flush runs ``apply(patch)`` once, in a
+    worker thread since it is a blocking DB write, from its own task so a
+    disconnecting client cannot abandon the others; every request in the
+    burst gets its result. A burst therefore costs one UPDATE
+    and one UPDATED event. Bursts are per worker process; writes from other
+    workers are serialized by update_task (row lock or version check).
+    """
+
+    def __init__(self, window_ms: float):
+        self.window = window_ms / 1000
+        self._bursts: Dict[BurstKey, _Burst] = {}
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, key: BurstKey, task_update: TaskUpdate, apply: Callable[[TaskUpdate], Any]) -> Any:
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst(asyncio.get_running_loop())
+            flush = asyncio.create_task(self._flush(key, burst, apply))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        else:
+            coalesced_updates.inc()
+        burst.patch.update(task_update.dict(exclude_unset=True))
+        burst.requests += 1
+        return await asyncio.shield(burst.result)
+
+    async def _flush(self, key: BurstKey, burst: _Burst, apply: Callable[[TaskUpdate], Any]) -> None:
+        await asyncio.sleep(self.window)
+        # Later PATCHes start a new burst; this one's patch is now frozen
+        del self._bursts[key]
+        try:
+            # A blocking DB write (and its retries): keep it off the event loop
+            result = await asyncio.to_thread(apply, TaskUpdate(**burst.patch))
+        except Exception as e:
+            burst.result.set_exception(e)
+            return
+        burst.result.set_result(result)
+        if burst.requests > 1:
+            logger.debug(f"Coalesced {burst.requests} updates to task {key[1]}")
+
+
+task_updates = UpdateCoalescer(settings.task_update_coalesce_ms)
@@ -0,0 +1,162 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.models import Task, TaskCounter
+
+logger = logging.getLogger(__name__)
+
+ALL_PROJECTS = 0
+ALL_STATUSES = "*"
+
+CounterKey = Tuple[int, str]
+
+
+def _status_key(status) -> str:
+    """Normalize a TaskStatus member or raw string to the stored counter key."""
+    if status is None:
+        return ALL_STATUSES
+    return getattr(status, "value", status)
+
+
+def _rollup_keys(project_id: int, status) -> list[CounterKey]:
+    """All counter rows a single task contributes to."""
+    status = _status_key(status)
+    return [
+        (project_id, status),
+        (project_id, ALL_STATUSES),
+        (ALL_PROJECTS, status),
+        (ALL_PROJECTS, ALL_STATUSES),
+    ]
+
+
+def _bump(db: Session, user_id: int, deltas: Dict[CounterKey, int]) -> None:
+    """Apply counter deltas in one upsert statement inside the caller's transaction."""
+    rows = [
+        {"user_id": user_id, "project_id": project_id, "status": status, "count": delta}
+        for (project_id, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(TaskCounter).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskCounter.user_id, TaskCounter.project_id, TaskCounter.status],
+        set_={"count": TaskCounter.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def record_created(db: Session, user_id: int, project_id: int, status) -> None:
+    """Count a newly created task."""
+    _bump(db, user_id, {key: 1 for key in _rollup_keys(project_id, status)})
+
+
+def record_deleted(db: Session, user_id: int, project_id: int, status) -> None:
+    """Uncount a deleted task."""
+    _bump(db, user_id, {key: -1 for key in _rollup_keys(project_id, status)})
+
+
+def record_status_change(db: Session, user_id: int, project_id: int, old_status, new_status) -> None:
+    """Move a task between status counters; the all-status rollups are unchanged."""
+    old_status, new_status = _status_key(old_status), _status_key(new_status)
+    if old_status == new_status:
+        return
+    _bump(db, user_id, {
+        (project_id, old_status): -1,
+        (project_id, new_status): 1,
+        (ALL_PROJECTS, old_status): -1,
+        (ALL_PROJECTS, new_status): 1,
+    })
+
+
+def record_project_deleted(db: Session, user_id: int, project_id: int) -> None:
+    """Drop a project's counters and subtract its tasks from the user-wide rollups."""
+    rows = db.query(TaskCounter).filter(
+        TaskCounter.user_id == user_id,
+        TaskCounter.project_id == project_id,
+    ).all()
+
+    deltas: Dict[CounterKey, int] = {}
+    for row in rows:
+        deltas[(ALL_PROJECTS, row.status)] = -row.count
+        db.delete(row)
+    db.flush()
+    _bump(db, user_id, deltas)
+
+
+def get_count(
+    db: Session,
+    user_id: int,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> int:
+    """Look up a maintained task total (single primary-key read)."""
+    count = db.query(TaskCounter.count).filter(
+        TaskCounter.user_id == user_id,
+        TaskCounter.project_id == (project_id or ALL_PROJECTS),
+        TaskCounter.status == _status_key(status),
+    ).scalar()
+    return count or 0
+
+
+def reconcile_counters(db: Session, user_id: Optional[int] = None, users: Optional[Select] = None) -> int:
+    """
+    Recompute counters from the tasks table and repair any drift, for one
+    user or all of them (only those selected by ``users``, if given).
+    Returns the number of counter rows that were corrected.
+    """
+    counter_query = db.query(TaskCounter)
+    task_query = db.query(Task.user_id, Task.project_id, Task.status, func.count(Task.id))
+    if user_id is not None:
+        counter_query = counter_query.filter(TaskCounter.user_id == user_id)
+        task_query = task_query.filter(Task.user_id == user_id)
+    if users is not None:
+        counter_query = counter_query.filter(TaskCounter.user_id.in_(users))
+        task_query = task_query.filter(Task.user_id.in_(users))
+
+    # Lock existing counter rows before counting so concurrent writers queue
+    # behind the repair instead of being overwritten by it.
+    existing = {
+        (row.user_id, row.project_id, row.status): row
+        for row in counter_query.with_for_update().all()
+    }
+
+    expected: Dict[tuple, int] = defaultdict(int)
+    for owner_id, project_id, status, count in task_query.group_by(
+        Task.user_id, Task.project_id, Task.status
+    ):
+        for key in _rollup_keys(project_id, status):
+            expected[(owner_id, *key)] += count
+
+    fixed = 0
+    for key in expected.keys() | existing.keys():
+        want = expected.get(key, 0)
+        row = existing.get(key)
+        if row is None:
+            db.add(TaskCounter(user_id=key[0], project_id=key[1], status=key[2], count=want))
+        elif row.count != want:
+            row.count = want
+        else:
+            continue
+        fixed += 1
+        logger.warning(f"Counter drift repaired for {key}: expected {want}")
+
+    db.commit()
+    return fixed
+
+
+if __name__ == "__main__":
+    from app.deps import shards
+
+    logging.basicConfig(level=logging.INFO)
+    repaired = sum(reconcile_counters(session) for session in shards.sessions())
+    logger.info(f"Counter reconciliation finished, {repaired} rows repaired")
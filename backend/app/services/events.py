@@ -0,0 +1,253 @@
+import base64
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, text, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app.models import TaskEvent, TaskEventType
+
+logger = logging.getLogger(__name__)
+
+COMPACT_BATCH_TASKS = 500
+PARTITION_PREFIX = "task_events_p"
+DEFAULT_PARTITION = "task_events_default"
+
+
+# ============ History ============
+
+def encode_cursor(event: TaskEvent) -> str:
+    raw = f"{event.created_at.isoformat()}|{event.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, event_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(event_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def list_task_events(
+    db: Session, task_id: int, limit: int = 50, cursor: Optional[str] = None
+) -> Tuple[List[TaskEvent], Optional[str]]:
+    """
+    A task's events, newest first, keyset-paginated on (created_at, id).
+    Each page is one range scan of ix_task_events_task_id_created_at_id,
+    however deep the history; returns the events and the next page's cursor.
+    """
+    query = db.query(TaskEvent).filter(TaskEvent.task_id == task_id)
+    if cursor:
+        query = query.filter(tuple_(TaskEvent.created_at, TaskEvent.id) < tuple_(*decode_cursor(cursor)))
+    events = query.order_by(TaskEvent.created_at.desc(), TaskEvent.id.desc()).limit(limit + 1).all()
+    if len(events) > limit:
+        return events[:limit], encode_cursor(events[limit - 1])
+    return events, None
+
+
+# ============ Compaction ============
+
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def compact_events(db: Session, before: datetime) -> int:
+    """
+    Fold UPDATED events older than ``before`` into one SNAPSHOT per task and
+    calendar month (so a snapshot stays in its events' partition). The
+    snapshot's payload holds the last value written to each field plus the
+    folded range; runs of a single event are left alone. Returns the number
+    of events folded. ``before`` is rounded down to a month start so each
+    month is compacted exactly once.
+    """
+    before = datetime.combine(_month_start(before), datetime.min.time())
+    folded = 0
+    last_task_id = 0
+    while True:
+        task_ids = db.scalars(
+            select(TaskEvent.task_id)
+            .where(
+                TaskEvent.event_type == TaskEventType.UPDATED,
+                TaskEvent.created_at < before,
+                TaskEvent.task_id > last_task_id,
+            )
+            .group_by(TaskEvent.task_id)
+            .order_by(TaskEvent.task_id)
+            .limit(COMPACT_BATCH_TASKS)
+        ).all()
+        if not task_ids:
+            break
+        last_task_id = task_ids[-1]
+
+        runs = defaultdict(list)
+        for event in db.execute(
+            select(TaskEvent.id, TaskEvent.task_id, TaskEvent.payload, TaskEvent.created_at)
+            .where(
+                TaskEvent.event_type == TaskEventType.UPDATED,
+                TaskEvent.created_at < before,
+                TaskEvent.task_id.in_(task_ids),
+            )
+            .order_by(TaskEvent.task_id, TaskEvent.created_at, TaskEvent.id)
+        ):
+            runs[(event.task_id, _month_start(event.created_at))].append(event)
+
+        snapshots, folded_ids = [], []
+        for (task_id, _), events in runs.items():
+            if len(events) < 2:
+                continue
+            changes = {}
+            for event in events:
+                changes.update(event.payload or {})
+            snapshots.append({
+                "task_id": task_id,
+                "event_type": TaskEventType.SNAPSHOT,
+                "payload": {
+                    "changes": changes,
+                    "folded": len(events),
+                    "first_at": events[0].created_at.isoformat(),
+                    "last_at": events[-1].created_at.isoformat(),
+                },
+                "created_at": events[-1].created_at,
+            })
+            folded_ids.extend(event.id for event in events)
+
+        if snapshots:
+            db.execute(insert(TaskEvent), snapshots)
+            db.execute(delete(TaskEvent).where(TaskEvent.id.in_(folded_ids), TaskEvent.created_at < before))
+        db.commit()
+        folded += len(folded_ids)
+    return folded
+
+
+# ============ Partitions and retention ============
+
+def _is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'task_events'"
+    )).scalar())
+
+
+def _partitions(db: Session) -> List[str]:
+    return db.scalars(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'task_events' ORDER BY c.relname"
+    )).all()
+
+
+def _create_partition(db: Session, name: str, month: date, has_default: bool) -> int:
+    """
+    Create one monthly partition in a single transaction; returns the number of
+    rows moved into it. Postgres refuses to create a partition while the
+    DEFAULT partition holds rows in its range (left there by a missed
+    maintenance run), so those are moved: detach DEFAULT, create the partition,
+    re-insert the month's rows from DEFAULT through the parent, reattach.
+    """
+    start, end = month.isoformat(), _next_month(month).isoformat()
+    create = f"CREATE TABLE {name} PARTITION OF task_events FOR VALUES FROM ('{start}') TO ('{end}')"
+    in_range = {"start": start, "end": end}
+    stranded = has_default and db.execute(
+        text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end LIMIT 1"),
+        in_range,
+    ).scalar()
+    if not stranded:
+        db.execute(text(create))
+        db.commit()
+        return 0
+
+    db.execute(text(f"ALTER TABLE task_events DETACH PARTITION {DEFAULT_PARTITION}"))
+    db.execute(text(create))
+    moved = db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+            f"INSERT INTO task_events SELECT * FROM moved"
+        ),
+        in_range,
+    ).rowcount
+    db.execute(text(f"ALTER TABLE task_events ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    db.commit()
+    return moved
+
+
+def ensure_partitions(db: Session, months_ahead: int) -> List[str]:
+    """
+    Create monthly partitions up to ``months_ahead`` past the current month.
+    A partition that can't be created is logged and skipped (retried on the
+    next run), so the rest of maintenance still runs.
+    """
+    if not _is_partitioned(db):
+        return []
+    existing = set(_partitions(db))
+    created = []
+    month = _month_start(datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        name = f"{PARTITION_PREFIX}{month:%Y%m}"
+        if name not in existing:
+            try:
+                moved = _create_partition(db, name, month, DEFAULT_PARTITION in existing)
+            except SQLAlchemyError:
+                db.rollback()
+                logger.exception(f"Could not create event partition {name}")
+            else:
+                if moved:
+                    logger.info(f"Moved {moved} events from {DEFAULT_PARTITION} into {name}")
+                created.append(name)
+        month = _next_month(month)
+    return created
+
+
+def drop_expired(db: Session, before: datetime) -> int:
+    """
+    Remove events older than ``before``. On a partitioned table whole monthly
+    partitions below the cutoff are dropped (no row-by-row delete or vacuum);
+    stragglers in the default partition, or any other database, are deleted.
+    Returns the number of partitions dropped plus rows deleted.
+    """
+    removed = 0
+    if _is_partitioned(db):
+        cutoff = f"{PARTITION_PREFIX}{_month_start(before):%Y%m}"
+        for name in _partitions(db):
+            if name.startswith(PARTITION_PREFIX) and name < cutoff:
+                db.execute(text(f"ALTER TABLE task_events DETACH PARTITION {name}"))
+                db.execute(text(f"DROP TABLE {name}"))
+                logger.info(f"Dropped expired event partition {name}")
+                removed += 1
+        before = datetime.combine(_month_start(before), datetime.min.time())
+    result = db.execute(delete(TaskEvent).where(TaskEvent.created_at < before))
+    db.commit()
+    return removed + result.rowcount
+
+
+def run_maintenance(db: Session, settings: Settings) -> dict:
+    """Partition upkeep, compaction and retention, per the event_* settings."""
+    now = datetime.utcnow()
+    summary = {"partitions_created": ensure_partitions(db, settings.event_partition_months_ahead)}
+    if settings.event_compact_after_days:
+        summary["events_folded"] = compact_events(db, now - timedelta(days=settings.event_compact_after_days))
+    if settings.event_retention_days:
+        summary["expired_removed"] = drop_expired(db, now - timedelta(days=settings.event_retention_days))
+    return summary
+
+
+if __name__ == "__main__":
+    from app.config import get_settings
+    from app.deps import shards
+
+    logging.basicConfig(level=logging.INFO)
+    summary = [run_maintenance(session, get_settings()) for session in shards.sessions()]
+    logger.info(f"Event maintenance finished: {summary}")
@@ -0,0 +1,105 @@
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Task, TaskStatus
+from app.services.ai import ScoredTask, TaskSnapshot, prioritize_snapshots, rule_based_score
+from app.services.tasks import task_collection_version
+from app.singleflight import SingleFlight
+from app.tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
+saved_prioritizations = SingleFlight("prioritize_saved")
+
+
+# In TaskSnapshot field order
+SNAPSHOT_COLUMNS = (Task.id, Task.title, Task.due_at, Task.estimated_minutes, Task.priority)
+
+
+def load_snapshots(db: Session, user_id: int, project_id: Optional[int] = None) -> List[TaskSnapshot]:
+    """The user's open tasks as TaskSnapshots: one narrow select, no ORM objects."""
+    query = select(*SNAPSHOT_COLUMNS).where(Task.user_id == user_id, Task.status != TaskStatus.DONE)
+    if project_id:
+        query = query.where(Task.project_id == project_id)
+    return [TaskSnapshot(*row) for row in db.execute(query)]
+
+
+@traced()
+def score_saved_tasks(
+    db: Session, read_db: Session, user_id: int, project_id: Optional[int] = None
+) -> Optional[Tuple[List[ScoredTask], List[str]]]:
+    """
+    Prioritize a user's open tasks and store the scores; None when there are none.
+    The task scan may be served by a read replica; scores are written to the primary.
+    Runs inline for POST /ai/prioritize-saved and in the worker for background jobs;
+    concurrent calls for the same user, project and task collection version
+    share one run, so a caller arriving after a write never gets pre-write scores.
+    """
+    key = (user_id, project_id, task_collection_version(db, user_id))
+    return saved_prioritizations.do(key, _score_saved_tasks, db, read_db, user_id, project_id)
+
+
+def _score_saved_tasks(
+    db: Session, read_db: Session, user_id: int, project_id: Optional[int]
+) -> Optional[Tuple[List[ScoredTask], List[str]]]:
+    with span("ai.scan_tasks") as scan:
+        tasks = load_snapshots(read_db, user_id, project_id)
+        if scan is not None:
+            scan.set_attribute("taskflow.task_count", len(tasks))
+    if not tasks:
+        return None
+
+    scored, plan = prioritize_snapshots(tasks)
+
+    # Update AI scores in database; updated_at moves so collection ETags change
+    scored_at = datetime.utcnow()
+    scores = [{"task_id": item.task.id, "score": item.score} for item in scored]
+    with span("ai.write_scores", **{"taskflow.task_count": len(scores)}):
+        if scores:
+            # Unconditional write (no version check) that still bumps the version,
+            # so concurrent ORM updates of these tasks re-read before committing
+            tasks_table = Task.__table__
+            db.execute(
+                update(tasks_table)
+                .where(tasks_table.c.id == bindparam("task_id"))
+                .values(ai_score=bindparam("score"), updated_at=scored_at, version=tasks_table.c.version + 1),
+                scores,
+            )
+        db.commit()
+    logger.info(f"Prioritized {len(tasks)} saved tasks for user {user_id}")
+    return scored, plan
+
+
+def rescore_tasks(db: Session, task_ids: Iterable[int], now: Optional[datetime] = None) -> int:
+    """
+    Refresh the stored ai_score of already-scored open tasks that crossed a
+    deadline bucket, with the rule-based score: no AI call, no quota. Only
+    rows whose score changes are written; updated_at moves with them (their
+    ETags must change) but the version doesn't, as no field a PATCH checks
+    did. Returns the number of tasks rescored.
+    """
+    now = now or datetime.utcnow()
+    rows = db.execute(
+        select(*SNAPSHOT_COLUMNS, Task.ai_score).where(
+            Task.id.in_(list(task_ids)), Task.status != TaskStatus.DONE, Task.ai_score.is_not(None)
+        )
+    ).all()
+    scores = []
+    for row in rows:
+        score = rule_based_score(TaskSnapshot(*row[:len(SNAPSHOT_COLUMNS)]), now)
+        if score != row.ai_score:
+            scores.append({"task_id": row.id, "score": score})
+    if scores:
+        tasks_table = Task.__table__
+        db.execute(
+            update(tasks_table)
+            .where(tasks_table.c.id == bindparam("task_id"))
+            .values(ai_score=bindparam("score"), updated_at=now),
+            scores,
+        )
+    db.commit()
+    return len(scores)
@@ -1,17 +1,114 @@
 import logging
-from typing import Optional, List
+from typing import Any, Dict, Hashable, Optional, List, Sequence
 from datetime import datetime
 
+from sqlalchemy import func, insert, literal, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.models import Task, TaskEvent, TaskEventType, Project
 from app.schemas import TaskCreate, TaskUpdate
+from app.services import agenda, counters
+from app.singleflight import SingleFlight
+from app.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+UPDATE_ATTEMPTS = 3
+# Dialects taking the single-statement RETURNING write paths; others use the ORM
+RETURNING_DIALECTS = ("postgresql", "sqlite")
 
-def create_task(db: Session, task_create: TaskCreate, user_id: int) -> Task:
-    """Create a new task."""
+# Columns returned by task list reads, in TaskResponse field order
+TASK_LIST_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.due_at,
+    Task.estimated_minutes,
+    Task.priority,
+    Task.ai_score,
+    Task.tags,
+    Task.project_id,
+    Task.user_id,
+    Task.created_at,
+    Task.updated_at,
+)
+TASK_FIELDS = {column.key: column for column in TASK_LIST_COLUMNS}
+
+task_lists = SingleFlight("task_list")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a sparse fieldset ("title,status") into column names, always including id.
+    Returns None for "all fields"; raises ValueError on unknown names.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [name for name in dict.fromkeys(names) if name != "id"]
+
+
+def _columns(fields: Optional[Sequence[str]]) -> tuple:
+    if fields is None:
+        return TASK_LIST_COLUMNS
+    return tuple(TASK_FIELDS[name] for name in fields)
+
+
+def _task_row(db_task: Task) -> Dict[str, Any]:
+    return {column.key: getattr(db_task, column.key) for column in TASK_LIST_COLUMNS}
+
+
+def _returning_supported(db: Session) -> bool:
+    """INSERT ... SELECT ... RETURNING and UPDATE ... FROM ... RETURNING (Postgres, SQLite 3.35+)."""
+    return db.get_bind().dialect.name in RETURNING_DIALECTS
+
+
+@traced()
+def create_task(db: Session, task_create: TaskCreate, user_id: int) -> Dict[str, Any]:
+    """
+    Create a new task; returns its TaskResponse fields.
+    The ownership check, insert and readback are a single INSERT ... SELECT ...
+    RETURNING, followed by the event insert and counter upsert in the same commit.
+    """
+    if not _returning_supported(db):
+        return _create_task_orm(db, task_create, user_id)
+
+    now = datetime.utcnow()
+    values = {**task_create.dict(), "user_id": user_id, "created_at": now, "updated_at": now, "version": 1}
+    tasks = Task.__table__
+    # The project filter doubles as the ownership check: no row, no insert
+    source = select(*(literal(value, tasks.c[name].type) for name, value in values.items())).where(
+        Project.id == task_create.project_id,
+        Project.user_id == user_id,
+    )
+    row = db.execute(
+        insert(tasks).from_select(list(values), source).returning(*TASK_LIST_COLUMNS)
+    ).mappings().first()
+    if row is None:
+        db.rollback()
+        raise ValueError(f"Project {task_create.project_id} not found or not owned by user")
+    task = dict(row)
+
+    db.execute(insert(TaskEvent.__table__), [{
+        "task_id": task["id"],
+        "event_type": TaskEventType.CREATED,
+        "payload": {"status": task["status"].value},
+        "created_at": now,
+    }])
+    counters.record_created(db, user_id, task["project_id"], task["status"])
+    agenda.sync_task(db, task, created=True)
+    db.commit()
+
+    logger.info(f"Task {task['id']} created for user {user_id}")
+    return task
+
+
+def _create_task_orm(db: Session, task_create: TaskCreate, user_id: int) -> Dict[str, Any]:
     # Verify project exists and belongs to user
     project = db.query(Project).filter(
         Project.id == task_create.project_id,
@@ -35,13 +132,16 @@ def create_task(db: Session, task_create: TaskCreate, user_id: int) -> Task:
         payload={"status": db_task.status.value}
     )
     db.add(event)
+    counters.record_created(db, user_id, db_task.project_id, db_task.status)
+    agenda.sync_task(db, _task_row(db_task), created=True)
     db.commit()
     db.refresh(db_task)
 
     logger.info(f"Task {db_task.id} created for user {user_id}")
-    return db_task
+    return _task_row(db_task)
 
 
+@traced()
 def get_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
     """Get a task by ID (check ownership)."""
     return db.query(Task).filter(
@@ -50,6 +150,27 @@ def get_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
     ).first()
 
 
+@traced()
+def get_task_fields(db: Session, task_id: int, user_id: int, fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """Get only the requested columns of a task (check ownership)."""
+    row = db.query(*_columns(fields)).filter(
+        Task.id == task_id,
+        Task.user_id == user_id
+    ).first()
+    return row._asdict() if row else None
+
+
+@traced()
+def task_collection_version(db: Session, user_id: int) -> tuple[Optional[datetime], int]:
+    """
+    Version of a user's task collection for ETags: newest updated_at plus the
+    maintained total. Creates and updates move the first, deletes the second.
+    """
+    latest = db.query(func.max(Task.updated_at)).filter(Task.user_id == user_id).scalar()
+    return latest, counters.get_count(db, user_id)
+
+
+@traced()
 def list_tasks(
     db: Session,
     user_id: int,
@@ -59,9 +180,36 @@ def list_tasks(
     due_to: Optional[datetime] = None,
     skip: int = 0,
     limit: int = 20,
-) -> tuple[List[Task], int]:
-    """List tasks for a user with filters and pagination."""
-    query = db.query(Task).filter(Task.user_id == user_id)
+    fields: Optional[Sequence[str]] = None,
+    version: Hashable = None,
+) -> tuple[List[Dict[str, Any]], int]:
+    """
+    List tasks for a user with filters and pagination.
+    Rows are fetched as plain column tuples (no ORM identity map) and returned as
+    dicts; ``fields`` limits the SELECT to those columns (see parse_fields).
+
+    Concurrent calls with the same user, filters and ``version`` (the
+    collection version the caller's ETag was built from) share one query and
+    its result, which must not be mutated.
+    """
+    key = (user_id, status, project_id, due_from, due_to, skip, limit, tuple(fields or ()), version)
+    return task_lists.do(
+        key, _list_tasks, db, user_id, status, project_id, due_from, due_to, skip, limit, fields
+    )
+
+
+def _list_tasks(
+    db: Session,
+    user_id: int,
+    status: Optional[str],
+    project_id: Optional[int],
+    due_from: Optional[datetime],
+    due_to: Optional[datetime],
+    skip: int,
+    limit: int,
+    fields: Optional[Sequence[str]],
+) -> tuple[List[Dict[str, Any]], int]:
+    query = db.query(*_columns(fields)).filter(Task.user_id == user_id)
 
     if status:
         query = query.filter(Task.status == status)
@@ -72,13 +220,91 @@ def list_tasks(
     if due_to:
         query = query.filter(Task.due_at <= due_to)
 
-    total = query.count()
-    tasks = query.order_by(Task.created_at.desc()).offset(skip).limit(limit).all()
-    return tasks, total
+    # Unfiltered and status/project-filtered totals come from maintained counters;
+    # only date-range filters still need a COUNT(*).
+    if due_from or due_to:
+        total = query.count()
+    else:
+        total = counters.get_count(db, user_id, project_id=project_id, status=status)
+    rows = query.order_by(Task.created_at.desc()).offset(skip).limit(limit).all()
+    return [row._asdict() for row in rows], total
+
+
+class TaskConflictError(Exception):
+    """A task kept changing underneath an update (optimistic concurrency retries exhausted)."""
+
+
+@traced()
+def update_task(db: Session, task_id: int, user_id: int, task_update: TaskUpdate) -> Optional[Dict[str, Any]]:
+    """
+    Update a task; returns its TaskResponse fields, or None if not found.
+
+    Where supported this is a version read and an UPDATE ... RETURNING guarded
+    by that version (plus the event inserts), so the new state needs no
+    refresh. Concurrent writers are caught by the version column: a stale
+    write raises StaleDataError and the patch is re-applied to fresh state.
+    """
+    for attempt in range(UPDATE_ATTEMPTS):
+        try:
+            if _returning_supported(db):
+                return _update_task_returning(db, task_id, user_id, task_update)
+            return _apply_update(db, task_id, user_id, task_update)
+        except StaleDataError:
+            db.rollback()
+            logger.info(f"Task {task_id} changed concurrently, retrying update (attempt {attempt + 1})")
+    raise TaskConflictError(f"Task {task_id} was modified concurrently")
+
+
+def _update_task_returning(db: Session, task_id: int, user_id: int, task_update: TaskUpdate) -> Optional[Dict[str, Any]]:
+    update_data = task_update.dict(exclude_unset=True)
+    if not update_data:
+        row = db.query(*TASK_LIST_COLUMNS).filter(Task.id == task_id, Task.user_id == user_id).first()
+        return row._asdict() if row else None
+
+    now = datetime.utcnow()
+    tasks = Task.__table__
+    owned = (tasks.c.id == task_id, tasks.c.user_id == user_id)
+    # RETURNING only sees new values: read the old status, and guard the write
+    # with the version it was read at so a concurrent write can't be lost
+    current = db.execute(select(tasks.c.status, tasks.c.version).where(*owned)).first()
+    if current is None:
+        return None
+    row = db.execute(
+        update(tasks)
+        .where(*owned, tasks.c.version == current.version)
+        .values(**update_data, updated_at=now, version=tasks.c.version + 1)
+        .returning(*TASK_LIST_COLUMNS)
+    ).mappings().first()
+    if row is None:
+        db.rollback()
+        raise StaleDataError(f"Task {task_id} version changed during update")
+    task = dict(row)
+    old_status = current.status
+
+    events = []
+    if "status" in update_data and task["status"] != old_status:
+        events.append({
+            "task_id": task_id,
+            "event_type": TaskEventType.STATUS_CHANGED,
+            "payload": {"from": old_status.value, "to": task["status"].value},
+            "created_at": now,
+        })
+        counters.record_status_change(db, user_id, task["project_id"], old_status, task["status"])
+    events.append({
+        "task_id": task_id,
+        "event_type": TaskEventType.UPDATED,
+        "payload": task_update.model_dump(mode="json", exclude_unset=True),
+        "created_at": now,
+    })
+    db.execute(insert(TaskEvent.__table__), events)
+    if agenda.AGENDA_FIELDS.intersection(update_data):
+        agenda.sync_task(db, task)
+    db.commit()
+    logger.info(f"Task {task_id} updated for user {user_id}")
+    return task
 
 
-def update_task(db: Session, task_id: int, user_id: int, task_update: TaskUpdate) -> Optional[Task]:
-    """Update a task."""
+def _apply_update(db: Session, task_id: int, user_id: int, task_update: TaskUpdate) -> Optional[Dict[str, Any]]:
     db_task = get_task(db, task_id, user_id)
     if not db_task:
         return None
@@ -97,27 +323,33 @@ def update_task(db: Session, task_id: int, user_id: int, task_update: TaskUpdate
             payload={"from": old_status.value, "to": update_data["status"].value}
         )
         db.add(event)
+        counters.record_status_change(db, user_id, db_task.project_id, old_status, update_data["status"])
 
     if update_data:
         event = TaskEvent(
             task_id=task_id,
             event_type=TaskEventType.UPDATED,
-            payload=update_data
+            payload=task_update.model_dump(mode="json", exclude_unset=True)  # JSON-safe dates/enums
         )
         db.add(event)
 
+    if agenda.AGENDA_FIELDS.intersection(update_data):
+        agenda.sync_task(db, _task_row(db_task))
     db.commit()
     db.refresh(db_task)
     logger.info(f"Task {task_id} updated for user {user_id}")
-    return db_task
+    return _task_row(db_task)
 
 
+@traced()
 def delete_task(db: Session, task_id: int, user_id: int) -> bool:
     """Delete a task."""
     db_task = get_task(db, task_id, user_id)
     if not db_task:
         return False
 
+    counters.record_deleted(db, user_id, db_task.project_id, db_task.status)
+    agenda.remove_task(db, task_id)
     db.delete(db_task)
     db.commit()
     logger.info(f"Task {task_id} deleted for user {user_id}")
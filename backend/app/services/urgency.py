@@ -0,0 +1,261 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.cache import get_redis
+from app.models import AgendaEntry
+from app.services.ai import calculate_deadline_urgency, next_urgency_change
+
+logger = logging.getLogger(__name__)
+
+# Longest the dispatcher sleeps without re-checking the clock
+MAX_WAIT_SECONDS = 60.0
+
+# Boundaries written by API processes that fall this soon are announced to the
+# worker over Redis; later ones are loaded by its load_window ticks in time
+ANNOUNCE_HORIZON = timedelta(seconds=60)
+ANNOUNCE_CHANNEL = "urgency:boundaries"
+
+
+@dataclass(frozen=True)
+class UrgencyChange:
+    """A task crossed a deadline bucket boundary."""
+    task_id: int
+    user_id: int
+    due_at: datetime
+    crossed_at: datetime  # the boundary
+    urgency: float  # calculate_deadline_urgency from now on
+
+
+Listener = Callable[[List[UrgencyChange]], None]
+
+
+class UrgencyIndex:
+    """
+    Upcoming deadline-bucket transitions, one per task, in a min-heap.
+
+    ``schedule`` (re)places a task at its next boundary (due - 72h, 24h, 6h,
+    1h, due); superseded heap entries are skipped lazily when they surface.
+    Once started, a dispatcher thread sleeps until the earliest boundary and
+    passes every task that crossed one to the listeners, then re-schedules
+    it at its following boundary. Scheduling an earlier boundary wakes the
+    dispatcher, so changes are emitted when they happen rather than on a poll.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, int]] = []  # (fire_at, seq, task_id)
+        self._entries: Dict[int, Tuple[int, int, datetime, datetime]] = {}  # task_id -> (seq, user_id, due_at, fire_at)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._listeners: List[Listener] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def schedule(
+        self, task_id: int, user_id: int, due_at: Optional[datetime],
+        fire_at: Optional[datetime] = None, now: Optional[datetime] = None,
+    ) -> Optional[datetime]:
+        """
+        Track a task's next boundary (``fire_at`` if known, e.g. a stored
+        next_rollover_at, which may already have passed). Returns it, or None
+        (and stops tracking) when the task has no boundary left.
+        """
+        fire_at = fire_at or next_urgency_change(due_at, now)
+        with self._cond:
+            if fire_at is None:
+                self._entries.pop(task_id, None)
+                return None
+            current = self._entries.get(task_id)
+            if current is not None and current[2:] == (due_at, fire_at):
+                return fire_at
+            seq = next(self._seq)
+            self._entries[task_id] = (seq, user_id, due_at, fire_at)
+            heapq.heappush(self._heap, (fire_at, seq, task_id))
+            if self._heap[0][1] == seq:
+                self._cond.notify()  # earlier than what the dispatcher is waiting for
+        return fire_at
+
+    def discard(self, task_id: int) -> None:
+        with self._cond:
+            self._entries.pop(task_id, None)
+
+    def _prune(self) -> None:
+        while self._heap:
+            _, seq, task_id = self._heap[0]
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[0] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def next_fire_at(self) -> Optional[datetime]:
+        with self._cond:
+            self._prune()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[UrgencyChange]:
+        """Take every task whose boundary is at or before ``now`` and re-schedule it."""
+        changes = []
+        with self._cond:
+            while True:
+                self._prune()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                fire_at, _, task_id = heapq.heappop(self._heap)
+                _, user_id, due_at, _ = self._entries.pop(task_id)
+                # Urgency just past the boundary (buckets are open at the upper edge)
+                urgency = calculate_deadline_urgency(due_at, max(now, fire_at + timedelta(microseconds=1)))
+                changes.append(UrgencyChange(task_id, user_id, due_at, fire_at, urgency))
+                following = next_urgency_change(due_at, max(now, fire_at))
+                if following is not None:
+                    seq = next(self._seq)
+                    self._entries[task_id] = (seq, user_id, due_at, following)
+                    heapq.heappush(self._heap, (following, seq, task_id))
+        return changes
+
+    def fire(self, now: Optional[datetime] = None) -> List[UrgencyChange]:
+        """Emit due changes to the listeners (a listener error doesn't stop the others)."""
+        changes = self.pop_due(now or datetime.utcnow())
+        if changes:
+            for listener in self._listeners:
+                try:
+                    listener(changes)
+                except Exception:
+                    logger.exception("Urgency listener failed")
+        return changes
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="urgency-index", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                self._prune()
+                if not self._heap:
+                    self._cond.wait(MAX_WAIT_SECONDS)
+                    continue
+                wait = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                if wait > 0:
+                    self._cond.wait(min(wait, MAX_WAIT_SECONDS))
+                    continue
+            self.fire()
+
+
+def load_window(db: Session, urgency_index: UrgencyIndex, until: datetime) -> int:
+    """
+    Schedule every agenda entry whose next rollover is before ``until``
+    (including overdue ones, which fire at once). agenda_entries carries each
+    task write's next boundary, so this feeds writes from any process.
+    """
+    rows = db.execute(
+        select(AgendaEntry.task_id, AgendaEntry.user_id, AgendaEntry.due_at, AgendaEntry.next_rollover_at)
+        .where(AgendaEntry.next_rollover_at < until)
+    ).all()
+    for row in rows:
+        urgency_index.schedule(row.task_id, row.user_id, row.due_at, fire_at=row.next_rollover_at)
+    return len(rows)
+
+
+def announce(db: Session, task_id: int, user_id: int, due_at: datetime, fire_at: Optional[datetime]) -> None:
+    """
+    Hand a written task's next boundary to the urgency index: directly when it
+    runs in this process, otherwise (API processes) published to the worker
+    once ``db`` commits, if the boundary falls before its next load_window.
+    """
+    if index.running:
+        index.schedule(task_id, user_id, due_at, fire_at=fire_at)
+        return
+    if fire_at is None or fire_at >= datetime.utcnow() + ANNOUNCE_HORIZON:
+        return
+    pending = db.info.get("urgency_announcements")
+    if pending is None:
+        pending = db.info["urgency_announcements"] = []
+        event.listen(db, "after_commit", _publish_announcements)
+        event.listen(db, "after_soft_rollback", _drop_announcements)
+    pending.append({"task_id": task_id, "user_id": user_id, "due_at": due_at.isoformat(), "fire_at": fire_at.isoformat()})
+
+
+def _drop_announcements(db: Session, previous_transaction) -> None:
+    db.info.get("urgency_announcements", []).clear()
+
+
+def _publish_announcements(db: Session) -> None:
+    pending = db.info.get("urgency_announcements")
+    if not pending:
+        return
+    messages, pending[:] = list(pending), []
+    client = get_redis()
+    if client is None:
+        return  # without Redis the worker picks them up on its next load_window
+    try:
+        pipe = client.pipeline(transaction=False)
+        for message in messages:
+            pipe.publish(ANNOUNCE_CHANNEL, json.dumps(message))
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not announce {len(messages)} urgency boundaries: {e}")
+
+
+def follow_announcements(urgency_index: UrgencyIndex, stop: threading.Event, poll_seconds: float = 1.0) -> None:
+    """Schedule the boundaries API processes announce until ``stop`` is set (the worker runs this in a thread)."""
+    client = get_redis()
+    if client is None:
+        return
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(ANNOUNCE_CHANNEL)
+        while not stop.is_set():
+            try:
+                message = pubsub.get_message(timeout=poll_seconds)
+            except RedisError:
+                logger.exception("Urgency announcements unavailable; relying on load_window")
+                stop.wait(poll_seconds)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            boundary = json.loads(message["data"])
+            urgency_index.schedule(
+                boundary["task_id"],
+                boundary["user_id"],
+                datetime.fromisoformat(boundary["due_at"]),
+                fire_at=datetime.fromisoformat(boundary["fire_at"]),
+            )
+    finally:
+        pubsub.close()
+
+
+# Per process; started by the worker (python -m app.worker)
+index = UrgencyIndex()
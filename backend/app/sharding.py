@@ -0,0 +1,423 @@
+"""
+Per-user sharding.
+
+Every row of user data (projects, tasks, task events, counters, agenda) is
+owned by one user, so each user's rows live together in one database. The
+primary (DATABASE_URL) is the directory: users, jobs and revoked tokens live
+there, and users.shard records each user's database (NULL = the primary). New
+users are placed by a consistent hash ring; existing users only move with the
+rebalance tool:
+
+    python -m app.sharding status
+    python -m app.sharding prepare          # create tables, separate id ranges
+    python -m app.sharding move USER_ID SHARD
+    python -m app.sharding rebalance [--dry-run]
+"""
+import argparse
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql import Select
+
+from app.config import Settings
+from app.db import build_engine
+from app.models import AgendaEntry, Base, Project, Task, TaskCounter, TaskEvent, User
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "primary"
+
+# Per-user tables, parents first
+SHARDED_TABLES = [
+    Project.__table__,
+    Task.__table__,
+    TaskEvent.__table__,
+    TaskCounter.__table__,
+    AgendaEntry.__table__,
+]
+# Each shard allocates ids from its own range so moved rows keep theirs:
+# shard n (primary = 0) uses [n * ID_RANGE + 1, (n + 1) * ID_RANGE]
+ID_RANGE = 100_000_000
+SERIAL_TABLES = ("projects", "tasks", "task_events")
+COPY_BATCH = 1000
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hashing of user ids onto shard names. Each shard owns
+    ``virtual_nodes`` points on the ring, so adding a shard moves about 1/n
+    of the users, all of them to the new shard.
+    """
+
+    def __init__(self, names: List[str], virtual_nodes: int = 64):
+        points = sorted((_hash(f"{name}#{i}"), name) for name in names for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def lookup(self, user_id: int) -> str:
+        index = bisect.bisect(self._hashes, _hash(str(user_id))) % len(self._hashes)
+        return self._names[index]
+
+
+class ShardMoving(Exception):
+    """The user's rows are being moved to another shard; writes must wait."""
+
+
+class Shard:
+    def __init__(self, name: str, index: int, engine: Engine, session_factory: Callable[[], Session]):
+        self.name = name
+        self.index = index
+        self.engine = engine
+        self.session_factory = session_factory
+
+
+class ShardRouter:
+    """
+    Picks the database holding a user's rows.
+
+    Placements are read from the directory (users.shard on the primary) and
+    cached per process for SHARD_DIRECTORY_TTL_SECONDS. Write sessions are
+    fenced (see _fence_writes), so a stale placement can read from a shard
+    the user is leaving but never write to it; a move waits out the TTL
+    after switching shards before deleting the old rows.
+    """
+
+    def __init__(self, settings: Settings, primary_engine: Engine, primary_factory: Callable[[], Session]):
+        self.shards: Dict[str, Shard] = {PRIMARY: Shard(PRIMARY, 0, primary_engine, primary_factory)}
+        for index, url in enumerate(settings.database_shard_urls, start=1):
+            name = f"shard{index}"
+            engine = build_engine(url, settings, name=name)
+            self.shards[name] = Shard(name, index, engine, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+        self.ring = HashRing(list(self.shards), settings.shard_virtual_nodes)
+        self.ttl = settings.shard_directory_ttl_seconds
+        self._placements: Dict[int, Tuple[float, str, bool]] = {}  # user_id -> (expires, shard, moving)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.shards) > 1
+
+    @property
+    def primary(self) -> Shard:
+        return self.shards[PRIMARY]
+
+    def placement(self, user_id: int, fresh: bool = False) -> Tuple[str, bool]:
+        """(shard name, moving) for a user; unknown users are on the primary."""
+        if not self.enabled:
+            return PRIMARY, False
+        now = time.monotonic()
+        cached = self._placements.get(user_id)
+        if cached is not None and cached[0] > now and not fresh:
+            return cached[1], cached[2]
+        with self.primary.session_factory() as db:
+            row = db.execute(select(User.shard, User.shard_moving).where(User.id == user_id)).first()
+        shard, moving = (row.shard or PRIMARY, row.shard_moving) if row else (PRIMARY, False)
+        with self._lock:
+            self._placements[user_id] = (now + self.ttl, shard, moving)
+            if len(self._placements) > 100_000:
+                self._placements = {k: v for k, v in self._placements.items() if v[0] > now}
+        return shard, moving
+
+    def shard_for(self, user_id: int) -> Shard:
+        return self.shards[self.placement(user_id)[0]]
+
+    def check_writable(self, user_id: int) -> None:
+        if self.enabled and self.placement(user_id)[1]:
+            raise ShardMoving(f"User {user_id} is moving between shards")
+
+    def open_session(self, user_id: Optional[int], write: bool = False) -> Session:
+        """
+        A session on the user's shard (the primary for anonymous callers).
+        With ``write``, its transactions are fenced against moves of the user.
+        """
+        if user_id is None:
+            return self.primary.session_factory()
+        shard = self.shard_for(user_id)
+        db = shard.session_factory()
+        db.info["shard"] = shard.name
+        if write and self.enabled:
+            db.info["write_fence"] = user_id
+        return db
+
+    @contextmanager
+    def session(self, user_id: Optional[int], write: bool = False) -> Iterator[Session]:
+        db = self.open_session(user_id, write)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def sessions(self) -> Iterator[Session]:
+        """One session per shard, in turn (for maintenance across all users)."""
+        for shard in self.shards.values():
+            with shard.session_factory() as db:
+                db.info["shard"] = shard.name
+                yield db
+
+    def settled_users(self, db: Session) -> Optional[Select]:
+        """
+        Ids of the users a maintenance pass over ``db`` (from ``sessions``) may
+        write for: placed on that shard and not moving. None when unsharded.
+        """
+        if not self.enabled:
+            return None
+        return select(User.id).where(
+            User.shard_moving.is_(False), func.coalesce(User.shard, PRIMARY) == db.info["shard"]
+        )
+
+    def place_new_user(self, db: Session, user_id: int) -> str:
+        """
+        Choose a new user's shard by the ring and copy their directory row
+        there (shard tables reference users). Commits ``db`` (the primary).
+        """
+        name = self.ring.lookup(user_id) if self.enabled else PRIMARY
+        if name != PRIMARY:
+            user = db.execute(select(User.__table__).where(User.id == user_id)).mappings().one()
+            with self.shards[name].session_factory() as shard_db:
+                shard_db.execute(insert(User.__table__).values(dict(user, shard=name)))
+                shard_db.commit()
+            db.execute(update(User).where(User.id == user_id).values(shard=name))
+        db.commit()
+        return name
+
+
+@event.listens_for(Session, "after_begin")
+def _fence_writes(session: Session, transaction, connection) -> None:
+    """
+    Every transaction of a write session (``open_session(write=True)``)
+    starts by share-locking the user's row on its own database, and is
+    refused with ShardMoving if the user is moving or now placed elsewhere.
+    move_user freezes a user by updating that row, which waits for the
+    transactions holding it; after that no write can reach the source,
+    however stale the writer's cached placement.
+    """
+    user_id = session.info.get("write_fence")
+    if user_id is None:
+        return
+    row = connection.execute(
+        select(User.shard, User.shard_moving).where(User.id == user_id).with_for_update(read=True)
+    ).first()
+    if row is None or row.shard_moving or (row.shard or PRIMARY) != session.info["shard"]:
+        raise ShardMoving(f"User {user_id} is moving between shards")
+
+
+# ============ Moving users ============
+
+def _user_filter(table, user_id: int):
+    if table is TaskEvent.__table__:
+        return table.c.task_id.in_(select(Task.id).where(Task.user_id == user_id))
+    return table.c.user_id == user_id
+
+
+def _user_batches(db: Session, table, user_id: int, columns=None) -> Iterator[List[Dict[str, Any]]]:
+    """The user's rows of ``table`` (or just ``columns``), COPY_BATCH at a time in primary key order."""
+    key = list(table.primary_key.columns)
+    query = select(*(columns or table.columns)).where(_user_filter(table, user_id)).order_by(*key).limit(COPY_BATCH)
+    after = None
+    while True:
+        batch = db.execute(query if after is None else query.where(tuple_(*key) > after)).mappings().all()
+        if not batch:
+            return
+        yield [dict(row) for row in batch]
+        after = tuple(batch[-1][column.name] for column in key)
+
+
+def _keyed(table, rows: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, Any]]:
+    return {tuple(row[column.name] for column in table.primary_key.columns): row for row in rows}
+
+
+def sync_user(source: Session, target: Session, user_id: int) -> Dict[str, int]:
+    """
+    Make the user's rows on ``target`` equal to those on ``source``, a batch
+    of COPY_BATCH rows at a time (keyset-paginated, so memory stays bounded):
+    deletes (children first), then inserts and updates (parents first).
+    Returns the number of rows changed per table.
+    """
+    changes = {table.name: 0 for table in SHARDED_TABLES}
+    for table in reversed(SHARDED_TABLES):
+        key = list(table.primary_key.columns)
+        for batch in _user_batches(target, table, user_id, key):
+            present = list(_keyed(table, batch))
+            kept = source.execute(select(*key).where(tuple_(*key).in_(present))).all()
+            stale = set(present) - {tuple(row) for row in kept}
+            if stale:
+                target.execute(delete(table).where(tuple_(*key).in_(list(stale))))
+                changes[table.name] += len(stale)
+    for table in SHARDED_TABLES:
+        key = list(table.primary_key.columns)
+        for batch in _user_batches(source, table, user_id):
+            wanted = _keyed(table, batch)
+            present = _keyed(table, [
+                dict(row) for row in target.execute(select(table).where(tuple_(*key).in_(list(wanted)))).mappings()
+            ])
+            new = [row for pk, row in wanted.items() if pk not in present]
+            changed = [row for pk, row in wanted.items() if pk in present and present[pk] != row]
+            if new:
+                target.execute(insert(table), new)
+            for row in changed:
+                target.execute(update(table).where(*(column == row[column.name] for column in key)).values(row))
+            changes[table.name] += len(new) + len(changed)
+        target.commit()
+    return changes
+
+
+def delete_user_rows(db: Session, user_id: int, keep_user: bool) -> None:
+    for table in reversed(SHARDED_TABLES):
+        db.execute(delete(table).where(_user_filter(table, user_id)))
+    if not keep_user:
+        db.execute(delete(User).where(User.id == user_id))
+    db.commit()
+
+
+def move_user(router: ShardRouter, user_id: int, target_name: str, sleep: Callable[[float], None] = time.sleep) -> bool:
+    """
+    Move a user's rows to ``target_name`` while they keep using the API:
+
+    1. copy everything to the target (reads and writes continue on the source);
+    2. freeze the user's writes (503 with Retry-After): set shard_moving in
+       the directory and on the user's row on the source. The update waits
+       for write transactions in flight there, and later ones are refused
+       (see _fence_writes), API requests and jobs alike;
+    3. copy what changed meanwhile, switch users.shard and unfreeze;
+    4. wait out the directory TTL (processes still reading the source), then
+       delete the rows from the source.
+
+    Returns False if the user is already there.
+    """
+    source_name, _ = router.placement(user_id, fresh=True)
+    if source_name == target_name:
+        return False
+    source, target = router.shards[source_name], router.shards[target_name]
+
+    with router.primary.session_factory() as directory, source.session_factory() as src, target.session_factory() as dst:
+        if target_name != PRIMARY:
+            user = directory.execute(select(User.__table__).where(User.id == user_id)).mappings().one()
+            if dst.get(User, user_id) is None:
+                dst.execute(insert(User.__table__).values(dict(user, shard=target_name)))
+        copied = sync_user(src, dst, user_id)
+        logger.info(f"User {user_id}: copied {copied} from {source_name} to {target_name}")
+
+        # The source's user row stays frozen until it is deleted (the directory
+        # row, on the primary, fences by its shard column once switched)
+        freeze = update(User).where(User.id == user_id).values(shard_moving=True)
+        directory.execute(freeze)
+        directory.commit()
+        switched = False
+        try:
+            if source_name != PRIMARY:
+                src.execute(freeze)
+                src.commit()
+            caught_up = sync_user(src, dst, user_id)
+            logger.info(f"User {user_id}: caught up {caught_up}")
+            switched = True
+        finally:
+            # On failure the user stays on the source; the next attempt re-syncs the target
+            values = {"shard_moving": False}
+            if switched:
+                values["shard"] = None if target_name == PRIMARY else target_name
+            elif source_name != PRIMARY:
+                src.rollback()
+                src.execute(update(User).where(User.id == user_id).values(shard_moving=False))
+                src.commit()
+            directory.execute(update(User).where(User.id == user_id).values(**values))
+            directory.commit()
+
+        sleep(router.ttl)
+        delete_user_rows(src, user_id, keep_user=source_name == PRIMARY)
+    logger.info(f"User {user_id}: moved from {source_name} to {target_name}")
+    return True
+
+
+def rebalance(router: ShardRouter, dry_run: bool = False, limit: Optional[int] = None) -> List[Tuple[int, str, str]]:
+    """Move users whose shard differs from their ring placement; returns (user, from, to) moves."""
+    with router.primary.session_factory() as db:
+        users = db.execute(select(User.id, User.shard).order_by(User.id)).all()
+    moves = [
+        (user.id, user.shard or PRIMARY, router.ring.lookup(user.id))
+        for user in users
+        if (user.shard or PRIMARY) != router.ring.lookup(user.id)
+    ][:limit]
+    for user_id, _, target in moves:
+        if not dry_run:
+            move_user(router, user_id, target)
+    return moves
+
+
+def prepare(router: ShardRouter) -> None:
+    """Create missing tables on every shard and give each its own id range (Postgres)."""
+    for shard in router.shards.values():
+        Base.metadata.create_all(bind=shard.engine)
+        if shard.engine.dialect.name != "postgresql":
+            logger.warning(f"Shard {shard.name}: id ranges are only set on Postgres")
+            continue
+        with shard.engine.begin() as conn:
+            for table in SERIAL_TABLES:
+                floor = shard.index * ID_RANGE
+                current = conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+                last = max(current, floor)
+                # is_called=false on an empty range, or the first id handed out would be 2
+                conn.execute(
+                    text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :value, :called)"),
+                    {"table": table, "value": last or 1, "called": last > 0},
+                )
+                if current > floor + ID_RANGE:
+                    logger.warning(f"Shard {shard.name}: {table} ids already exceed its range")
+        logger.info(f"Shard {shard.name} prepared (ids from {shard.index * ID_RANGE + 1})")
+
+
+def status(router: ShardRouter) -> Dict[str, Dict[str, int]]:
+    """Users per shard, and how many the ring would place elsewhere."""
+    with router.primary.session_factory() as db:
+        users = db.execute(select(User.id, User.shard)).all()
+    summary = {name: {"users": 0, "misplaced": 0} for name in router.shards}
+    for user in users:
+        name = user.shard or PRIMARY
+        summary.setdefault(name, {"users": 0, "misplaced": 0})
+        summary[name]["users"] += 1
+        if router.ring.lookup(user.id) != name:
+            summary[name]["misplaced"] += 1
+    return summary
+
+
+def main() -> None:
+    from app.deps import shards
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="users per shard")
+    commands.add_parser("prepare", help="create tables and id ranges on every shard")
+    move = commands.add_parser("move", help="move one user")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard", choices=list(shards.shards))
+    balance = commands.add_parser("rebalance", help="move users to their ring placement")
+    balance.add_argument("--dry-run", action="store_true")
+    balance.add_argument("--limit", type=int, default=None, help="move at most this many users")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        for name, counts in status(shards).items():
+            print(f"{name:12} {counts['users']:8} users {counts['misplaced']:8} to move")
+    elif args.command == "prepare":
+        prepare(shards)
+    elif args.command == "move":
+        move_user(shards, args.user_id, args.shard)
+    else:
+        for user_id, source, target in rebalance(shards, dry_run=args.dry_run, limit=args.limit):
+            print(f"user {user_id}: {source} -> {target}{' (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from prometheus_client import Counter
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+coalesced_calls = Counter(
+    "taskflow_singleflight_coalesced_total", "Calls that shared another caller's in-flight result", ["flight"]
+)
+flight_calls = Counter("taskflow_singleflight_calls_total", "Calls made through a single-flight group", ["flight"])
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "shared")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one.
+
+    The first ``do(key, fn)`` runs ``fn``; calls with that key arriving while
+    it runs wait for it and get the same result (or exception) instead of
+    repeating the work. Nothing is cached: once the call returns, the next
+    one runs afresh. Callers share the returned object, so they must not
+    mutate it. Keys must capture everything the result depends on. Flights
+    are per process and thread-safe: API requests join from the threadpool,
+    worker jobs from their claim threads.
+    """
+
+    def __init__(self, name: str, enabled: Optional[bool] = None):
+        self.name = name
+        self.enabled = get_settings().singleflight_enabled if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        flight_calls.labels(self.name).inc()
+        if not self.enabled:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.shared += 1
+        if not leader:
+            coalesced_calls.labels(self.name).inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.shared:
+                logger.debug(f"{self.name}: {call.shared} concurrent calls shared one result")
+        return call.result
@@ -0,0 +1,308 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.cache import get_redis
+from app.config import Settings, get_settings
+from app.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+claims_cache_lookups = Counter(
+    "taskflow_auth_claims_cache_total", "JWT verifications by claims cache outcome", ["result"]
+)
+revocation_checks = Counter(
+    "taskflow_auth_revocation_checks_total", "Token revocation checks by outcome", ["result"]
+)
+
+Claims = Dict[str, Any]
+
+
+class ClaimsCache:
+    """Decoded claims of recently verified tokens, LRU-bounded, each kept until its exp."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[str, Claims]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str, now: float) -> Optional[Claims]:
+        with self._lock:
+            claims = self._entries.get(token)
+            if claims is None:
+                return None
+            if claims["exp"] <= now:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: Claims) -> None:
+        with self._lock:
+            self._entries[token] = claims
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class TokenVerifier:
+    """
+    Signature and expiry checks for our JWTs, with the decoded claims of
+    tokens seen before served from a ClaimsCache. A cached entry is keyed by
+    the exact token string whose signature was checked, so a hit is as good as
+    a decode until the token expires. Revocation is checked separately
+    (RevocationList) on every request. Returned claims are shared; don't mutate.
+    """
+
+    def __init__(self, secret: str, algorithm: str, cache_size: int):
+        self.secret = secret
+        self.algorithms = [algorithm]
+        self.cache = ClaimsCache(cache_size) if cache_size > 0 else None
+
+    def verify(self, token: str) -> Claims:
+        """Decoded claims of a valid token; raises JWTError otherwise."""
+        if self.cache is not None:
+            claims = self.cache.get(token, time.time())
+            if claims is not None:
+                claims_cache_lookups.labels("hit").inc()
+                return claims
+            claims_cache_lookups.labels("miss").inc()
+        from jose import jwt  # deferred: jose.jwt loads the crypto backends
+
+        claims = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        if self.cache is not None and isinstance(claims.get("exp"), (int, float)):
+            self.cache.put(token, claims)
+        return claims
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings; no false negatives, no removal."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item: str) -> List[int]:
+        # Double hashing (Kirsch-Mitzenmacher): k positions from one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self.positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class RevocationList:
+    """
+    Revoked token ids (jti), stored exactly in revoked_tokens.
+
+    Almost every check is answered "not revoked" by bloom filters without
+    touching the database; only a filter hit (a revoked token, or a false
+    positive at JWT_REVOCATION_ERROR_RATE) is confirmed with a primary key
+    lookup. The in-process filter is loaded from revoked_tokens and re-synced
+    every JWT_REVOCATION_SYNC_SECONDS, so revocations made by other processes
+    apply within that interval. Bloom filters can't forget, so every
+    JWT_REVOCATION_REBUILD_SECONDS the filter is rebuilt from the unexpired
+    revocations only. With Redis, recent revocations are also kept in a shared
+    bitmap (one GETBIT pipeline per check), so they apply at once: one bitmap
+    per rebuild window, each written during its own and the previous window
+    and expiring after its own. Anything older is in every process's filter.
+    """
+
+    redis_key = "auth:revoked"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        settings: Settings,
+        redis_client: Callable = get_redis,
+    ):
+        self.session_factory = session_factory
+        self.capacity = settings.jwt_revocation_capacity
+        self.error_rate = settings.jwt_revocation_error_rate
+        self.sync_seconds = settings.jwt_revocation_sync_seconds
+        self.rebuild_seconds = max(settings.jwt_revocation_rebuild_seconds, self.sync_seconds)
+        self.redis_client = redis_client
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self._synced_at = -math.inf  # monotonic time of the last sync
+        self._rebuilt_at = -math.inf  # monotonic time of the last rebuild
+        self._cursor: Optional[datetime] = None  # newest revoked_at loaded
+        self._sync_lock = threading.Lock()
+        self._redis_failed = False
+
+    def _redis(self, fn: Callable) -> Any:
+        client = self.redis_client()
+        if client is None:
+            return None
+        try:
+            result = fn(client.pipeline(transaction=False))
+        except RedisError as e:
+            if not self._redis_failed:
+                logger.warning(f"Token revocation falling back to the in-process filter: {e}")
+                self._redis_failed = True
+            return None
+        self._redis_failed = False
+        return result
+
+    def _generation(self) -> int:
+        return int(time.time() // self.rebuild_seconds)
+
+    def _bitmap(self, generation: int) -> str:
+        return f"{self.redis_key}:{generation}"
+
+    def _add(self, jti: str) -> None:
+        self.bloom.add(jti)
+        positions = self.bloom.positions(jti)
+        generation = self._generation()
+
+        def setbits(pipe):
+            for window in (generation, generation + 1):
+                key = self._bitmap(window)
+                for position in positions:
+                    pipe.setbit(key, position, 1)
+                pipe.expireat(key, math.ceil((window + 1) * self.rebuild_seconds))
+            return pipe.execute()
+
+        self._redis(setbits)
+
+    def might_be_revoked(self, jti: str) -> bool:
+        """Bloom filter check: False means certainly not revoked."""
+        self.maybe_sync()
+        if jti in self.bloom:
+            return True
+        positions = self.bloom.positions(jti)
+        key = self._bitmap(self._generation())
+
+        def getbits(pipe):
+            for position in positions:
+                pipe.getbit(key, position)
+            return all(pipe.execute())
+
+        return bool(self._redis(getbits))
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:  # issued before tokens carried an id
+            return False
+        if not self.might_be_revoked(jti):
+            revocation_checks.labels("negative").inc()
+            return False
+        with self.session_factory() as db:
+            revoked = db.get(RevokedToken, jti) is not None
+        revocation_checks.labels("revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    def revoke(self, jti: str, expires_at: datetime, user_id: Optional[int] = None) -> bool:
+        """
+        Revoke a token id; False if it already was, so concurrent uses of one
+        refresh token can only rotate it once.
+        """
+        with self.session_factory() as db:
+            dialect = db.get_bind().dialect.name
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            result = db.execute(
+                insert(RevokedToken)
+                .values(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+                .returning(RevokedToken.jti)
+            )
+            # A returned row, not rowcount: SQLAlchemy reports -1 for INSERTs on psycopg
+            inserted = result.first() is not None
+            db.commit()
+        self._add(jti)
+        return inserted
+
+    def revoke_claims(self, claims: Claims) -> bool:
+        """Revoke a verified token; False if it has no jti (older tokens) or already was revoked."""
+        if claims.get("jti") is None:
+            return False
+        sub = claims.get("sub")
+        return self.revoke(
+            claims["jti"], datetime.utcfromtimestamp(claims["exp"]), int(sub) if sub is not None else None
+        )
+
+    def maybe_sync(self) -> None:
+        if time.monotonic() - self._synced_at < self.sync_seconds:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # another thread is syncing
+        try:
+            self._synced_at = time.monotonic()
+            with self.session_factory() as db:
+                if self._synced_at - self._rebuilt_at >= self.rebuild_seconds:
+                    self.rebuild(db)
+                else:
+                    self.sync(db)
+        except Exception:
+            logger.exception("Token revocation sync failed")
+        finally:
+            self._sync_lock.release()
+
+    def _load(self, db: Session, bloom: BloomFilter, since: Optional[datetime]) -> int:
+        now = datetime.utcnow()
+        query = select(RevokedToken.jti, RevokedToken.revoked_at).where(RevokedToken.expires_at > now)
+        if since is not None:
+            query = query.where(RevokedToken.revoked_at >= since)
+        rows = db.execute(query).all()
+        for row in rows:
+            bloom.add(row.jti)
+            if self._cursor is None or row.revoked_at > self._cursor:
+                self._cursor = row.revoked_at
+        if self._cursor is None:
+            self._cursor = now
+        return len(rows)
+
+    def sync(self, db: Session) -> int:
+        """Add unexpired revocations made since the last sync to the in-process filter."""
+        since = None
+        if self._cursor is not None:
+            # Overlap by a sync interval: rows may commit with an earlier revoked_at
+            # than ones already seen (adding twice is harmless)
+            since = self._cursor - timedelta(seconds=self.sync_seconds)
+        return self._load(db, self.bloom, since)
+
+    def rebuild(self, db: Session) -> int:
+        """Replace the in-process filter with one holding only the unexpired revocations."""
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        # Revocations added to the old filter while this runs are picked up by
+        # the next sync, which overlaps the cursor by a sync interval
+        self._cursor = None
+        loaded = self._load(db, bloom, None)
+        self.bloom = bloom
+        self._rebuilt_at = time.monotonic()
+        logger.info(f"Token revocation filter rebuilt with {loaded} unexpired revocations")
+        return loaded
+
+
+def purge_expired(db: Session, now: Optional[datetime] = None) -> int:
+    """Drop revocations of tokens that have expired anyway."""
+    result = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= (now or datetime.utcnow())))
+    db.commit()
+    return result.rowcount
+
+
+verifier = TokenVerifier(settings.jwt_secret, settings.jwt_algorithm, settings.jwt_claims_cache_size)
@@ -0,0 +1,124 @@
+import functools
+import logging
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Set by init_tracing; checked per call so disabled tracing costs one global lookup
+_tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def _exporter(settings: Settings):
+    if settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    if settings.tracing_exporter == "file":
+        # One JSON span per line, e.g. for loading into a local collector later
+        out = open(settings.tracing_file_path, "a", buffering=1)
+        return ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if settings.tracing_exporter == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER {settings.tracing_exporter!r}")
+
+
+def _instrument(app, engines: Iterable) -> None:
+    """Auto-instrument FastAPI, SQLAlchemy and Redis where the instrumentation packages exist."""
+    try:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="healthz,readyz,metrics")
+    except ImportError:
+        logger.info("opentelemetry-instrumentation-fastapi not installed; no HTTP server spans")
+    try:
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+        SQLAlchemyInstrumentor().instrument(engines=list(engines), enable_commenter=False)
+    except ImportError:
+        logger.info("opentelemetry-instrumentation-sqlalchemy not installed; no DB statement spans")
+    try:
+        from opentelemetry.instrumentation.redis import RedisInstrumentor
+
+        RedisInstrumentor().instrument()
+    except ImportError:
+        logger.info("opentelemetry-instrumentation-redis not installed; no Redis spans")
+
+
+def init_tracing(settings: Settings, app, engines: Iterable) -> bool:
+    """Configure the tracer provider, exporter and instrumentation; False when disabled."""
+    global _tracer
+    if not settings.tracing_enabled or _tracer is not None:
+        return _tracer is not None
+    try:
+        from opentelemetry import trace
+    except ImportError:  # optional: tracing is a no-op without the OpenTelemetry packages
+        logger.warning("TRACING_ENABLED is set but opentelemetry is not installed; tracing disabled")
+        return False
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        # Follow the caller's sampling decision; sample new traces by ratio
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_exporter(settings)))
+    trace.set_tracer_provider(provider)
+    _instrument(app, engines)
+    _tracer = trace.get_tracer("app")
+    logger.info(f"Tracing enabled ({settings.tracing_exporter}, sample ratio {settings.tracing_sample_ratio})")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans."""
+    global _tracer
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+    _tracer = None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the current trace; yields None when tracing is off."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator: run the function in a span named after it (module.function)."""
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _tracer.start_as_current_span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
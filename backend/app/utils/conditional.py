@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# Suffixes CompressionMiddleware appends to strong ETags of encoded bodies
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that determine a representation."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _utc(value: datetime) -> datetime:
+    """Naive datetimes in this app are UTC; HTTP dates have second precision."""
+    value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_utc(value), usegmt=True)
+
+
+def _strip(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(f'{suffix}"'):
+            return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison, any content encoding)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_strip(tag) == etag for tag in header.split(","))
+
+
+def not_modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """If-Modified-Since check; ignored when If-None-Match is present (RFC 9110)."""
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None or "if-none-match" in request.headers:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return _utc(last_modified) <= since
+
+
+def validators(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def check_conditional(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Return a 304 response when the client's cached copy is current, else None."""
+    if etag_matches(request, etag) or not_modified_since(request, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators(etag, last_modified))
+    return None
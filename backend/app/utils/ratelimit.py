@@ -0,0 +1,262 @@
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+
+from app.cache import get_redis
+from app.config import get_settings
+from app.tokens import verifier
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+rate_limited = Counter("taskflow_rate_limited_total", "Requests rejected by rate limiting", ["scope"])
+
+# Token bucket: one hash per key holding the token balance and last refill time.
+# Uses the Redis clock so every API worker refills consistently.
+# KEYS[1] = bucket key; ARGV = capacity, refill per second, cost
+# Returns {allowed, retry_after_ms, remaining}
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+
+local allowed = 0
+local retry_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_ms = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, retry_ms, math.floor(tokens)}
+"""
+
+# Sliding-window counter: the previous fixed window's count, weighted by how much
+# of it still overlaps the sliding window, plus the current window's count.
+# KEYS[1] = current window key, KEYS[2] = previous window key
+# ARGV = limit, window ms, ms elapsed in the current window
+# Returns {allowed, retry_after_ms, remaining}
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = previous * (window - elapsed) / window + current
+if used + 1 > limit then
+    return {0, window - elapsed, 0}
+end
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, 0, math.floor(limit - used - 1)}
+"""
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Token bucket parameters: sustained rate and burst capacity."""
+    per_minute: int
+    burst: int
+
+    def __post_init__(self):
+        # A zero rate would divide by zero in the refill math (here and in the Lua script)
+        if self.per_minute <= 0 or self.burst < 1:
+            raise ValueError(f"Rate limits need per_minute > 0 and burst >= 1, got {self}")
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+def scope_limits() -> Dict[str, Limit]:
+    return {
+        "crud": Limit(settings.rate_limit_crud_per_minute, settings.rate_limit_crud_burst),
+        "auth": Limit(settings.rate_limit_auth_per_minute, settings.rate_limit_auth_burst),
+        "ai": Limit(settings.rate_limit_ai_per_minute, settings.rate_limit_ai_burst),
+    }
+
+
+class MemoryLimiter:
+    """
+    In-process token buckets and sliding windows, used when Redis is unavailable.
+
+    Every entry records when it stops mattering: a bucket once it has refilled
+    (indistinguishable from a new one), a window count once no sliding window
+    overlaps it. Past ``max_keys`` entries only those are evicted, so clients
+    that are still being limited keep their state.
+    """
+
+    max_keys = 100_000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # key -> (tokens, ts, full at)
+        self._windows: Dict[str, Tuple[int, int]] = {}  # key:index -> (count, expires at ms)
+        self._prune_above = {"buckets": self.max_keys, "windows": self.max_keys}
+        self._lock = threading.Lock()
+
+    def _prune(self, name: str, now: float) -> None:
+        store = self._buckets if name == "buckets" else self._windows
+        if len(store) <= self._prune_above[name]:
+            return
+        for key in [key for key, entry in store.items() if entry[-1] <= now]:
+            del store[key]
+        # Whatever is left is live; don't rescan on every call until it has doubled
+        self._prune_above[name] = max(self.max_keys, 2 * len(store))
+
+    def take(self, key: str, limit: Limit, cost: int = 1) -> Tuple[bool, int, int]:
+        now = time.monotonic()
+        rate = limit.refill_per_second
+        with self._lock:
+            tokens, ts, _ = self._buckets.get(key, (float(limit.burst), now, now))
+            tokens = min(limit.burst, tokens + (now - ts) * rate)
+            if tokens >= cost:
+                allowed, retry_ms = True, 0
+                tokens -= cost
+            else:
+                allowed, retry_ms = False, math.ceil((cost - tokens) * 1000 / rate)
+            self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / rate)
+            self._prune("buckets", now)
+        return allowed, retry_ms, int(tokens)
+
+    def window(self, key: str, limit: int, window_ms: int) -> Tuple[bool, int, int]:
+        now_ms = int(time.time() * 1000)
+        index, elapsed = divmod(now_ms, window_ms)
+        with self._lock:
+            current = self._windows.get(f"{key}:{index}", (0, 0))[0]
+            previous = self._windows.get(f"{key}:{index - 1}", (0, 0))[0]
+            used = previous * (window_ms - elapsed) / window_ms + current
+            if used + 1 > limit:
+                return False, window_ms - elapsed, 0
+            # Counted until the next window has fully slid past this one
+            self._windows[f"{key}:{index}"] = (current + 1, (index + 2) * window_ms)
+            self._prune("windows", now_ms)
+        return True, 0, int(limit - used - 1)
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiting and sliding-window quotas.
+
+    Each check is a single EVALSHA round trip doing O(1) work in Redis. Without
+    Redis, or while it is erroring, limits fall back to per-process memory.
+    """
+
+    def __init__(self, redis_client: Callable = get_redis):
+        self.redis_client = redis_client
+        self.memory = MemoryLimiter()
+        self._scripts: dict = {}
+        self._redis_failed = False
+
+    def _script(self, client, name: str, source: str):
+        script = self._scripts.get((id(client), name))
+        if script is None:
+            script = self._scripts[(id(client), name)] = client.register_script(source)
+        return script
+
+    def _run(self, name: str, source: str, keys: list, args: list) -> Optional[Tuple[bool, int, int]]:
+        client = self.redis_client()
+        if client is None:
+            return None
+        try:
+            allowed, retry_ms, remaining = self._script(client, name, source)(keys=keys, args=args)
+        except RedisError as e:
+            if not self._redis_failed:
+                logger.warning(f"Rate limiting falling back to memory: {e}")
+                self._redis_failed = True
+            return None
+        self._redis_failed = False
+        return bool(allowed), int(retry_ms), int(remaining)
+
+    def take(self, key: str, limit: Limit, cost: int = 1) -> Tuple[bool, int, int]:
+        """Take ``cost`` tokens from the bucket; returns (allowed, retry_after_ms, remaining)."""
+        result = self._run(
+            "bucket", TOKEN_BUCKET_LUA, [f"rl:{key}"], [limit.burst, limit.refill_per_second, cost]
+        )
+        return result if result is not None else self.memory.take(key, limit, cost)
+
+    def window(self, key: str, limit: int, window_seconds: int) -> Tuple[bool, int, int]:
+        """Count one call against a sliding-window quota; returns (allowed, retry_after_ms, remaining)."""
+        window_ms = window_seconds * 1000
+        index, elapsed = divmod(int(time.time() * 1000), window_ms)
+        result = self._run(
+            "window",
+            SLIDING_WINDOW_LUA,
+            [f"quota:{key}:{index}", f"quota:{key}:{index - 1}"],
+            [limit, window_ms, elapsed],
+        )
+        return result if result is not None else self.memory.window(key, limit, window_ms)
+
+
+limiter = RateLimiter()
+
+
+def client_key(request: Request) -> str:
+    """Limit key: the authenticated user id, or the client address for anonymous calls."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            # Signature-checked (no DB lookup), so a forged token can't drain another user's bucket.
+            payload = verifier.verify(token)
+            if payload.get("sub") is not None:
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _reject(scope: str, retry_ms: int, detail: str) -> HTTPException:
+    rate_limited.labels(scope).inc()
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_ms / 1000)))},
+    )
+
+
+def rate_limit(scope: str):
+    """
+    Dependency enforcing the token bucket configured for ``scope`` ("crud", "auth" or "ai").
+    A plain function, so FastAPI runs its blocking Redis call in the threadpool.
+    """
+
+    def dependency(request: Request) -> None:
+        if not settings.rate_limit_enabled:
+            return
+        allowed, retry_ms, _ = limiter.take(f"{scope}:{client_key(request)}", scope_limits()[scope])
+        if not allowed:
+            raise _reject(scope, retry_ms, "Rate limit exceeded")
+
+    return dependency
+
+
+def ai_quota(request: Request) -> None:
+    """Dependency enforcing the per-user sliding-window quota on AI calls (run in the threadpool)."""
+    if not settings.rate_limit_enabled:
+        return
+    allowed, retry_ms, _ = limiter.window(
+        f"ai:{client_key(request)}", settings.ai_quota_calls, settings.ai_quota_window_seconds
+    )
+    if not allowed:
+        raise _reject("ai_quota", retry_ms, "AI quota exceeded")
@@ -0,0 +1,169 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app import jobs
+from app.config import Settings, get_settings
+from app.deps import SessionLocal, shards
+from app.services import agenda, scoring, urgency
+from app.services.ai import close_openai_client, init_openai_client
+from app.sharding import ShardMoving
+
+logger = logging.getLogger(__name__)
+
+# How often the main thread enqueues due periodic jobs, recovers stale ones
+# and loads upcoming deadline-bucket boundaries into the urgency index
+SCHEDULE_TICK_SECONDS = 30.0
+URGENCY_LOOKAHEAD = timedelta(seconds=2 * SCHEDULE_TICK_SECONDS)
+
+
+class Worker:
+    """
+    Runs queued jobs and enqueues the periodic ones.
+
+    Each of ``concurrency`` threads claims one job at a time (SKIP LOCKED, so
+    any number of worker processes can share the queue), runs its handler and
+    records the outcome; failed attempts are retried with exponential backoff.
+    The main thread enqueues periodic jobs: every worker tries, and the
+    per-slot dedupe key lets exactly one of them succeed. It also keeps the
+    urgency index loaded with the next minute's deadline-bucket boundaries,
+    whose changes rescore the crossed tasks' agenda entries and stored ai_scores;
+    boundaries written sooner than that are announced by the API over Redis.
+    SIGTERM/SIGINT stop claiming and let running jobs finish.
+    """
+
+    def __init__(self, settings: Settings, concurrency: Optional[int] = None):
+        self.settings = settings
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._scheduled: Dict[str, int] = {}  # kind -> last slot enqueued by this worker
+
+    def stop(self, *_) -> None:
+        if not self._stop.is_set():
+            logger.info("Stopping worker, waiting for running jobs")
+        self._stop.set()
+
+    def run_once(self, worker_id: str) -> bool:
+        """Claim and run one job; False when nothing was due."""
+        with SessionLocal() as db:
+            job = jobs.claim(db, worker_id)
+            if job is None:
+                return False
+            job_id, kind, attempt = job.id, job.kind, job.attempts
+            started = time.perf_counter()
+            try:
+                result = jobs.HANDLERS[kind](db, dict(job.payload or {}))
+            except Exception as e:
+                db.rollback()
+                logger.exception(f"Job {job_id} ({kind}) failed on attempt {attempt}")
+                jobs.fail(db, job, worker_id, f"{type(e).__name__}: {e}")
+                return True
+            if jobs.complete(db, job, worker_id, result):
+                logger.info(f"Job {job_id} ({kind}) succeeded in {time.perf_counter() - started:.2f}s")
+            else:
+                logger.warning(f"Job {job_id} ({kind}) finished after its lease was taken over")
+            return True
+
+    def schedule(self, now: Optional[float] = None) -> int:
+        """Enqueue periodic jobs whose slot has started; returns how many this worker enqueued."""
+        now = time.time() if now is None else now
+        enqueued = 0
+        with SessionLocal() as db:
+            for kind, seconds in jobs.periodic_jobs(self.settings).items():
+                slot = int(now // seconds)
+                if self._scheduled.get(kind) == slot:
+                    continue
+                if jobs.enqueue(db, kind, dedupe_key=f"{kind}@{slot * seconds}") is not None:
+                    enqueued += 1
+                self._scheduled[kind] = slot
+            jobs.requeue_stale(db, self.settings.job_lease_seconds)
+        if urgency.index.running:
+            for shard_db in shards.sessions():
+                urgency.load_window(shard_db, urgency.index, datetime.utcnow() + URGENCY_LOOKAHEAD)
+        return enqueued
+
+    def urgency_changed(self, changes: List[urgency.UrgencyChange]) -> None:
+        """
+        Tasks crossed a deadline bucket: rescore their agenda entries and, if
+        they were prioritized before, their ai_score (rule-based, in place).
+        """
+        by_user: Dict[int, List[int]] = defaultdict(list)
+        for change in changes:
+            by_user[change.user_id].append(change.task_id)
+        rescored, scores = 0, 0
+        for user_id, task_ids in by_user.items():
+            try:
+                with shards.session(user_id, write=True) as shard_db:
+                    rescored += agenda.refresh_rollovers(shard_db, task_ids=task_ids)
+                    scores += scoring.rescore_tasks(shard_db, task_ids)
+            except ShardMoving:
+                # Left due: the agenda_rollover job rescores them on the new shard
+                logger.info(f"User {user_id} is moving; urgency refresh deferred")
+        logger.info(
+            f"{len(changes)} tasks changed urgency: {rescored} agenda entries and {scores} ai_scores rescored"
+        )
+
+    def _loop(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                busy = self.run_once(worker_id)
+            except Exception:  # e.g. database unavailable; keep polling
+                logger.exception("Job loop error")
+                busy = False
+            if not busy:
+                self._stop.wait(self.settings.job_poll_interval_seconds)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{self.name}/{i}",), name=f"job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        if self.settings.urgency_index_enabled:
+            urgency.index.subscribe(self.urgency_changed)
+            urgency.index.start()
+            threading.Thread(
+                target=urgency.follow_announcements, args=(urgency.index, self._stop),
+                name="urgency-announcements", daemon=True,
+            ).start()
+        logger.info(f"Worker {self.name} started with {self.concurrency} threads")
+
+        while not self._stop.is_set():
+            try:
+                self.schedule()
+            except Exception:
+                logger.exception("Scheduler error")
+            self._stop.wait(SCHEDULE_TICK_SECONDS)
+
+        urgency.index.stop()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Worker {self.name} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs from the jobs table.")
+    parser.add_argument("--concurrency", type=int, default=None, help="claim loops (threads); default JOB_WORKER_CONCURRENCY")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_openai_client()
+    try:
+        Worker(get_settings(), concurrency=args.concurrency).run()
+    finally:
+        close_openai_client()
+
+
+if __name__ == "__main__":
+    main()
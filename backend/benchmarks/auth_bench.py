@@ -0,0 +1,63 @@
+"""
+Per-request token verification benchmark.
+
+Compares what each authenticated request spent on its bearer token before
+(python-jose decode in the rate limiter and again in get_current_user) with
+the current path (two TokenVerifier claims cache lookups plus the revocation
+bloom filter check). Tokens cycle through --users distinct users. The
+revocation list loads from DATABASE_URL and uses Redis when REDIS_URL is set.
+
+    python -m benchmarks.auth_bench --users 1000
+"""
+import argparse
+import timeit
+
+from jose import jwt
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.db import build_engine
+from app.deps import create_access_token
+from app.tokens import RevocationList, TokenVerifier
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=get_settings().database_url)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    engine = build_engine(args.url, settings, name="bench")
+    revocations = RevocationList(sessionmaker(bind=engine), settings)
+    revocations.maybe_sync()
+    verifier = TokenVerifier(settings.jwt_secret, settings.jwt_algorithm, settings.jwt_claims_cache_size)
+    tokens = [create_access_token(user_id) for user_id in range(1, args.users + 1)]
+    algorithms = [settings.jwt_algorithm]
+
+    def before(token: str) -> None:
+        jwt.decode(token, settings.jwt_secret, algorithms=algorithms)  # client_key
+        jwt.decode(token, settings.jwt_secret, algorithms=algorithms)  # get_current_user
+
+    def after(token: str) -> None:
+        verifier.verify(token)
+        claims = verifier.verify(token)
+        revocations.is_revoked(claims["jti"])
+
+    for token in tokens:
+        after(token)  # warm the claims cache, as tokens in use would be
+    try:
+        print(f"{'path':34} {'us/request':>11}")
+        for label, fn in [("before (2x jose decode)", before), ("after (claims cache + revocation)", after)]:
+            def run():
+                for i in range(args.requests):
+                    fn(tokens[i % len(tokens)])
+            best = min(timeit.repeat(run, number=1, repeat=3)) / args.requests
+            print(f"{label:34} {best * 1e6:11.1f}")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Minimal OpenAI-compatible chat completions server for load tests.
+
+Returns a deterministic prioritization for the tasks listed in the prompt
+after a configurable delay, so /ai endpoints exercise the real client code
+path without calling (or paying for) the actual API.
+
+    python -m benchmarks.fake_openai --port 8099 --latency-ms 400
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+TASK_LINE = re.compile(r"^- \d+\. (.+?) \(due:", re.MULTILINE)
+
+
+def build_app(latency_ms: float) -> Starlette:
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        titles = TASK_LINE.findall(prompt)
+        await asyncio.sleep(latency_ms / 1000)
+
+        results = [
+            {"title": title, "score": round(1 - i / (len(titles) + 1), 3), "rationale": "fake provider"}
+            for i, title in enumerate(titles)
+        ]
+        plan = [f"{9 + i:02d}:00-{10 + i:02d}:00 {title}" for i, title in enumerate(titles[:5])]
+        return JSONResponse({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps({"results": results, "plan": plan})},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    async def models(request: Request) -> JSONResponse:
+        # Readiness probes list models
+        return JSONResponse({"object": "list", "data": [{"id": "gpt-4o", "object": "model", "owned_by": "bench"}]})
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/models", models),
+    ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    args = parser.parse_args()
+    uvicorn.run(build_app(args.latency_ms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Async HTTP load generator for the TaskFlow API.
+
+Logs in the seeded bench users, then drives a weighted mix of the main
+endpoints from ``--concurrency`` clients for ``--duration`` seconds and
+reports throughput and latency percentiles per endpoint.
+
+    python -m benchmarks.load --base-url http://localhost:8000 --duration 30
+
+Run against a server with RATE_LIMIT_ENABLED=false, or the per-user limits
+will dominate the results.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, EMAIL_TEMPLATE
+
+# (scenario, weight)
+MIX = [
+    ("GET /tasks", 40),
+    ("GET /tasks?status", 10),
+    ("GET /tasks?fields", 5),
+    ("POST /tasks", 10),
+    ("PATCH /tasks/{id}", 10),
+    ("GET /projects", 10),
+    ("POST /auth/login", 3),
+    ("POST /ai/prioritize", 2),
+    ("POST /ai/prioritize-saved", 1),
+]
+
+
+@dataclass
+class BenchUser:
+    email: str
+    token: str
+    project_ids: list
+    task_ids: list = field(default_factory=list)
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def login(client: httpx.AsyncClient, email: str) -> Optional[BenchUser]:
+    response = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+    if response.status_code != 200:
+        return None
+    user = BenchUser(email=email, token=response.json()["access_token"], project_ids=[])
+    projects = await client.get("/projects", headers=user.headers)
+    user.project_ids = [p["id"] for p in projects.json()]
+    tasks = await client.get("/tasks", params={"limit": 100, "fields": "id"}, headers=user.headers)
+    user.task_ids = [t["id"] for t in tasks.json()["items"]]
+    return user
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, user: BenchUser, rng: random.Random) -> httpx.Response:
+    if name == "GET /tasks":
+        return await client.get("/tasks", params={"skip": rng.randint(0, 40)}, headers=user.headers)
+    if name == "GET /tasks?status":
+        return await client.get("/tasks", params={"status": rng.choice(["todo", "done"])}, headers=user.headers)
+    if name == "GET /tasks?fields":
+        return await client.get("/tasks", params={"fields": "title,status,due_at", "limit": 100}, headers=user.headers)
+    if name == "POST /tasks":
+        response = await client.post("/tasks", headers=user.headers, json={
+            "title": f"load task {rng.randint(0, 10**6)}",
+            "project_id": rng.choice(user.project_ids),
+            "estimated_minutes": rng.choice([15, 30, 60]),
+            "priority": rng.randint(1, 5),
+        })
+        if response.status_code == 201:
+            user.task_ids.append(response.json()["id"])
+        return response
+    if name == "PATCH /tasks/{id}":
+        return await client.patch(f"/tasks/{rng.choice(user.task_ids)}", headers=user.headers, json={
+            "priority": rng.randint(1, 5),
+            "status": rng.choice(["todo", "in_progress", "done"]),
+        })
+    if name == "GET /projects":
+        return await client.get("/projects", headers=user.headers)
+    if name == "POST /auth/login":
+        return await client.post("/auth/login", json={"email": user.email, "password": BENCH_PASSWORD})
+    if name == "POST /ai/prioritize":
+        return await client.post("/ai/prioritize", headers=user.headers, json={"tasks": [
+            {"title": f"adhoc {i}", "estimated_minutes": 30 * (i + 1), "importance": 1 + i % 5}
+            for i in range(10)
+        ]})
+    if name == "POST /ai/prioritize-saved":
+        return await client.post(
+            "/ai/prioritize-saved", params={"project_id": rng.choice(user.project_ids)}, headers=user.headers
+        )
+    raise ValueError(name)
+
+
+async def run_load(base_url: str, users: int, concurrency: int, duration: float, seed: int = 1) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        logged_in = await asyncio.gather(*(login(client, EMAIL_TEMPLATE.format(i)) for i in range(users)))
+        bench_users = [u for u in logged_in if u and u.project_ids and u.task_ids]
+        if not bench_users:
+            raise SystemExit("No bench users could log in; run `python -m benchmarks.seed` first")
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        names, weights = zip(*MIX)
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int) -> None:
+            rng = random.Random(seed * 1000 + worker_id)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                user = rng.choice(bench_users)
+                start = time.perf_counter()
+                try:
+                    response = await run_scenario(client, name, user, rng)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies[name].append(time.perf_counter() - start)
+                if not ok:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        values = sorted(latencies[name])
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p90_ms": round(percentile(values, 90) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round((values[-1] if values else 0) * 1000, 2),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    all_values = sorted(v for values in latencies.values() for v in values)
+    return {
+        "duration_s": round(elapsed, 2),
+        "concurrency": concurrency,
+        "users": len(bench_users),
+        "total": {
+            "requests": total,
+            "errors": sum(errors.values()),
+            "rps": round(total / elapsed, 2),
+            "p50_ms": round(percentile(all_values, 50) * 1000, 2),
+            "p99_ms": round(percentile(all_values, 99) * 1000, 2),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+    results = asyncio.run(run_load(args.base_url, args.users, args.concurrency, args.duration))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Connection pool throughput benchmark.
+
+Runs a fixed number of short transactions from a thread pool (one thread per
+simulated request) against DATABASE_URL for several pool configurations and
+reports throughput and checkout-wait percentiles.
+
+    python -m benchmarks.pool_bench --threads 32 --transactions 5000
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.db import build_engine
+
+# (label, overrides applied to Settings)
+CONFIGURATIONS = [
+    ("sqlalchemy-defaults+pre-ping", {"db_pool_size": 5, "db_max_overflow": 10, "db_pool_pre_ping": True}),
+    ("defaults-no-pre-ping", {"db_pool_size": 5, "db_max_overflow": 10, "db_pool_pre_ping": False}),
+    ("tuned", {}),
+    ("tuned+pgbouncer-mode", {"db_pgbouncer_mode": True}),
+]
+
+
+def run_configuration(url: str, overrides: dict, threads: int, transactions: int) -> dict:
+    settings = get_settings().model_copy(update=overrides)
+    engine = build_engine(url, settings, name="bench")
+    waits = []
+
+    def one_transaction(_):
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            waits.append(time.perf_counter() - start)
+            conn.execute(text("SELECT 1"))
+            conn.commit()
+
+    # Warm the pool so connection setup isn't counted as throughput.
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_transaction, range(threads)))
+    waits.clear()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_transaction, range(transactions)))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    waits.sort()
+    return {
+        "tps": transactions / elapsed,
+        "wait_p50_ms": statistics.median(waits) * 1000,
+        "wait_p99_ms": waits[int(len(waits) * 0.99) - 1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=get_settings().database_url)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--transactions", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'configuration':32} {'tx/s':>10} {'wait p50 ms':>12} {'wait p99 ms':>12}")
+    for label, overrides in CONFIGURATIONS:
+        result = run_configuration(args.url, overrides, args.threads, args.transactions)
+        print(f"{label:32} {result['tps']:10.0f} {result['wait_p50_ms']:12.3f} {result['wait_p99_ms']:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
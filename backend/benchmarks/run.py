@@ -0,0 +1,128 @@
+"""
+End-to-end benchmark: seed, start the API against a fake AI provider,
+run the load generator and write a JSON results file.
+
+Uses the database from DATABASE_URL. Results go to
+benchmarks/results/<timestamp>-<commit>.json so runs can be compared
+across commits.
+
+    python -m benchmarks.run --duration 30 --concurrency 32
+    python -m benchmarks.run --skip-seed          # reuse existing bench data
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.load import MIX, run_load
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def wait_until_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+def start(args: list, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *args], env=env)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--events", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ai-port", type=int, default=8099)
+    parser.add_argument("--ai-latency-ms", type=float, default=400)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    config = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()}
+    if not args.skip_seed:
+        from benchmarks.seed import seed
+
+        started = time.perf_counter()
+        counts = seed(args.users, args.projects, args.tasks, args.events)
+        print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.ai_port}/v1",
+        "AI_PROVIDER": "openai",
+        "RATE_LIMIT_ENABLED": "false",
+        "PORT": str(args.port),
+        "HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": str(args.workers),
+        "SHUTDOWN_DELAY_SECONDS": "0",
+    }
+    processes = [
+        start(["benchmarks.fake_openai", "--port", str(args.ai_port), "--latency-ms", str(args.ai_latency_ms)], env),
+        start(["app.server"], env),
+    ]
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(f"{base_url}/readyz")
+        print(f"Running {args.duration:.0f}s of load at concurrency {args.concurrency}...")
+        results = asyncio.run(run_load(base_url, args.users, args.concurrency, args.duration))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+    commit = git_commit()
+    timestamp = datetime.now(timezone.utc)
+    output = args.output or RESULTS_DIR / f"{timestamp:%Y%m%dT%H%M%SZ}-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "commit": commit,
+        "timestamp": timestamp.isoformat(),
+        "python": platform.python_version(),
+        "config": {**config, "mix": dict(MIX)},
+        **results,
+    }, indent=2))
+
+    print(f"{'endpoint':28} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for name, stats in results["endpoints"].items():
+        print(f"{name:28} {stats['requests']:7} {stats['errors']:5} {stats['rps']:8.1f} "
+              f"{stats['p50_ms']:8.1f} {stats['p90_ms']:8.1f} {stats['p99_ms']:8.1f}")
+    total = results["total"]
+    print(f"{'total':28} {total['requests']:7} {total['errors']:5} {total['rps']:8.1f} "
+          f"{total['p50_ms']:8.1f} {'':8} {total['p99_ms']:8.1f}")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
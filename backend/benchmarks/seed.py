@@ -0,0 +1,126 @@
+"""
+Seed the database with reproducible synthetic data for load tests.
+
+Creates users x projects x tasks x events with a fixed random seed, using
+batched multi-row INSERTs, then rebuilds the maintained task counters.
+All users share BENCH_PASSWORD.
+
+    python -m benchmarks.seed --users 50 --projects 5 --tasks 200 --events 3
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from app.deps import SessionLocal, hash_password, init_db
+from app.models import Project, Task, TaskEvent, TaskEventType, TaskStatus, User
+from app.services.counters import reconcile_counters
+
+BENCH_PASSWORD = "benchmark-password"
+EMAIL_TEMPLATE = "bench-user-{}@example.com"
+BATCH = 5000
+
+WORDS = (
+    "review draft plan ship fix write update prepare call email deploy design test refactor "
+    "report budget roadmap invoice meeting notes interview migrate document benchmark"
+).split()
+TAGS = ["work", "personal", "urgent", "later", "errand", "deep-work", "admin", "learning"]
+
+
+def _batched(db, model, rows: list) -> None:
+    for start in range(0, len(rows), BATCH):
+        db.execute(insert(model), rows[start:start + BATCH])
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed(users: int, projects: int, tasks: int, events: int, seed_value: int = 42) -> dict:
+    """Insert synthetic data; existing bench users (and their data) are replaced."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow().replace(microsecond=0)
+    password_hash = hash_password(BENCH_PASSWORD)  # bcrypt once, not per user
+    emails = [EMAIL_TEMPLATE.format(i) for i in range(users)]
+
+    init_db()
+    with SessionLocal() as db:
+        old_ids = db.scalars(select(User.id).where(User.email.in_(emails))).all()
+        if old_ids:
+            old_tasks = select(Task.id).where(Task.user_id.in_(old_ids))
+            db.execute(delete(TaskEvent).where(TaskEvent.task_id.in_(old_tasks)))
+            db.execute(delete(Task).where(Task.user_id.in_(old_ids)))
+            db.execute(delete(Project).where(Project.user_id.in_(old_ids)))
+            db.execute(delete(User).where(User.id.in_(old_ids)))
+
+        _batched(db, User, [
+            {"email": email, "password_hash": password_hash, "created_at": now, "updated_at": now}
+            for email in emails
+        ])
+        user_ids = db.scalars(select(User.id).where(User.email.in_(emails)).order_by(User.id)).all()
+
+        _batched(db, Project, [
+            {"name": f"Project {p}", "description": _sentence(rng, 8), "user_id": user_id,
+             "created_at": now, "updated_at": now}
+            for user_id in user_ids
+            for p in range(projects)
+        ])
+        project_rows = db.execute(
+            select(Project.id, Project.user_id).where(Project.user_id.in_(user_ids))
+        ).all()
+
+        task_rows = []
+        for project_id, user_id in project_rows:
+            for _ in range(tasks // projects or 1):
+                created = now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+                due = created + timedelta(hours=rng.randint(-48, 24 * 30)) if rng.random() < 0.7 else None
+                task_rows.append({
+                    "title": _sentence(rng, rng.randint(2, 6)),
+                    "description": _sentence(rng, rng.randint(0, 40)) or None,
+                    "status": rng.choices(list(TaskStatus), weights=[5, 2, 4, 1])[0],
+                    "due_at": due,
+                    "estimated_minutes": rng.choice([None, 15, 30, 45, 60, 90, 120, 240]),
+                    "priority": rng.randint(1, 5),
+                    "tags": rng.sample(TAGS, rng.randint(0, 3)),
+                    "project_id": project_id,
+                    "user_id": user_id,
+                    "created_at": created,
+                    "updated_at": created,
+                })
+        _batched(db, Task, task_rows)
+
+        task_ids = db.scalars(select(Task.id).where(Task.user_id.in_(user_ids))).all()
+        _batched(db, TaskEvent, [
+            {"task_id": task_id,
+             "event_type": TaskEventType.CREATED if e == 0 else rng.choice(
+                 [TaskEventType.UPDATED, TaskEventType.STATUS_CHANGED, TaskEventType.PRIORITIZED]),
+             "payload": {"seed": e},
+             "created_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))}
+            for task_id in task_ids
+            for e in range(events)
+        ])
+        db.commit()
+        reconcile_counters(db)
+
+    return {"users": len(user_ids), "projects": len(project_rows), "tasks": len(task_ids),
+            "events": len(task_ids) * events}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=5, help="projects per user")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks per user")
+    parser.add_argument("--events", type=int, default=3, help="events per task")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = seed(args.users, args.projects, args.tasks, args.events, args.seed)
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
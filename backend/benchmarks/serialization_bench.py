@@ -0,0 +1,79 @@
+"""
+Task list serialization microbenchmark.
+
+Compares encoding one page of tasks the old way (ORM object -> TaskResponse via
+from_attributes -> FastAPI re-validation of the dict response -> stdlib json)
+with the current path (column row dicts -> orjson). No database needed.
+
+    python -m benchmarks.serialization_bench --items 100
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.models import TaskStatus
+from app.schemas import TaskResponse
+from app.services.tasks import TASK_LIST_COLUMNS
+
+FIELDS = [column.key for column in TASK_LIST_COLUMNS]
+
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime(2026, 1, 1, 9, 0, 0)
+    return [
+        {
+            "id": i,
+            "title": f"Task {i}",
+            "description": "Write the quarterly report and circulate it for review. " * 3,
+            "status": list(TaskStatus)[i % 4],
+            "due_at": now + timedelta(hours=i),
+            "estimated_minutes": 30 + i % 90,
+            "priority": 1 + i % 5,
+            "ai_score": (i % 100) / 100,
+            "tags": ["work", f"tag{i % 7}"],
+            "project_id": 1 + i % 3,
+            "user_id": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def encode_before(objects: list, total: int) -> bytes:
+    payload = {
+        "items": [TaskResponse.model_validate(obj, from_attributes=True) for obj in objects],
+        "total": total,
+        "skip": 0,
+        "limit": len(objects),
+    }
+    # response_model=dict: FastAPI validates the dict, then jsonable_encoder + json.dumps
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode_after(rows: list[dict], total: int) -> bytes:
+    return orjson.dumps({"items": rows, "total": total, "skip": 0, "limit": len(rows)})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.items)
+    objects = [SimpleNamespace(**row) for row in rows]
+    assert json.loads(encode_before(objects, len(rows))) == json.loads(encode_after(rows, len(rows)))
+
+    for label, fn, data in [("before (pydantic + json)", encode_before, objects), ("after (rows + orjson)", encode_after, rows)]:
+        best = min(timeit.repeat(lambda: fn(data, len(rows)), number=args.repeat, repeat=5)) / args.repeat
+        print(f"{label:26} {best * 1e6:10.1f} us per {args.items}-item page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Saved-task scoring memory and throughput benchmark.
+
+Seeds a throwaway user with --tasks open tasks in DATABASE_URL, then scores
+them the old way (ORM Task objects -> TaskForPrioritization ->
+PrioritizationResult) and the current way (narrow column select ->
+TaskSnapshot -> ScoredTask), reporting tasks per second and the peak Python
+memory (tracemalloc) of each. Nothing is written back; the user is deleted
+afterwards.
+
+    python -m benchmarks.snapshot_bench --tasks 100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.db import build_engine
+from app.models import Project, Task, TaskStatus, User
+from app.schemas import TaskForPrioritization
+from app.services.ai import prioritize_rule_based, rank_rule_based
+from app.services.scoring import load_snapshots
+
+BATCH = 5000
+
+
+def _setup(Session, count: int) -> int:
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    with Session() as db:
+        user_id = db.scalar(
+            insert(User).values(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password_hash="x").returning(User.id)
+        )
+        project_id = db.scalar(insert(Project).values(name="snapshot bench", user_id=user_id).returning(Project.id))
+        for start in range(0, count, BATCH):
+            db.execute(
+                insert(Task),
+                [
+                    {
+                        "title": f"Task {i}",
+                        "description": "Write the quarterly report and circulate it for review.",
+                        "status": TaskStatus.TODO,
+                        "due_at": now + timedelta(hours=rng.randint(-48, 24 * 14)) if rng.random() < 0.7 else None,
+                        "estimated_minutes": rng.choice([None, 15, 30, 60, 120, 240]),
+                        "priority": rng.randint(1, 5),
+                        "user_id": user_id,
+                        "project_id": project_id,
+                    }
+                    for i in range(start, min(start + BATCH, count))
+                ],
+            )
+        db.commit()
+    return user_id
+
+
+def _teardown(Session, user_id: int) -> None:
+    with Session() as db:
+        db.execute(delete(Task).where(Task.user_id == user_id))
+        db.execute(delete(Project).where(Project.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+
+
+def score_orm(db, user_id: int) -> int:
+    tasks = db.query(Task).filter(Task.user_id == user_id, Task.status != TaskStatus.DONE).all()
+    inputs = [
+        TaskForPrioritization(
+            title=task.title,
+            description=task.description,
+            due_at=task.due_at,
+            estimated_minutes=task.estimated_minutes,
+            importance=task.priority,
+        )
+        for task in tasks
+    ]
+    results, _ = prioritize_rule_based(inputs)
+    return len(results)
+
+
+def score_snapshots(db, user_id: int) -> int:
+    scored, _ = rank_rule_based(load_snapshots(db, user_id))
+    return len(scored)
+
+
+def measure(Session, fn, user_id: int) -> dict:
+    with Session() as db:
+        started = time.perf_counter()
+        count = fn(db, user_id)
+        elapsed = time.perf_counter() - started
+    with Session() as db:
+        tracemalloc.start()
+        fn(db, user_id)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"tasks_per_s": count / elapsed, "peak_mb": peak / 2**20, "bytes_per_task": peak / max(count, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=get_settings().database_url)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    engine = build_engine(args.url, get_settings(), name="bench")
+    Session = sessionmaker(bind=engine, autoflush=False)
+    user_id = _setup(Session, args.tasks)
+    try:
+        print(f"{'path':30} {'tasks/s':>10} {'peak MB':>9} {'bytes/task':>11}")
+        for label, fn in [("orm + pydantic", score_orm), ("column select + snapshots", score_snapshots)]:
+            result = measure(Session, fn, user_id)
+            print(f"{label:30} {result['tasks_per_s']:10.0f} {result['peak_mb']:9.1f} {result['bytes_per_task']:11.0f}")
+    finally:
+        _teardown(Session, user_id)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Task write path benchmark.
+
+Creates and updates tasks against DATABASE_URL through the ORM paths
+(load, flush, refresh) and the RETURNING paths used by the API, and reports
+writes per second and statements per write for each. Rows are written under
+a throwaway user that is deleted afterwards.
+
+    python -m benchmarks.write_bench --writes 2000
+"""
+import argparse
+import time
+import uuid
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.config import get_settings
+from app.db import build_engine
+from app.models import Project, Task, TaskCounter, TaskEvent, User
+from app.schemas import TaskCreate, TaskUpdate
+from app.services import tasks as task_service
+
+
+def _setup(Session) -> tuple:
+    with Session() as db:
+        user_id = db.scalar(
+            insert(User).values(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password_hash="x").returning(User.id)
+        )
+        project_id = db.scalar(insert(Project).values(name="write bench", user_id=user_id).returning(Project.id))
+        db.commit()
+    return user_id, project_id
+
+
+def _teardown(Session, user_id: int) -> None:
+    with Session() as db:
+        owned = select(Task.id).where(Task.user_id == user_id)
+        db.execute(delete(TaskEvent).where(TaskEvent.task_id.in_(owned)))
+        db.execute(delete(Task).where(Task.user_id == user_id))
+        db.execute(delete(Project).where(Project.user_id == user_id))
+        db.execute(delete(TaskCounter).where(TaskCounter.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+
+
+def run(Session, statements: list, write, writes: int) -> dict:
+    with Session() as db:
+        statements[0] = 0
+        started = time.perf_counter()
+        for i in range(writes):
+            write(db, i)
+        elapsed = time.perf_counter() - started
+    return {"writes_per_s": writes / elapsed, "statements_per_write": statements[0] / writes}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=get_settings().database_url)
+    parser.add_argument("--writes", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = build_engine(args.url, get_settings(), name="bench")
+    Session = sessionmaker(bind=engine, autoflush=False)
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        statements[0] += 1
+
+    user_id, project_id = _setup(Session)
+    task_ids = []
+
+    def create(fn):
+        def write(db, i):
+            task = fn(db, TaskCreate(title=f"bench {i}", project_id=project_id), user_id)
+            task_ids.append(task["id"])
+        return write
+
+    def patch(fn):
+        def write(db, i):
+            if fn(db, task_ids[i % len(task_ids)], user_id, TaskUpdate(priority=i % 5 + 1)) is None:
+                raise RuntimeError("benchmark task disappeared")
+        return write
+
+    def patch_orm(db, task_id, user_id, task_update):
+        result = task_service._apply_update(db, task_id, user_id, task_update)
+        db.expunge_all()  # each request loads the task afresh
+        return result
+
+    cases = [
+        ("create (orm)", create(task_service._create_task_orm)),
+        ("create (insert returning)", create(task_service.create_task)),
+        ("update (orm)", patch(patch_orm)),
+        ("update (update returning)", patch(task_service.update_task)),
+    ]
+    try:
+        print(f"{'path':28} {'writes/s':>10} {'stmts/write':>12}")
+        for label, write in cases:
+            result = run(Session, statements, write, args.writes)
+            print(f"{label:28} {result['writes_per_s']:10.0f} {result['statements_per_write']:12.2f}")
+    finally:
+        _teardown(Session, user_id)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
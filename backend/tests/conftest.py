@@ -0,0 +1,190 @@
+"""
+Test setup. By default nothing here needs Postgres, Redis, OpenAI or the network.
+
+Each pytest-xdist worker (``pytest -n auto``) gets its own SQLite database,
+emptied after every test; Redis is a fresh fakeredis per test, and the
+``fake_ai`` fixture stands in for the OpenAI client. The environment is set
+before ``app`` is imported, since settings are read once per process.
+
+With TEST_DATABASE_URL (a scratch Postgres database, migrated here with
+alembic and truncated after every test) and TEST_REDIS_URL (flushed after
+every test) the same suite runs against the real services, including the
+tests marked ``postgres`` that are skipped on SQLite. Run it serially: the
+workers would share the database.
+"""
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+
+_worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+_tmp = tempfile.mkdtemp(prefix=f"taskflow-tests-{_worker}-")
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL")
+os.environ.update(
+    DATABASE_URL=TEST_DATABASE_URL or f"sqlite:///{_tmp}/taskflow.db",
+    DATABASE_REPLICA_URLS="[]",
+    DATABASE_SHARD_URLS="[]",
+    REDIS_URL="",
+    RATE_LIMIT_ENABLED="false",
+    TRACING_ENABLED="false",
+    OPENAI_API_KEY="",
+    JWT_SECRET="test-secret",
+    BCRYPT_ROUNDS="4",
+)
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
+import redis  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import cache  # noqa: E402
+from app.deps import engine, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.services import ai as ai_service  # noqa: E402
+from app.tokens import verifier  # noqa: E402
+
+PASSWORD = "testpassword123"
+ON_POSTGRES = engine.dialect.name == "postgresql"
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_addoption(parser):
+    parser.addoption("--slow", action="store_true", help="also run tests marked slow (largest benchmark sizes)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: long-running; skipped unless --slow is given")
+    config.addinivalue_line("markers", "postgres: needs TEST_DATABASE_URL (Postgres); skipped on SQLite")
+    if TEST_DATABASE_URL and config.getoption("numprocesses", None):
+        raise pytest.UsageError("TEST_DATABASE_URL is one database for every worker: run without -n")
+
+
+def pytest_collection_modifyitems(config, items):
+    skip_slow = pytest.mark.skip(reason="needs --slow")
+    skip_postgres = pytest.mark.skip(reason="needs TEST_DATABASE_URL (Postgres)")
+    for item in items:
+        if "slow" in item.keywords and not config.getoption("--slow"):
+            item.add_marker(skip_slow)
+        if "postgres" in item.keywords and not ON_POSTGRES:
+            item.add_marker(skip_postgres)
+
+
+class FakeOpenAI:
+    """
+    The slice of the OpenAI client prioritize_with_openai uses. Scores the
+    prompt's tasks in the order given (first = most urgent) and records
+    every request in ``calls``.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        titles = re.findall(r"^- \d+\. (.*) \(due: ", kwargs["messages"][0]["content"], re.M)
+        content = json.dumps({
+            "results": [
+                {"title": title, "score": round(1 - i / (len(titles) + 1), 3), "rationale": "fake"}
+                for i, title in enumerate(titles)
+            ],
+            "plan": [f"09:{i:02d} {title}" for i, title in enumerate(titles[:5])],
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    if ON_POSTGRES:
+        # The migrated schema (partitioned task_events and all), not create_all's.
+        # No ini file: its logging config would disable the app's loggers.
+        config = Config()
+        config.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+        command.upgrade(config, "head")
+    else:
+        init_db()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_state(database):
+    """A fresh (fake)redis per test, and empty tables and caches after it."""
+    cache._client = redis.Redis.from_url(TEST_REDIS_URL) if TEST_REDIS_URL else fakeredis.FakeRedis()
+    cache._client.flushdb()
+    yield
+    cache.close_redis()
+    with database.begin() as conn:
+        if ON_POSTGRES:
+            # Sequences restart too, as SQLite's do once its tables are empty
+            tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+            conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        else:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+    if verifier.cache is not None:
+        verifier.cache.clear()
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    """Route AI prioritization through FakeOpenAI instead of the rule-based fallback."""
+    client = FakeOpenAI()
+    monkeypatch.setattr(ai_service, "openai_client", client)
+    monkeypatch.setattr(ai_service.settings, "ai_provider", "openai")
+    return client
+
+
+@pytest.fixture
+def client():
+    # Without the lifespan: the schema is already there and no pools need warming
+    return TestClient(app)
+
+
+@pytest.fixture
+def register(client):
+    """register(email) -> the token response of a newly registered user."""
+
+    def register(email: str = "user@example.com", password: str = PASSWORD) -> dict:
+        response = client.post("/auth/register", json={"email": email, "password": password})
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return register
+
+
+@pytest.fixture
+def auth_headers(register):
+    return {"Authorization": f"Bearer {register()['access_token']}"}
+
+
+@pytest.fixture
+def create_task(client, auth_headers):
+    """create_task(title, **fields) -> the created task (in one project of the auth_headers user)."""
+    project = {}
+
+    def create_task(title: str = "Task", headers: dict = auth_headers, **fields) -> dict:
+        if headers is auth_headers and "project_id" not in fields:
+            if "id" not in project:
+                response = client.post("/projects", json={"name": "Work"}, headers=headers)
+                assert response.status_code == 201, response.text
+                project["id"] = response.json()["id"]
+            fields["project_id"] = project["id"]
+        for name, value in fields.items():
+            if isinstance(value, datetime):
+                fields[name] = value.isoformat()
+        response = client.post("/tasks", json={"title": title, **fields}, headers=headers)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return create_task
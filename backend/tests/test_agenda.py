@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.deps import SessionLocal
+from app.models import AgendaEntry
+from app.services.agenda import get_agenda, refresh_rollovers
+
+HOUR = timedelta(hours=1)
+
+
+def user_id(client, headers):
+    return client.get("/auth/me", headers=headers).json()["id"]
+
+
+def test_agenda_lists_open_tasks_due_before_until_most_urgent_first(client, auth_headers, create_task):
+    now = datetime.utcnow()
+    overdue = create_task("Overdue", due_at=now - 2 * HOUR, priority=5)
+    create_task("Soon", due_at=now + HOUR / 2, priority=1)
+    create_task("Later", due_at=now + 72 * HOUR)
+    create_task("Undated")
+    done = create_task("Done", due_at=now - HOUR)
+    client.patch(f"/tasks/{done['id']}", json={"status": "done"}, headers=auth_headers)
+
+    with SessionLocal() as db:
+        items = get_agenda(db, user_id(client, auth_headers), now + 2 * HOUR, limit=10)
+    assert [item["title"] for item in items] == ["Overdue", "Soon"]
+    assert [item["overdue"] for item in items] == [True, False]
+    assert items[0]["agenda_score"] >= items[1]["agenda_score"]
+
+    response = client.get("/agenda", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["id"] == overdue["id"]
+
+
+def test_agenda_limit_is_applied_in_order(client, auth_headers, create_task):
+    now = datetime.utcnow()
+    for priority in (1, 5, 3, 4, 2):
+        create_task(f"p{priority}", due_at=now - HOUR, priority=priority)
+
+    response = client.get("/agenda?limit=2", headers=auth_headers)
+    assert [item["title"] for item in response.json()["items"]] == ["p5", "p4"]
+
+
+def test_reads_serve_stored_scores_until_the_rollover_job_rescores(client, auth_headers, create_task):
+    now = datetime.utcnow()
+    task = create_task("Due", due_at=now + 3 * HOUR)
+    with SessionLocal() as db:
+        db.execute(
+            update(AgendaEntry)
+            .where(AgendaEntry.task_id == task["id"])
+            .values(score=0.0, next_rollover_at=now - HOUR)
+        )
+        db.commit()
+        uid = user_id(client, auth_headers)
+        assert get_agenda(db, uid, now + 4 * HOUR, limit=10)[0]["agenda_score"] == 0.0
+
+        assert refresh_rollovers(db, task_ids=[task["id"]]) == 1
+        entry = db.get(AgendaEntry, task["id"])
+        assert entry.score > 0 and entry.next_rollover_at > now
+        assert get_agenda(db, uid, now + 4 * HOUR, limit=10)[0]["agenda_score"] == entry.score
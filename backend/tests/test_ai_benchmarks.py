@@ -0,0 +1,146 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.schemas import TaskForPrioritization
+from app.services.ai import (
+    TaskSnapshot,
+    calculate_deadline_urgency,
+    calculate_effort_inverse,
+    generate_rule_based_rationale,
+    prioritize_rule_based,
+    rank_rule_based,
+    rule_based_score,
+)
+
+# 100k runs only with --slow (see conftest)
+SIZES = [10, 1_000, 10_000, pytest.param(100_000, marks=pytest.mark.slow)]
+
+# Time for 10x the input must stay under this multiple: linear code scales
+# by ~10x, quadratic code by ~100x.
+MAX_SCALING_RATIO = 30
+
+
+def make_tasks(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        TaskForPrioritization(
+            title=f"Task {i}",
+            due_at=now + timedelta(hours=rng.randint(-48, 24 * 14)) if rng.random() < 0.7 else None,
+            estimated_minutes=rng.choice([None, 15, 30, 60, 120, 240]),
+            importance=rng.randint(1, 5),
+        )
+        for i in range(n)
+    ]
+
+
+def to_snapshots(tasks: list) -> list:
+    return [
+        TaskSnapshot(i, task.title, task.due_at, task.estimated_minutes, task.importance)
+        for i, task in enumerate(tasks)
+    ]
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def assert_linear(fn, n: int) -> None:
+    ratio = best_of(fn, make_tasks(10 * n)) / best_of(fn, make_tasks(n))
+    assert ratio < MAX_SCALING_RATIO, f"{fn.__name__}: {10 * n} tasks took {ratio:.1f}x as long as {n}"
+
+
+def score_all(tasks):
+    return [rule_based_score(task) for task in tasks]
+
+
+def rationale_all(tasks):
+    return [generate_rule_based_rationale(task) for task in tasks]
+
+
+def factors_all(tasks):
+    return [
+        (calculate_deadline_urgency(task.due_at), calculate_effort_inverse(task.estimated_minutes))
+        for task in tasks
+    ]
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_factors(benchmark, n):
+    benchmark.group = "factors"
+    benchmark(factors_all, make_tasks(n))
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_rule_based_score(benchmark, n):
+    benchmark.group = "rule_based_score"
+    scores = benchmark(score_all, make_tasks(n))
+    assert all(0.0 <= score <= 1.0 for score in scores)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_rationale(benchmark, n):
+    benchmark.group = "rationale"
+    benchmark(rationale_all, make_tasks(n))
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_prioritize_rule_based(benchmark, n):
+    benchmark.group = "prioritize_rule_based"
+    results, plan = benchmark(prioritize_rule_based, make_tasks(n))
+    assert len(results) == n
+    assert len(plan) == min(n, 5)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_rank_snapshots(benchmark, n):
+    benchmark.group = "prioritize_rule_based"
+    scored, plan = benchmark(rank_rule_based, to_snapshots(make_tasks(n)))
+    assert len(scored) == n
+    assert len(plan) == min(n, 5)
+
+
+# Wall-clock ratios over 100k tasks: too slow and noisy for every run
+@pytest.mark.slow
+@pytest.mark.parametrize("fn", [factors_all, score_all, rationale_all, prioritize_rule_based])
+def test_scales_linearly(fn):
+    assert_linear(fn, 10_000)
+
+
+def test_plan_uses_each_results_own_task():
+    """Duplicate titles must not borrow another task's estimate."""
+    now = datetime.utcnow()
+    tasks = [
+        TaskForPrioritization(title="Same", estimated_minutes=240, importance=1),
+        TaskForPrioritization(title="Same", due_at=now - timedelta(hours=1), estimated_minutes=120, importance=5),
+    ]
+    results, plan = prioritize_rule_based(tasks)
+    assert results[0].score > results[1].score
+    assert plan[0] == "09:00-11:00 Same"
+
+
+def test_snapshots_rank_like_pydantic_tasks():
+    tasks = make_tasks(200)
+    scored, plan = rank_rule_based(to_snapshots(tasks))
+    results, expected_plan = prioritize_rule_based(tasks)
+    assert [item.task.title for item in scored] == [result.title for result in results]
+    assert [item.to_result() for item in scored] == results
+    assert plan == expected_plan
+
+
+def test_duplicate_titles_keep_their_own_ids():
+    tasks = [
+        TaskSnapshot(1, "Same", None, 240, 1),
+        TaskSnapshot(2, "Same", datetime.utcnow() - timedelta(hours=1), 120, 5),
+    ]
+    scored, _ = rank_rule_based(tasks)
+    assert [item.task.id for item in scored] == [2, 1]
+    assert scored[0].score > scored[1].score
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+
+def create_project(client, headers, name="Work"):
+    response = client.post("/projects", json={"name": name}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_task_crud(client, auth_headers):
+    """Test creating, listing, updating and deleting a task."""
+    project_id = create_project(client, auth_headers)
+    response = client.post(
+        "/tasks",
+        json={"title": "Write report", "project_id": project_id, "tags": ["work"], "importance": 4},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    task = response.json()
+    assert task["tags"] == ["work"]
+
+    listed = client.get("/tasks", headers=auth_headers).json()
+    assert [item["id"] for item in listed["items"]] == [task["id"]]
+
+    response = client.patch(f"/tasks/{task['id']}", json={"status": "done"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+
+    assert client.delete(f"/tasks/{task['id']}", headers=auth_headers).status_code == 204
+    assert client.get(f"/tasks/{task['id']}", headers=auth_headers).status_code == 404
+
+
+def test_tasks_are_private(client, register, auth_headers):
+    """Test that users only see their own tasks."""
+    project_id = create_project(client, auth_headers)
+    task_id = client.post(
+        "/tasks", json={"title": "Mine", "project_id": project_id}, headers=auth_headers
+    ).json()["id"]
+
+    other = {"Authorization": f"Bearer {register('other@example.com')['access_token']}"}
+    assert client.get("/tasks", headers=other).json()["total"] == 0
+    assert client.get(f"/tasks/{task_id}", headers=other).status_code == 404
+
+
+def test_prioritize_saved_uses_the_ai_provider(client, auth_headers, fake_ai):
+    """Test saved-task prioritization through the (fake) OpenAI client."""
+    project_id = create_project(client, auth_headers)
+    due = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    for title in ("Taxes", "Groceries"):
+        client.post(
+            "/tasks", json={"title": title, "project_id": project_id, "due_at": due}, headers=auth_headers
+        )
+
+    response = client.post("/ai/prioritize-saved", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert len(fake_ai.calls) == 1
+    results = response.json()["results"]
+    assert sorted(result["title"] for result in results) == ["Groceries", "Taxes"]
+    assert all(result["rationale"] == "fake" for result in results)
@@ -1,43 +1,16 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
-from app.main import app
-from app.deps import get_db
-from app.models import Base
+from tests.conftest import PASSWORD
 
-# Use in-memory SQLite for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-Base.metadata.create_all(bind=engine)
-app.dependency_overrides[get_db] = override_get_db
-
-client = TestClient(app)
-
-
-def test_health_check():
+def test_health_check(client):
     """Test health check endpoint."""
     response = client.get("/healthz")
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
 
 
-def test_register():
+def test_register(client):
     """Test user registration."""
     response = client.post(
         "/auth/register",
@@ -48,13 +21,9 @@ def test_register():
     assert "refresh_token" in response.json()
 
 
-def test_register_duplicate_email():
+def test_register_duplicate_email(client, register):
     """Test registration with duplicate email."""
-    # First registration
-    client.post(
-        "/auth/register",
-        json={"email": "duplicate@example.com", "password": "testpassword123"},
-    )
+    register("duplicate@example.com")
 
     # Second registration with same email
     response = client.post(
@@ -64,32 +33,22 @@ def test_register_duplicate_email():
     assert response.status_code == 400
 
 
-def test_login():
+def test_login(client, register):
     """Test user login."""
-    # Register first
-    client.post(
-        "/auth/register",
-        json={"email": "login@example.com", "password": "testpassword123"},
-    )
+    register("login@example.com")
 
-    # Login
     response = client.post(
         "/auth/login",
-        json={"email": "login@example.com", "password": "testpassword123"},
+        json={"email": "login@example.com", "password": PASSWORD},
     )
     assert response.status_code == 200
     assert "access_token" in response.json()
 
 
-def test_login_invalid_password():
+def test_login_invalid_password(client, register):
     """Test login with wrong password."""
-    # Register first
-    client.post(
-        "/auth/register",
-        json={"email": "wrongpwd@example.com", "password": "testpassword123"},
-    )
+    register("wrongpwd@example.com")
 
-    # Login with wrong password
     response = client.post(
         "/auth/login",
         json={"email": "wrongpwd@example.com", "password": "wrongpassword"},
@@ -97,5 +56,37 @@ def test_login_invalid_password():
     assert response.status_code == 401
 
 
+def test_me(client, auth_headers):
+    """Test the current user endpoint."""
+    response = client.get("/auth/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "user@example.com"
+
+
+def test_refresh_token_works_once(client, register):
+    """Refresh tokens are rotated: reusing one is rejected."""
+    refresh_token = register()["refresh_token"]
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] != refresh_token
+
+    response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_tokens(client, register):
+    """Test that logout revokes the access token and the refresh token given."""
+    tokens = register()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 204
+
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
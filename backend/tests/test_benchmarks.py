@@ -0,0 +1,58 @@
+import asyncio
+import functools
+import json
+
+import httpx
+from sqlalchemy import select
+from starlette.testclient import TestClient
+
+from app.deps import SessionLocal
+from app.main import app
+from app.models import Task
+from app.services.counters import get_count
+from benchmarks import load
+from benchmarks.fake_openai import build_app
+from benchmarks.seed import seed
+
+
+def seeded_titles():
+    with SessionLocal() as db:
+        return db.scalars(select(Task.title).order_by(Task.user_id, Task.project_id, Task.title)).all()
+
+
+def test_seed_is_reproducible_and_counted():
+    counts = seed(users=2, projects=2, tasks=6, events=2, seed_value=7)
+    assert counts == {"users": 2, "projects": 4, "tasks": 12, "events": 24}
+    first = seeded_titles()
+
+    assert seed(users=2, projects=2, tasks=6, events=2, seed_value=7) == counts  # replaces, not adds
+    assert seeded_titles() == first
+    with SessionLocal() as db:
+        user_id = db.scalar(select(Task.user_id).limit(1))
+        assert get_count(db, user_id) == 6
+
+
+def test_percentile():
+    values = sorted(range(1, 101))
+    assert [load.percentile(values, pct) for pct in (50, 90, 99)] == [50, 90, 99]
+    assert load.percentile([], 50) == 0.0
+
+
+def test_fake_openai_ranks_the_prompt_tasks():
+    prompt = "Tasks:\n- 1. Taxes (due: tomorrow)\n- 2. Groceries (due: none)\n"
+    response = TestClient(build_app(latency_ms=0)).post(
+        "/v1/chat/completions", json={"model": "gpt-4o", "messages": [{"role": "user", "content": prompt}]}
+    )
+    content = response.json()["choices"][0]["message"]["content"]
+    assert [result["title"] for result in json.loads(content)["results"]] == ["Taxes", "Groceries"]
+
+
+def test_load_run_reports_every_endpoint(monkeypatch):
+    seed(users=2, projects=1, tasks=5, events=1)
+    transport = httpx.ASGITransport(app=app)
+    monkeypatch.setattr(load.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+
+    results = asyncio.run(load.run_load("http://bench", users=2, concurrency=2, duration=0.5))
+    assert results["users"] == 2
+    assert results["total"]["requests"] > 0 and results["total"]["errors"] == 0
+    assert set(results["endpoints"]) == {name for name, _ in load.MIX}
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.schemas import TaskUpdate
+from app.services.coalescing import UpdateCoalescer
+
+
+def test_burst_is_written_once_with_merged_fields():
+    writes = []
+
+    def apply(patch):
+        writes.append((patch.model_dump(exclude_unset=True), threading.current_thread()))
+        return "written"
+
+    async def burst():
+        coalescer = UpdateCoalescer(window_ms=20)
+        return await asyncio.gather(
+            coalescer.submit((1, 7), TaskUpdate(title="a", priority=2), apply),
+            coalescer.submit((1, 7), TaskUpdate(title="b"), apply),
+            coalescer.submit((1, 8), TaskUpdate(status="done"), apply),
+        )
+
+    assert asyncio.run(burst()) == ["written"] * 3
+    patches = [patch for patch, _ in writes]
+    assert len(patches) == 2
+    assert {"title": "b", "priority": 2} in patches and {"status": "done"} in patches
+    # The blocking write never runs on the event loop's thread
+    assert all(thread is not threading.main_thread() for _, thread in writes)
+
+
+def test_flush_does_not_block_the_event_loop():
+    release = threading.Event()
+
+    def slow_apply(patch):
+        release.wait(5)
+        return patch.title
+
+    async def run():
+        coalescer = UpdateCoalescer(window_ms=1)
+        pending = asyncio.create_task(coalescer.submit((1, 1), TaskUpdate(title="x"), slow_apply))
+        await asyncio.sleep(0.05)  # the flush is now inside slow_apply
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0)
+            ticks += 1
+        release.set()
+        return ticks, await pending
+
+    assert asyncio.run(run()) == (5, "x")
+
+
+def test_write_errors_reach_every_request_in_the_burst():
+    def failing(patch):
+        raise ValueError("conflict")
+
+    async def burst():
+        coalescer = UpdateCoalescer(window_ms=10)
+        return await asyncio.gather(
+            coalescer.submit((1, 1), TaskUpdate(title="a"), failing),
+            coalescer.submit((1, 1), TaskUpdate(title="b"), failing),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(burst())
+    assert [type(result) for result in results] == [ValueError, ValueError]
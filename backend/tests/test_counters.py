@@ -0,0 +1,42 @@
+from sqlalchemy import delete, update
+
+from app.deps import SessionLocal
+from app.models import TaskCounter
+from app.services.counters import ALL_PROJECTS, ALL_STATUSES, get_count, reconcile_counters
+
+
+def counts(user_id, project_id=None):
+    with SessionLocal() as db:
+        return {
+            status: get_count(db, user_id, project_id, None if status == ALL_STATUSES else status)
+            for status in (ALL_STATUSES, "todo", "in_progress", "done")
+        }
+
+
+def test_counters_follow_task_writes(client, auth_headers, create_task):
+    tasks = [create_task(f"Task {i}") for i in range(3)]
+    user_id, project_id = tasks[0]["user_id"], tasks[0]["project_id"]
+    client.patch(f"/tasks/{tasks[0]['id']}", json={"status": "done"}, headers=auth_headers)
+    client.patch(f"/tasks/{tasks[1]['id']}", json={"status": "in_progress"}, headers=auth_headers)
+    client.delete(f"/tasks/{tasks[2]['id']}", headers=auth_headers)
+
+    expected = {ALL_STATUSES: 2, "todo": 0, "in_progress": 1, "done": 1}
+    assert counts(user_id) == counts(user_id, project_id) == expected
+    assert client.get("/tasks?status=done", headers=auth_headers).json()["total"] == 1
+    assert client.get(f"/tasks?project_id={project_id}", headers=auth_headers).json()["total"] == 2
+
+    assert client.delete(f"/projects/{project_id}", headers=auth_headers).status_code == 204
+    assert counts(user_id) == {ALL_STATUSES: 0, "todo": 0, "in_progress": 0, "done": 0}
+
+
+def test_reconcile_repairs_drift(create_task):
+    user_id = create_task("Mine")["user_id"]
+    with SessionLocal() as db:
+        db.execute(update(TaskCounter).where(TaskCounter.project_id == ALL_PROJECTS).values(count=7))
+        db.execute(delete(TaskCounter).where(TaskCounter.project_id != ALL_PROJECTS, TaskCounter.status == "todo"))
+        db.commit()
+        assert get_count(db, user_id) == 7
+
+        assert reconcile_counters(db, user_id) == 3
+        assert reconcile_counters(db) == 0
+    assert counts(user_id) == {ALL_STATUSES: 1, "todo": 1, "in_progress": 0, "done": 0}
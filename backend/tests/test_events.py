@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.deps import SessionLocal
+from app.models import TaskEvent, TaskEventType
+from app.services import events
+
+LONG_AGO = datetime(2020, 3, 10)
+
+
+def add_events(task_id, *rows):
+    """rows: (event_type, created_at, payload)"""
+    with SessionLocal() as db:
+        db.add_all(
+            TaskEvent(task_id=task_id, event_type=event_type, created_at=created_at, payload=payload)
+            for event_type, created_at, payload in rows
+        )
+        db.commit()
+
+
+def event_rows(task_id):
+    with SessionLocal() as db:
+        return db.execute(
+            select(TaskEvent.event_type, TaskEvent.created_at, TaskEvent.payload)
+            .where(TaskEvent.task_id == task_id, TaskEvent.event_type != TaskEventType.CREATED)
+            .order_by(TaskEvent.created_at, TaskEvent.id)
+        ).all()
+
+
+def partition_of(task_id):
+    with SessionLocal() as db:
+        return db.scalars(
+            text("SELECT DISTINCT tableoid::regclass::text FROM task_events WHERE task_id = :task_id AND event_type = 'UPDATED'"),
+            {"task_id": task_id},
+        ).all()
+
+
+@pytest.fixture
+def partitions():
+    """The partitions the migrations left; any a test adds are dropped after it."""
+    with SessionLocal() as db:
+        existing = set(events._partitions(db))
+    yield existing
+    with SessionLocal() as db:
+        for name in set(events._partitions(db)) - existing:
+            db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+
+
+def test_compaction_folds_a_month_of_updates_into_one_snapshot(create_task):
+    task_id = create_task()["id"]
+    recent = datetime.utcnow()
+    add_events(
+        task_id,
+        (TaskEventType.UPDATED, LONG_AGO, {"status": "in_progress"}),
+        (TaskEventType.UPDATED, LONG_AGO + timedelta(days=1), {"title": "Renamed", "status": "done"}),
+        (TaskEventType.UPDATED, LONG_AGO + timedelta(days=40), {"importance": 2}),  # alone in April
+        (TaskEventType.UPDATED, recent, {"importance": 5}),
+    )
+
+    with SessionLocal() as db:
+        assert events.compact_events(db, recent - timedelta(days=30)) == 2
+
+    snapshot, april, latest = event_rows(task_id)
+    assert snapshot.event_type == TaskEventType.SNAPSHOT
+    assert snapshot.created_at == LONG_AGO + timedelta(days=1)
+    assert snapshot.payload["changes"] == {"status": "done", "title": "Renamed"}
+    assert snapshot.payload["folded"] == 2
+    assert (april.event_type, latest.event_type) == (TaskEventType.UPDATED, TaskEventType.UPDATED)
+
+
+def test_drop_expired_removes_old_events(create_task):
+    task_id = create_task()["id"]
+    add_events(task_id, (TaskEventType.UPDATED, LONG_AGO, {"status": "done"}))
+
+    with SessionLocal() as db:
+        assert events.drop_expired(db, datetime.utcnow() - timedelta(days=365)) == 1
+    assert event_rows(task_id) == []
+
+
+def test_failed_partition_does_not_stop_maintenance(create_task, monkeypatch):
+    monkeypatch.setattr(events, "_is_partitioned", lambda db: True)
+    monkeypatch.setattr(events, "_partitions", lambda db: [events.DEFAULT_PARTITION])
+    created = []
+
+    def create_partition(db, name, month, has_default):
+        assert has_default
+        if not created:
+            created.append(name)
+            raise OperationalError("CREATE TABLE", {}, Exception("updated partition constraint would be violated"))
+        created.append(name)
+        return 0
+
+    monkeypatch.setattr(events, "_create_partition", create_partition)
+    task_id = create_task()["id"]
+    add_events(
+        task_id,
+        (TaskEventType.UPDATED, datetime.utcnow() - timedelta(days=100), {"status": "in_progress"}),
+        (TaskEventType.UPDATED, LONG_AGO, {"status": "done"}),
+    )
+
+    with SessionLocal() as db:
+        summary = events.run_maintenance(
+            db, Settings(event_partition_months_ahead=2, event_compact_after_days=30, event_retention_days=365)
+        )
+    # The first month failed and is retried next run; the others were created
+    assert summary["partitions_created"] == created[1:] and len(created) == 3
+    assert summary["expired_removed"] == 1
+    assert len(event_rows(task_id)) == 1
+
+
+@pytest.mark.postgres
+def test_partitions_are_created_ahead_and_take_their_stranded_rows(create_task, partitions):
+    with SessionLocal() as db:
+        assert events._is_partitioned(db) and events.DEFAULT_PARTITION in partitions  # migration 004
+    months = [events._month_start(datetime.utcnow())]
+    for _ in range(6):
+        months.append(events._next_month(months[-1]))
+    task_id = create_task()["id"]
+    add_events(task_id, (TaskEventType.UPDATED, datetime.combine(months[-1], datetime.min.time()), {"status": "done"}))
+    assert partition_of(task_id) == [events.DEFAULT_PARTITION]  # past every partition so far
+
+    with SessionLocal() as db:
+        created = events.ensure_partitions(db, months_ahead=6)
+        assert events.ensure_partitions(db, months_ahead=6) == []
+    names = [f"{events.PARTITION_PREFIX}{month:%Y%m}" for month in months]
+    assert created == [name for name in names if name not in partitions]
+    assert partition_of(task_id) == [names[-1]]
+
+
+@pytest.mark.postgres
+def test_expired_partitions_are_dropped_whole(create_task, partitions):
+    task_id = create_task()["id"]
+    with SessionLocal() as db:
+        events._create_partition(db, "task_events_p202003", LONG_AGO.date().replace(day=1), has_default=True)
+    add_events(
+        task_id,
+        (TaskEventType.UPDATED, LONG_AGO, {"status": "in_progress"}),
+        (TaskEventType.UPDATED, datetime(2020, 4, 2), {"status": "done"}),  # no partition: DEFAULT
+    )
+
+    with SessionLocal() as db:
+        # The March partition is dropped; April's row is deleted from DEFAULT
+        assert events.drop_expired(db, datetime(2020, 5, 1)) == 2
+        assert "task_events_p202003" not in events._partitions(db)
+    assert event_rows(task_id) == []
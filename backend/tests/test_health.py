@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import cache, lifecycle
+from app.config import Settings
+from app.health import HealthMonitor
+from app.main import health_monitor
+
+
+@pytest.fixture
+def ready(monkeypatch):
+    monkeypatch.setattr(lifecycle, "_ready", threading.Event())
+    monkeypatch.setattr(lifecycle, "_draining", threading.Event())
+    monkeypatch.setattr(health_monitor, "checks", {})
+    monkeypatch.setattr(health_monitor, "loop_lag", 0.0)
+    lifecycle.mark_ready()
+
+
+def readyz(client):
+    response = client.get("/readyz")
+    return response.status_code, response.json()
+
+
+def test_readyz_serves_the_probed_snapshot(client, ready):
+    asyncio.run(health_monitor.probe_once())
+    status, body = readyz(client)
+    assert (status, body["status"]) == (200, "ready")
+    assert body["checks"]["database"]["ok"] and body["checks"]["redis"]["ok"]
+    assert body["checked_at"] is not None
+
+
+def test_only_critical_failures_make_the_worker_unready(client, ready, monkeypatch):
+    class DownRedis:
+        def ping(self):
+            raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache, "_client", DownRedis())
+    asyncio.run(health_monitor.probe_once())
+    status, body = readyz(client)
+    assert (status, body["status"]) == (200, "ready")
+    assert (body["checks"]["redis"]["ok"], body["checks"]["redis"]["critical"]) == (False, False)
+
+    monkeypatch.setattr(health_monitor, "_probe_database", lambda: 1 / 0)
+    asyncio.run(health_monitor.probe_once())
+    status, body = readyz(client)
+    assert (status, body["status"]) == (503, "degraded")
+
+
+def test_loop_lag_reports_overloaded(client, ready):
+    health_monitor.loop_lag = 1.0
+    status, body = readyz(client)
+    assert (status, body["status"]) == (503, "overloaded")
+
+
+def test_slow_probes_time_out(database):
+    monitor = HealthMonitor(Settings(readiness_probe_timeout_seconds=0.05), database)
+    monitor._probe_database = lambda: time.sleep(0.5)
+    asyncio.run(monitor.probe_once())
+    assert not monitor.checks["database"].ok
+    assert "TimeoutError" in monitor.checks["database"].detail
+
+
+def test_readyz_does_not_probe(client, ready, monkeypatch):
+    monkeypatch.setattr(health_monitor, "_probe_database", lambda: pytest.fail("probed on request"))
+    for _ in range(3):
+        client.get("/readyz")
@@ -0,0 +1,88 @@
+import gzip
+from datetime import datetime, timedelta
+
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import CompressionMiddleware, choose_encoding
+from app.utils.conditional import http_date
+
+
+def test_task_list_revalidates_until_the_collection_changes(client, auth_headers, create_task):
+    task = create_task("First")
+    first = client.get("/tasks", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get("/tasks", headers={**auth_headers, "If-None-Match": f"W/{etag}"})
+    assert (cached.status_code, cached.content, cached.headers["ETag"]) == (304, b"", etag)
+    assert client.get("/tasks?limit=5", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+
+    client.patch(f"/tasks/{task['id']}", json={"title": "Renamed"}, headers=auth_headers)
+    changed = client.get("/tasks", headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+    etag = changed.headers["ETag"]
+    client.delete(f"/tasks/{task['id']}", headers=auth_headers)
+    assert client.get("/tasks", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_single_task_honours_if_modified_since(client, auth_headers, create_task):
+    task = create_task()
+    response = client.get(f"/tasks/{task['id']}", headers=auth_headers)
+    last_modified = response.headers["Last-Modified"]
+    assert client.get(
+        f"/tasks/{task['id']}", headers={**auth_headers, "If-Modified-Since": last_modified}
+    ).status_code == 304
+
+    earlier = http_date(datetime.utcnow() - timedelta(days=1))
+    assert client.get(
+        f"/tasks/{task['id']}", headers={**auth_headers, "If-Modified-Since": earlier}
+    ).status_code == 200
+
+
+def test_large_lists_are_compressed_with_an_encoded_etag(client, auth_headers, create_task):
+    for i in range(10):
+        create_task(f"Task {i}", description="x" * 100)
+    plain = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    for encoding in ("gzip", "br"):
+        response = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": f"{encoding}, deflate"})
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.headers["ETag"] == plain.headers["ETag"][:-1] + f'-{encoding}"'
+        assert response.json() == plain.json()
+
+        cached = client.get(
+            "/tasks",
+            headers={**auth_headers, "Accept-Encoding": encoding, "If-None-Match": response.headers["ETag"]},
+        )
+        assert (cached.status_code, cached.headers["ETag"]) == (304, response.headers["ETag"])
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/healthz", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    assert choose_encoding("deflate") is None
+
+
+def test_streaming_responses_are_compressed_chunk_by_chunk():
+    async def chunks():
+        for i in range(3):
+            yield f"line {i}\n".encode() * 10
+
+    app = Starlette(routes=[Route("/", lambda request: StreamingResponse(chunks(), media_type="text/plain"))])
+    client = TestClient(CompressionMiddleware(app, minimum_size=1024))
+    with client.stream("GET", "/", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw) == b"".join(f"line {i}\n".encode() * 10 for i in range(3))
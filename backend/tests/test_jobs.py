@@ -0,0 +1,205 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app import jobs
+from app.config import Settings
+from app.deps import SessionLocal
+from app.models import Job, JobStatus
+from app.routers import jobs as jobs_router
+from app.worker import Worker
+
+WORKER = "host:1/0"
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Register test job kinds: ``echo`` returns its payload, ``boom`` raises."""
+
+    def boom(db, payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(jobs.HANDLERS, "echo", lambda db, payload: payload)
+    monkeypatch.setitem(jobs.HANDLERS, "boom", boom)
+
+
+def job(job_id):
+    with SessionLocal() as db:
+        return db.get(Job, job_id)
+
+
+def make_due(job_id):
+    with SessionLocal() as db:
+        db.get(Job, job_id).run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+
+def test_enqueue_dedupes_and_rejects_unknown_kinds(handlers):
+    with SessionLocal() as db:
+        assert jobs.enqueue(db, "echo", dedupe_key="echo@0") is not None
+        assert jobs.enqueue(db, "echo", dedupe_key="echo@0") is None
+        assert jobs.enqueue(db, "echo", dedupe_key="echo@60") is not None
+        with pytest.raises(ValueError):
+            jobs.enqueue(db, "nonexistent")
+
+
+def test_claim_takes_the_oldest_due_job_and_only_once(handlers):
+    with SessionLocal() as db:
+        later = jobs.enqueue(db, "echo", run_at=datetime.utcnow() + timedelta(hours=1)).id
+        first = jobs.enqueue(db, "echo", run_at=datetime.utcnow() - timedelta(minutes=1)).id
+        second = jobs.enqueue(db, "echo").id
+
+        claimed = jobs.claim(db, WORKER)
+        assert (claimed.id, claimed.status, claimed.attempts, claimed.locked_by) == (
+            first, JobStatus.RUNNING, 1, WORKER
+        )
+        assert jobs.claim(db, "host:2/0").id == second
+        assert jobs.claim(db, WORKER) is None  # the last one is not due yet
+    assert job(later).status == JobStatus.QUEUED
+
+
+def test_claim_skips_rows_locked_by_other_workers(handlers, monkeypatch):
+    with SessionLocal() as db:
+        queries = []
+        scalars = db.scalars
+        monkeypatch.setattr(db, "scalars", lambda query: queries.append(query) or scalars(query))
+        jobs.claim(db, WORKER)
+    [query] = queries
+    assert "FOR UPDATE SKIP LOCKED" in str(query.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.postgres
+def test_concurrent_claims_pass_over_locked_rows(handlers):
+    with SessionLocal() as db:
+        first, second = jobs.enqueue(db, "echo").id, jobs.enqueue(db, "echo").id
+    with SessionLocal() as other, SessionLocal() as db:
+        # Another worker mid-claim: the oldest job's row is locked until it commits
+        other.scalars(select(Job).where(Job.id == first).with_for_update()).one()
+        db.execute(text("SET LOCAL lock_timeout = '2s'"))  # fail rather than hang if it waits
+        assert jobs.claim(db, WORKER).id == second
+        other.rollback()
+        assert jobs.claim(db, "host:2/0").id == first
+
+
+def test_outcomes_are_recorded_only_by_the_lease_holder(handlers):
+    with SessionLocal() as db:
+        jobs.enqueue(db, "echo")
+        claimed = jobs.claim(db, WORKER)
+        assert not jobs.complete(db, claimed, "host:2/0", {"stolen": True})
+        assert jobs.complete(db, claimed, WORKER, {"ok": True})
+        assert not jobs.fail(db, claimed, WORKER, "too late")  # already finished
+        job_id = claimed.id
+    finished = job(job_id)
+    assert (finished.status, finished.result, finished.locked_by) == (JobStatus.SUCCEEDED, {"ok": True}, None)
+    assert finished.finished_at is not None
+
+
+def test_failed_attempts_back_off_then_fail_for_good(handlers, monkeypatch):
+    monkeypatch.setattr(jobs, "settings", Settings(job_max_attempts=3, job_backoff_seconds=10, job_backoff_max_seconds=15))
+    assert [jobs.retry_delay(attempts) for attempts in (1, 2, 3)] == [10, 15, 15]
+    with SessionLocal() as db:
+        job_id = jobs.enqueue(db, "boom").id
+    worker = Worker(Settings())
+
+    for attempt in (1, 2):
+        assert worker.run_once(WORKER)
+        retried = job(job_id)
+        assert (retried.status, retried.attempts, retried.error) == (JobStatus.QUEUED, attempt, "RuntimeError: boom")
+        assert retried.run_at > datetime.utcnow() + timedelta(seconds=5)
+        assert not worker.run_once(WORKER)  # backing off
+        make_due(job_id)
+
+    assert worker.run_once(WORKER)
+    assert (job(job_id).status, job(job_id).attempts) == (JobStatus.FAILED, 3)
+
+
+def test_expired_leases_are_requeued_or_failed(handlers):
+    with SessionLocal() as db:
+        for _ in range(3):
+            jobs.enqueue(db, "echo")
+        lost, exhausted, alive = (jobs.claim(db, WORKER).id for _ in range(3))
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        db.get(Job, lost).locked_at = long_ago
+        db.get(Job, exhausted).locked_at = long_ago
+        db.get(Job, exhausted).attempts = db.get(Job, exhausted).max_attempts
+        db.commit()
+
+        assert jobs.requeue_stale(db, lease_seconds=60) == 2
+    assert (job(lost).status, job(lost).locked_by) == (JobStatus.QUEUED, None)
+    assert (job(exhausted).status, job(exhausted).error) == (JobStatus.FAILED, "Worker lease expired")
+    assert job(alive).status == JobStatus.RUNNING
+
+
+def test_purge_removes_only_old_finished_jobs(handlers):
+    with SessionLocal() as db:
+        for _ in range(3):
+            jobs.enqueue(db, "echo")
+        old, recent = jobs.claim(db, WORKER), jobs.claim(db, WORKER)
+        jobs.complete(db, old, WORKER, None)
+        jobs.complete(db, recent, WORKER, None)
+        db.get(Job, old.id).finished_at = datetime.utcnow() - timedelta(days=30)
+        db.commit()
+
+        assert jobs.purge_finished(db, datetime.utcnow() - timedelta(days=7)) == 1
+        assert db.query(Job).count() == 2
+
+
+def test_each_periodic_slot_is_enqueued_once_across_workers():
+    settings = Settings(job_reconcile_counters_seconds=60, job_purge_seconds=0, job_refresh_scores_seconds=0)
+    kinds = jobs.periodic_jobs(settings)
+    assert "reconcile_counters" in kinds and "purge_jobs" not in kinds
+    first, second = Worker(settings), Worker(settings)
+
+    now = 6000.0
+    assert first.schedule(now) == len(kinds)
+    assert second.schedule(now) == 0  # same slots, deduped
+    assert first.schedule(now + 59) == 0
+    assert second.schedule(now + 60) == 1  # the next reconcile_counters slot
+    with SessionLocal() as db:
+        assert db.query(Job).filter(Job.kind == "reconcile_counters").count() == 2
+
+
+def test_background_prioritization_runs_in_the_worker(client, auth_headers, register, create_task, fake_ai):
+    create_task("Write report")
+    response = client.post("/ai/prioritize-saved?background=true", headers=auth_headers)
+    assert response.status_code == 202
+    accepted = response.json()
+    assert response.headers["Location"] == accepted["status_url"] == f"/jobs/{accepted['job_id']}"
+    # A repeat request shares the queued job
+    assert client.post("/ai/prioritize-saved?background=true", headers=auth_headers).json() == accepted
+    assert client.get(accepted["status_url"], headers=auth_headers).json()["status"] == "queued"
+
+    assert Worker(Settings()).run_once(WORKER)
+    status = client.get(accepted["status_url"], headers=auth_headers).json()
+    assert status["status"] == "succeeded" and status["attempts"] == 1
+    assert [result["title"] for result in status["result"]["results"]] == ["Write report"]
+
+    stream = client.get(accepted["stream_url"], headers=auth_headers)
+    [event] = [line for line in stream.text.splitlines() if line.startswith("data: ")]
+    assert json.loads(event[len("data: "):])["status"] == "succeeded"
+
+    stranger = {"Authorization": f"Bearer {register('stranger@example.com')['access_token']}"}
+    assert client.get(accepted["status_url"], headers=stranger).status_code == 404
+
+
+def test_stream_polls_off_the_event_loop(client, auth_headers, create_task, monkeypatch):
+    create_task()
+    status_url = client.post("/ai/prioritize-saved?background=true", headers=auth_headers).json()["stream_url"]
+    polled_on_loop = []
+
+    def session():
+        try:
+            asyncio.get_running_loop()
+            polled_on_loop.append(True)
+        except RuntimeError:
+            polled_on_loop.append(False)
+        return SessionLocal()
+
+    monkeypatch.setattr(jobs_router, "SessionLocal", session)
+    Worker(Settings()).run_once(WORKER)
+    assert "succeeded" in client.get(status_url, headers=auth_headers).text
+    assert polled_on_loop == [False]
@@ -0,0 +1,53 @@
+import asyncio
+import signal
+import threading
+
+import pytest
+import uvicorn
+
+from app import lifecycle
+from app.server import DrainingServer, worker_count
+
+
+@pytest.fixture(autouse=True)
+def fresh_lifecycle(monkeypatch):
+    monkeypatch.setattr(lifecycle, "_ready", threading.Event())
+    monkeypatch.setattr(lifecycle, "_draining", threading.Event())
+
+
+def test_worker_count():
+    assert worker_count(3) == 3
+    assert worker_count(0) >= 1
+
+
+def test_phases():
+    assert (lifecycle.phase(), lifecycle.is_ready()) == ("starting", False)
+    lifecycle.mark_ready()
+    assert (lifecycle.phase(), lifecycle.is_ready()) == ("ready", True)
+    lifecycle.mark_draining()
+    assert (lifecycle.phase(), lifecycle.is_ready()) == ("draining", False)
+
+
+def test_first_signal_drains_before_exiting_and_the_second_exits_at_once():
+    async def run():
+        server = DrainingServer(uvicorn.Config("app.main:app"), shutdown_delay=0.05)
+        server.handle_exit(signal.SIGTERM, None)
+        assert lifecycle.phase() == "draining" and not server.should_exit
+        await asyncio.sleep(0.1)
+        assert server.should_exit
+
+        impatient = DrainingServer(uvicorn.Config("app.main:app"), shutdown_delay=60)
+        impatient.handle_exit(signal.SIGTERM, None)  # already draining
+        assert impatient.should_exit
+
+    asyncio.run(run())
+
+
+def test_readyz_reports_starting_and_draining(client):
+    response = client.get("/readyz")
+    assert (response.status_code, response.json()["status"]) == (503, "starting")
+    lifecycle.mark_ready()
+    lifecycle.mark_draining()
+    response = client.get("/readyz")
+    assert (response.status_code, response.json()["status"]) == (503, "draining")
+    assert client.get("/healthz").status_code == 200  # still live while draining
@@ -0,0 +1,44 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, exc
+
+from app.config import Settings
+from app.db import _pool_class, engine_options, warm_pool
+
+POSTGRES_URL = "postgresql+psycopg://taskflow:taskflow@db:5432/taskflow"
+
+
+def sample(name, pool):
+    return REGISTRY.get_sample_value(name, {"pool": pool}) or 0
+
+
+def test_engine_options_follow_the_pool_settings():
+    settings = Settings(db_pool_size=4, db_max_overflow=2, db_pool_timeout=1.5, db_pool_pre_ping=True)
+    options = engine_options(POSTGRES_URL, settings, name="replica0")
+    assert options["poolclass"] is _pool_class("replica0")
+    assert (options["pool_size"], options["max_overflow"], options["pool_timeout"]) == (4, 2, 1.5)
+    assert options["pool_pre_ping"] and "connect_args" not in options
+
+    pgbouncer = engine_options(POSTGRES_URL, Settings(db_pgbouncer_mode=True))
+    assert pgbouncer["connect_args"] == {"prepare_threshold": None}
+    assert "poolclass" not in engine_options("sqlite:///x.db", settings)
+
+
+def test_pool_records_waits_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db", poolclass=_pool_class("test-pool"), pool_size=2, max_overflow=0,
+        pool_timeout=0.05,
+    )
+    warm_pool(engine, 2)
+    assert engine.pool.checkedin() == 2
+
+    waits = sample("taskflow_db_pool_wait_seconds_count", "test-pool")
+    held = [engine.connect() for _ in range(2)]
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    for conn in held:
+        conn.close()
+    assert sample("taskflow_db_pool_timeouts_total", "test-pool") == 1
+    assert sample("taskflow_db_pool_wait_seconds_count", "test-pool") == waits + 3  # every checkout
+    engine.dispose()
+    assert engine.pool.__class__ is _pool_class("test-pool")  # metrics survive dispose()
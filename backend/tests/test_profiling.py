@@ -0,0 +1,68 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import deps, profiling
+from app.main import app
+from app.profiling import ProfileStore, ProfilingMiddleware, install_sql_capture
+
+TOKEN = "admin-secret"
+
+
+@pytest.fixture
+def profiled(monkeypatch):
+    """The app behind ProfilingMiddleware, with admin endpoints enabled and an empty store."""
+    monkeypatch.setattr(deps.settings, "admin_token", TOKEN)
+    monkeypatch.setattr(profiling, "store", ProfileStore(5))
+    install_sql_capture()
+
+    def client(**options):
+        return TestClient(ProfilingMiddleware(app, token=TOKEN, **options))
+
+    return client
+
+
+def test_header_captures_stack_and_sql(profiled, auth_headers):
+    client = profiled()
+    response = client.get("/tasks", headers={**auth_headers, "X-Profile": TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    admin = {"X-Admin-Token": TOKEN}
+    [summary] = client.get("/admin/profiles", headers=admin).json()
+    assert (summary["id"], summary["path"], summary["trigger"], summary["status"]) == (
+        int(profile_id), "/tasks", "header", 200
+    )
+    detail = client.get(f"/admin/profiles/{profile_id}", headers=admin).json()
+    assert detail["profiler"] == "pyinstrument" and detail["profile"]
+    assert any("FROM tasks" in statement["sql"] for statement in detail["statements"])
+    assert detail["statement_count"] == len(detail["statements"]) > 0
+
+    assert client.delete("/admin/profiles", headers=admin).status_code == 204
+    assert client.get("/admin/profiles", headers=admin).json() == []
+
+
+def test_wrong_token_and_unprofiled_requests_capture_nothing(profiled, auth_headers):
+    client = profiled()
+    response = client.get("/tasks", headers={**auth_headers, "X-Profile": "guess"})
+    assert "X-Profile-Id" not in response.headers
+    client.get("/tasks", headers=auth_headers)
+    assert profiling.store.list() == []
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "guess"}).status_code == 403
+
+
+def test_samples_are_kept_only_when_slow(profiled, auth_headers):
+    profiled(sample_rate=1.0, slow_ms=60_000).get("/tasks", headers=auth_headers)
+    assert profiling.store.list() == []
+
+    client = profiled(sample_rate=1.0, slow_ms=0)
+    client.get("/tasks", headers=auth_headers)
+    client.get("/healthz")  # never sampled
+    assert [(p.path, p.trigger) for p in profiling.store.list()] == [("/tasks", "sample")]
+
+
+def test_store_is_bounded():
+    store = ProfileStore(2)
+    for _ in range(3):
+        store.add(profiling.RequestProfile(store.next_id(), "GET", "/", "", "sample", started_at=None))
+    assert [profile.id for profile in store.list()] == [3, 2]
+    assert store.get(1) is None
@@ -0,0 +1,89 @@
+import pytest
+from pydantic import ValidationError
+
+from app import cache
+from app.config import Settings
+from app.utils import ratelimit
+from app.utils.ratelimit import Limit, MemoryLimiter, RateLimiter
+
+
+class Clock:
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    monkeypatch.setattr(ratelimit.time, "time", clock)
+    return clock
+
+
+def test_memory_bucket_allows_burst_then_refills(clock):
+    limiter = MemoryLimiter()
+    limit = Limit(per_minute=60, burst=3)
+    assert [limiter.take("k", limit)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_ms, _ = limiter.take("k", limit)
+    assert not allowed and retry_ms == 1000
+
+    clock.now += 1
+    assert limiter.take("k", limit)[0]
+    assert not limiter.take("k", limit)[0]
+
+
+def test_memory_sliding_window_weights_the_previous_window(clock):
+    limiter = MemoryLimiter()
+    clock.now = 100.0  # start of a 10s window
+    assert all(limiter.window("q", 4, 10_000)[0] for _ in range(4))
+    assert not limiter.window("q", 4, 10_000)[0]
+
+    clock.now = 115.0  # halfway through the next window: 4 * 0.5 still count
+    assert [limiter.window("q", 4, 10_000)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_prune_keeps_clients_that_are_still_limited(clock):
+    limiter = MemoryLimiter()
+    limiter.max_keys = limiter._prune_above["buckets"] = 4
+    slow, fast = Limit(per_minute=1, burst=2), Limit(per_minute=60, burst=2)
+    for _ in range(2):
+        limiter.take("busy", slow)  # empty bucket, refilling for two minutes
+    for i in range(3):
+        limiter.take(f"idle{i}", fast)
+    clock.now += 10  # the idle buckets have refilled
+    limiter.take("new", fast)
+
+    assert set(limiter._buckets) == {"busy", "new"}
+    assert not limiter.take("busy", slow)[0]  # its quota was not reset
+
+
+def test_redis_bucket_and_window():
+    client = cache.get_redis()  # fakeredis, or the real Redis with TEST_REDIS_URL
+    limiter = RateLimiter(redis_client=lambda: client)
+    limit = Limit(per_minute=60, burst=2)
+    assert [limiter.take("k", limit)[0] for _ in range(3)] == [True, True, False]
+    assert [limiter.window("q", 2, 60)[0] for _ in range(3)] == [True, True, False]
+    assert client.exists("rl:k")
+
+
+def test_zero_rates_are_rejected():
+    with pytest.raises(ValueError):
+        Limit(per_minute=0, burst=5)
+    with pytest.raises(ValidationError):
+        Settings(rate_limit_crud_per_minute=0)
+    with pytest.raises(ValidationError):
+        Settings(ai_quota_window_seconds=0)
+
+
+def test_auth_scope_returns_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(ratelimit.settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(ratelimit.settings, "rate_limit_auth_burst", 2)
+    credentials = {"email": "nobody@example.com", "password": "wrongpassword"}
+    statuses = [client.post("/auth/login", json=credentials).status_code for _ in range(3)]
+    assert statuses == [401, 401, 429]
+    response = client.post("/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
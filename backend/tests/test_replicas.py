@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app import deps
+from app.config import Settings
+from app.db import ReplicaRouter
+from app.health import HealthMonitor
+from app.models import Base
+
+
+@pytest.fixture
+def router(tmp_path):
+    """Two empty SQLite 'replicas' (never probed, so not yet used)."""
+    settings = Settings(
+        database_replica_urls=[f"sqlite:///{tmp_path}/replica{i}.db" for i in range(2)],
+        read_your_writes_seconds=60,
+        replica_check_interval_seconds=0.05,
+    )
+    router = ReplicaRouter(settings, settings.database_replica_urls)
+    for replica in router.replicas:
+        Base.metadata.create_all(bind=replica.engine)
+    yield router
+    for replica in router.replicas:
+        replica.engine.dispose()
+
+
+def probed(router, healthy=True, latencies=(0.01, 0.01)):
+    for replica, latency in zip(router.replicas, latencies):
+        replica.healthy, replica.latency, replica.checked_at = healthy, latency, time.monotonic()
+
+
+def target(router, key=None):
+    db = router.session(key)
+    if db is None:
+        return "primary"
+    db.close()
+    return db.info["replica"]
+
+
+def test_reads_use_only_fresh_healthy_probes(router, monkeypatch):
+    monkeypatch.setattr(router, "check", lambda replica: pytest.fail("probed on the request path"))
+    assert target(router) == "primary"  # never probed
+
+    probed(router)
+    assert {target(router) for _ in range(4)} == {"replica0", "replica1"}  # round robin
+
+    router.replicas[0].healthy = False
+    assert {target(router) for _ in range(4)} == {"replica1"}
+
+    router.replicas[1].checked_at -= 1  # older than three check intervals
+    assert target(router) == "primary"
+
+
+def test_least_latency_prefers_the_fastest_replica(router):
+    router.settings.replica_selection = "least_latency"
+    probed(router, latencies=(0.05, 0.01))
+    assert {target(router) for _ in range(3)} == {"replica1"}
+
+
+def test_writers_read_their_own_writes_from_the_primary(router):
+    probed(router)
+    router.note_write("42")
+    assert target(router, "42") == "primary"
+    assert target(router, "7") != "primary"
+
+
+def test_health_monitor_probes_replicas_in_the_background(router, database):
+    monitor = HealthMonitor(router.settings, database, replicas=router)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+
+    asyncio.run(run())
+    # The lag query is Postgres-only, so SQLite replicas probe as unhealthy
+    assert all(replica.checked_at is not None and not replica.healthy for replica in router.replicas)
+
+
+def test_api_reads_move_to_a_replica_after_the_write_window(client, create_task, auth_headers, router, monkeypatch):
+    monkeypatch.setattr(deps, "replicas", router)
+    router.settings.replica_check_interval_seconds = 60  # keep the probe fresh across the requests
+    probed(router)
+    create_task("Fresh")
+    assert client.get("/tasks", headers=auth_headers).json()["total"] == 1  # pinned to the primary
+
+    router._recent_writes.clear()
+    assert client.get("/tasks", headers=auth_headers).json()["total"] == 0  # the (empty) replica
+
+
+@pytest.mark.postgres
+def test_lag_probe_runs_on_postgres(database):
+    # The test database stands in for a replica; a primary is not replaying WAL, so no lag
+    url = database.url.render_as_string(hide_password=False)
+    router = ReplicaRouter(Settings(replica_max_lag_seconds=5), [url])
+    [replica] = router.replicas
+    try:
+        router.check_all()
+    finally:
+        replica.engine.dispose()
+    assert (replica.healthy, replica.lag) == (True, 0.0) and replica.latency > 0
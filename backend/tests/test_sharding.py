@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import func, select, update
+
+from app import sharding
+from app.config import Settings
+from app.deps import SessionLocal, engine
+from app.models import Base, Task, TaskEvent, User
+from app.sharding import PRIMARY, HashRing, ShardMoving, ShardRouter
+
+USERS = range(1, 20001)
+
+
+def test_ring_spreads_users_evenly():
+    ring = HashRing(["primary", "shard1", "shard2"], virtual_nodes=64)
+    counts = {}
+    for user_id in USERS:
+        name = ring.lookup(user_id)
+        counts[name] = counts.get(name, 0) + 1
+    assert set(counts) == {"primary", "shard1", "shard2"}
+    assert all(count > len(USERS) / 3 * 0.7 for count in counts.values())
+
+
+def test_adding_a_shard_only_moves_users_onto_it():
+    before = HashRing(["primary", "shard1", "shard2"], virtual_nodes=64)
+    after = HashRing(["primary", "shard1", "shard2", "shard3"], virtual_nodes=64)
+    moved = [user_id for user_id in USERS if before.lookup(user_id) != after.lookup(user_id)]
+    assert all(after.lookup(user_id) == "shard3" for user_id in moved)
+    assert 0.15 < len(moved) / len(USERS) < 0.35  # about 1/4
+
+
+def test_placement_is_stable():
+    ring = HashRing(["primary", "shard1"])
+    assert [ring.lookup(user_id) for user_id in range(100)] == [
+        HashRing(["shard1", "primary"]).lookup(user_id) for user_id in range(100)
+    ]
+
+
+@pytest.fixture
+def router(tmp_path):
+    """The test database as the primary, plus an empty shard1."""
+    settings = Settings(database_shard_urls=[f"sqlite:///{tmp_path}/shard1.db"], shard_directory_ttl_seconds=0)
+    router = ShardRouter(settings, engine, SessionLocal)
+    Base.metadata.create_all(bind=router.shards["shard1"].engine)
+    yield router
+    router.shards["shard1"].engine.dispose()
+
+
+def user_tasks(db, user_id):
+    return db.execute(select(Task.id, Task.title).where(Task.user_id == user_id).order_by(Task.id)).all()
+
+
+def test_move_copies_in_batches_and_empties_the_source(router, create_task, monkeypatch):
+    monkeypatch.setattr(sharding, "COPY_BATCH", 2)
+    for i in range(5):
+        user_id = create_task(f"Task {i}")["user_id"]
+    with SessionLocal() as db:
+        before = user_tasks(db, user_id)
+
+    assert sharding.move_user(router, user_id, "shard1", sleep=lambda seconds: None)
+    assert router.placement(user_id) == ("shard1", False)
+    with router.session(user_id) as db:
+        assert user_tasks(db, user_id) == before
+    with SessionLocal() as db:
+        assert user_tasks(db, user_id) == []
+        assert db.get(User, user_id).shard == "shard1"
+
+
+def test_sync_applies_deletes_and_updates(router, create_task, monkeypatch):
+    monkeypatch.setattr(sharding, "COPY_BATCH", 2)
+    task_ids = [create_task(f"Task {i}")["id"] for i in range(4)]
+    user_id = create_task("Last")["user_id"]
+    with SessionLocal() as source, router.shards["shard1"].session_factory() as target:
+        target.execute(sharding.insert(User.__table__).values(
+            dict(source.execute(select(User.__table__).where(User.id == user_id)).mappings().one())
+        ))
+        sharding.sync_user(source, target, user_id)
+        source.execute(update(Task).where(Task.id == task_ids[1]).values(title="Renamed"))
+        source.execute(sharding.delete(TaskEvent).where(TaskEvent.task_id == task_ids[2]))
+        source.execute(sharding.delete(Task).where(Task.id == task_ids[2]))
+        source.commit()
+
+        changes = sharding.sync_user(source, target, user_id)
+        assert changes["tasks"] == 2
+        assert user_tasks(target, user_id) == user_tasks(source, user_id)
+
+
+def test_write_sessions_are_fenced_during_and_after_a_move(router, create_task):
+    user_id = create_task()["user_id"]
+    stale = router.open_session(user_id, write=True)  # placement cached before the move
+    reader = router.open_session(user_id)
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(shard_moving=True))
+        db.commit()
+    with pytest.raises(ShardMoving):
+        stale.execute(select(func.count()).select_from(Task))
+    stale.close()
+    assert reader.execute(select(func.count()).select_from(Task)).scalar() == 1  # reads carry on
+    reader.close()
+
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.id == user_id).values(shard_moving=False, shard="shard1"))
+        db.commit()
+    with router.primary.session_factory() as db:
+        db.info.update(shard=PRIMARY, write_fence=user_id)
+        with pytest.raises(ShardMoving):
+            db.execute(select(func.count()).select_from(Task))
+
+
+def test_maintenance_skips_users_mid_move(router, create_task):
+    user_id = create_task()["user_id"]
+    with SessionLocal() as db:
+        db.info["shard"] = PRIMARY
+        assert db.scalars(router.settled_users(db)).all() == [user_id]
+        db.execute(update(User).where(User.id == user_id).values(shard_moving=True))
+        db.commit()
+        assert db.scalars(router.settled_users(db)).all() == []
+
+
+@pytest.mark.postgres
+def test_prepare_gives_each_shard_its_own_id_range(create_task, database):
+    sharding.prepare(ShardRouter(Settings(), engine, SessionLocal))
+    assert create_task()["id"] == 1  # the primary's range starts at 1
+
+    # The test database again, as shard1: its sequences move to shard1's range
+    url = database.url.render_as_string(hide_password=False)
+    router = ShardRouter(Settings(database_shard_urls=[url]), engine, SessionLocal)
+    try:
+        sharding.prepare(router)
+    finally:
+        router.shards["shard1"].engine.dispose()
+    assert create_task()["id"] == sharding.ID_RANGE + 1
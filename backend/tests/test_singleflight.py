@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.deps import SessionLocal
+from app.schemas import TaskForPrioritization
+from app.services import ai, scoring
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight("test", enabled=True)
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return ["result"]
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", slow)
+        assert started.wait(5)
+        followers = [pool.submit(flight.do, "key", slow) for _ in range(3)]
+        while flight._calls["key"].shared < 3:  # all three joined the flight
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(runs) == 1
+    assert all(result is results[0] for result in results)
+    assert len(flight) == 0
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight("test", enabled=True)
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", failing)
+        assert started.wait(5)
+        follower = pool.submit(flight.do, "key", failing)
+        while flight._calls["key"].shared < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="boom"):
+                future.result()
+
+
+def test_nothing_is_cached_between_calls():
+    flight = SingleFlight("test", enabled=True)
+    calls = iter(range(10))
+    assert flight.do("key", lambda: next(calls)) == 0
+    assert flight.do("key", lambda: next(calls)) == 1
+    assert flight.do("other", lambda: next(calls)) == 2
+
+
+def test_disabled_flight_calls_through():
+    flight = SingleFlight("test", enabled=False)
+    assert flight.do("key", lambda x: x * 2, 21) == 42
+    assert len(flight) == 0
+
+
+@pytest.fixture
+def flight_keys(monkeypatch):
+    """Keys the prioritization flights are entered with (calls still run)."""
+    keys = []
+    for flight in (ai.prioritizations, scoring.saved_prioritizations):
+        monkeypatch.setattr(flight, "do", lambda key, fn, *args: keys.append(key) or fn(*args))
+    return keys
+
+
+def test_prioritizations_are_shared_only_by_one_user(flight_keys, monkeypatch):
+    tasks = [TaskForPrioritization(title="Write report", importance=3)]
+    ai.prioritize_tasks(tasks, user_id=1)
+    ai.prioritize_tasks(tasks, user_id=1)
+    ai.prioritize_tasks(tasks, user_id=2)
+    monkeypatch.setattr(ai.settings, "ai_provider", "none")
+    ai.prioritize_tasks(tasks, user_id=1)
+    first, again, other_user, other_provider = flight_keys
+    assert first == again
+    assert len({first, other_user, other_provider}) == 3
+
+
+def test_saved_prioritizations_are_keyed_by_collection_version(flight_keys, client, auth_headers, create_task):
+    task = create_task()
+    with SessionLocal() as db:
+        scoring.score_saved_tasks(db, db, task["user_id"])
+        scoring.score_saved_tasks(db, db, task["user_id"])  # the scores written moved updated_at
+        client.patch(f"/tasks/{task['id']}", json={"title": "Renamed"}, headers=auth_headers)
+        scoring.score_saved_tasks(db, db, task["user_id"])
+    assert len(set(flight_keys)) == 3
+    assert all(key[:2] == (task["user_id"], None) for key in flight_keys)
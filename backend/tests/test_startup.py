@@ -0,0 +1,42 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# Cumulative `python -X importtime` budget for `import app.main` in a fresh
+# process (about 1.5s on a laptop; the remainder is mostly FastAPI itself)
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 3000))
+
+# Loaded on first use only (see init_openai_client, pwd_context, TokenVerifier, init_tracing)
+LAZY_MODULES = ["openai", "httpx", "jose.jwt", "passlib", "opentelemetry"]
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+
+
+def loaded_after(module: str, candidates: list) -> list:
+    code = f"import sys, {module}; print(' '.join(m for m in {candidates!r} if m in sys.modules))"
+    return run(code).stdout.split()
+
+
+def test_app_import_defers_heavy_dependencies():
+    assert loaded_after("app.main", LAZY_MODULES) == []
+
+
+def test_config_import_stays_light():
+    """CLIs and migrations read settings without loading the web stack."""
+    assert loaded_after("app.config", ["fastapi", "sqlalchemy", "redis", "prometheus_client", *LAZY_MODULES]) == []
+
+
+def test_app_import_time_budget():
+    stderr = run("import app.main", "-X", "importtime").stderr
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", stderr, re.M)
+    assert match, stderr[-500:]
+    elapsed_ms = int(match.group(1)) / 1000
+    assert elapsed_ms < IMPORT_BUDGET_MS, f"import app.main took {elapsed_ms:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)"
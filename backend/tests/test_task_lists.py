@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from app.schemas import TaskPage, TaskResponse
+
+
+def test_list_rows_match_the_task_schema(client, auth_headers, create_task):
+    due = datetime(2030, 1, 2, 3, 4, 5)
+    created = create_task("Report", due_at=due, tags=["work"], estimated_minutes=30)
+    response = client.get("/tasks", headers=auth_headers)
+    assert response.headers["content-type"] == "application/json"
+
+    page = TaskPage.model_validate(response.json())
+    assert page.total == 1 and (page.skip, page.limit) == (0, 20)
+    assert page.items[0] == TaskResponse.model_validate(created)
+    assert response.json()["items"][0]["due_at"] == "2030-01-02T03:04:05"
+
+
+def test_list_pages_newest_first_with_totals(client, auth_headers, create_task):
+    now = datetime.utcnow()
+    ids = [create_task(f"Task {i}", due_at=now + timedelta(days=i))["id"] for i in range(5)]
+
+    page = client.get("/tasks?skip=1&limit=2", headers=auth_headers).json()
+    assert [item["id"] for item in page["items"]] == ids[::-1][1:3]
+    assert page["total"] == 5
+
+    due_to = (now + timedelta(days=1, hours=1)).isoformat()
+    page = client.get(f"/tasks?due_to={due_to}", headers=auth_headers).json()  # counted, not from counters
+    assert sorted(item["id"] for item in page["items"]) == ids[:2] and page["total"] == 2
+
+
+def test_sparse_fields_select_only_what_was_asked(client, auth_headers, create_task):
+    task = create_task("Report", tags=["work"])
+    page = client.get("/tasks?fields=title,status,title", headers=auth_headers).json()
+    assert page["items"] == [{"id": task["id"], "title": "Report", "status": "todo"}]
+
+    single = client.get(f"/tasks/{task['id']}?fields=tags", headers=auth_headers)
+    assert single.json() == {"id": task["id"], "tags": ["work"]}
+    full = client.get(f"/tasks/{task['id']}", headers=auth_headers)
+    assert single.headers["ETag"] != full.headers["ETag"]
+
+
+def test_unknown_fields_are_rejected(client, auth_headers, create_task):
+    task = create_task()
+    for url in ("/tasks?fields=title,password", f"/tasks/{task['id']}?fields=nope"):
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 400 and "Unknown fields" in response.json()["detail"]
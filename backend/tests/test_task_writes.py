@@ -0,0 +1,162 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select, text, update
+
+from app.deps import SessionLocal
+from app.models import Task, TaskEvent, TaskEventType
+from app.schemas import TaskCreate
+from app.services import tasks as task_service
+
+
+@contextmanager
+def statements(engine):
+    """Record the SQL sent to the database."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def concurrent_writes(engine, times):
+    """
+    Bump the task's version from another connection just before the first
+    write of each of our next ``times`` update attempts (each ends in a rollback).
+    """
+    remaining, armed, others = [times], [True], set()
+
+    def interfere(conn, cursor, statement, parameters, context, executemany):
+        if remaining[0] and armed[0] and conn not in others and statement.startswith(("INSERT", "UPDATE")):
+            remaining[0] -= 1
+            armed[0] = False
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as other:
+                others.add(other)
+                other.execute(update(Task).values(version=Task.version + 1))
+            others.discard(other)
+
+    def rearm(conn):
+        if conn not in others:
+            armed[0] = True
+
+    event.listen(engine, "before_cursor_execute", interfere)
+    event.listen(engine, "rollback", rearm)
+    try:
+        yield
+    finally:
+        event.remove(engine, "before_cursor_execute", interfere)
+        event.remove(engine, "rollback", rearm)
+
+
+def stored(task_id):
+    with SessionLocal() as db:
+        return db.get(Task, task_id)
+
+
+def test_create_is_one_insert_returning_the_row(database, create_task):
+    project_id = create_task("First")["project_id"]
+    task_create = TaskCreate(title="Second", project_id=project_id, tags=["a"])
+    with SessionLocal() as db:
+        user_id = db.get(Task, 1).user_id
+        with statements(database) as seen:
+            task = task_service.create_task(db, task_create, user_id)
+        orm = task_service._create_task_orm(db, task_create, user_id)
+
+    task_statements = [statement for statement in seen if " tasks" in statement]
+    assert len(task_statements) == 1 and task_statements[0].startswith("INSERT INTO tasks")
+    assert task.keys() == orm.keys()
+    assert {key: task[key] for key in ("title", "tags", "project_id", "user_id")} == {
+        "title": "Second", "tags": ["a"], "project_id": project_id, "user_id": user_id
+    }
+    assert stored(task["id"]).version == 1
+
+
+def test_create_in_someone_elses_project_writes_nothing(client, register, create_task):
+    project_id = create_task()["project_id"]
+    intruder = {"Authorization": f"Bearer {register('intruder@example.com')['access_token']}"}
+    response = client.post("/tasks", json={"title": "Sneaky", "project_id": project_id}, headers=intruder)
+    assert response.status_code == 400
+    with SessionLocal() as db:
+        assert db.scalars(select(Task.title)).all() == ["Task"]
+
+
+def test_update_returns_the_new_state_and_logs_the_status_change(client, auth_headers, create_task):
+    task = create_task()
+    response = client.patch(f"/tasks/{task['id']}", json={"status": "done"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "done" and response.json()["updated_at"] > task["updated_at"]
+    assert stored(task["id"]).version == 2
+    with SessionLocal() as db:
+        [changed] = db.scalars(
+            select(TaskEvent.payload).where(TaskEvent.event_type == TaskEventType.STATUS_CHANGED)
+        ).all()
+    assert changed == {"from": "todo", "to": "done"}
+    assert client.patch("/tasks/999", json={"status": "done"}, headers=auth_headers).status_code == 404
+
+
+@pytest.fixture(params=["returning", "orm"])
+def attempts(request, monkeypatch):
+    """Take the RETURNING or the ORM update path, and count the write attempts it makes."""
+    if request.param == "orm":
+        monkeypatch.setattr(task_service, "RETURNING_DIALECTS", ())
+    made = []
+    for name in ("_update_task_returning", "_apply_update"):
+        write = getattr(task_service, name)
+        monkeypatch.setattr(task_service, name, lambda *args, write=write: made.append(1) or write(*args))
+    return made
+
+
+PATCHES = [{"title": "Renamed"}, {"status": "done"}]
+
+
+@pytest.mark.parametrize("patch", PATCHES, ids=["title", "status"])
+def test_stale_updates_are_retried(database, client, auth_headers, create_task, attempts, patch):
+    task = create_task()
+    with concurrent_writes(database, 1):
+        response = client.patch(f"/tasks/{task['id']}", json=patch, headers=auth_headers)
+    assert response.status_code == 200 and response.json().items() >= patch.items()
+    assert len(attempts) == 2
+    assert stored(task["id"]).version == 3  # the concurrent bump plus our retried write
+    with SessionLocal() as db:
+        logged = db.scalars(select(TaskEvent.event_type).where(TaskEvent.task_id == task["id"])).all()
+    assert logged.count(TaskEventType.UPDATED) == 1  # the failed attempt left nothing behind
+
+
+@pytest.mark.parametrize("patch", PATCHES, ids=["title", "status"])
+def test_persistent_conflicts_return_409(database, client, auth_headers, create_task, attempts, patch):
+    task = create_task()
+    with concurrent_writes(database, task_service.UPDATE_ATTEMPTS):
+        response = client.patch(f"/tasks/{task['id']}", json=patch, headers=auth_headers)
+    assert response.status_code == 409
+    assert len(attempts) == task_service.UPDATE_ATTEMPTS
+    unchanged = stored(task["id"])
+    assert (unchanged.title, unchanged.status.value) == ("Task", "todo")
+    assert unchanged.version == 1 + task_service.UPDATE_ATTEMPTS  # only the concurrent bumps
+
+
+@pytest.mark.postgres
+def test_a_write_waiting_on_a_row_lock_rechecks_the_version(database, client, auth_headers, create_task, attempts):
+    task = create_task()
+    with database.connect() as holder, ThreadPoolExecutor(1) as pool:
+        holder.execute(update(Task).where(Task.id == task["id"]).values(version=Task.version + 1))  # locks the row
+        patched = pool.submit(client.patch, f"/tasks/{task['id']}", json={"title": "Renamed"}, headers=auth_headers)
+        try:
+            deadline = time.monotonic() + 5
+            while not holder.execute(text("SELECT count(*) FROM pg_locks WHERE NOT granted")).scalar():
+                assert time.monotonic() < deadline, "the update never waited on the row lock"
+                time.sleep(0.01)
+        finally:
+            holder.commit()
+        response = patched.result(timeout=10)
+    # Postgres re-evaluated the version check once the lock was released: no row, so a retry
+    assert response.status_code == 200 and response.json()["title"] == "Renamed"
+    assert len(attempts) == 2
+    assert stored(task["id"]).version == 3
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from jose import JWTError, jwt
+
+from app import cache
+from app.config import Settings
+from app.deps import SessionLocal
+from app.tokens import BloomFilter, ClaimsCache, RevocationList, TokenVerifier
+
+SECRET = "test-secret"
+
+
+def make_token(seconds: int = 60, **claims) -> str:
+    return jwt.encode({"sub": "1", "exp": int(time.time()) + seconds, **claims}, SECRET, algorithm="HS256")
+
+
+def test_claims_cache_evicts_least_recently_used():
+    cache = ClaimsCache(2)
+    far = time.time() + 60
+    cache.put("a", {"exp": far})
+    cache.put("b", {"exp": far})
+    assert cache.get("a", time.time()) is not None  # "b" is now least recently used
+    cache.put("c", {"exp": far})
+    assert cache.get("b", time.time()) is None
+    assert cache.get("a", time.time()) is not None and cache.get("c", time.time()) is not None
+
+
+def test_claims_cache_drops_expired_entries():
+    cache = ClaimsCache(10)
+    now = time.time()
+    cache.put("a", {"exp": now + 5})
+    assert cache.get("a", now) is not None
+    assert cache.get("a", now + 5) is None
+    assert len(cache) == 0
+
+
+def test_verifier_serves_repeat_tokens_from_cache():
+    verifier = TokenVerifier(SECRET, "HS256", cache_size=10)
+    token = make_token(jti="abc")
+    claims = verifier.verify(token)
+    assert claims["jti"] == "abc"
+    assert verifier.verify(token) is claims
+
+
+def test_verifier_rejects_bad_and_expired_tokens():
+    verifier = TokenVerifier(SECRET, "HS256", cache_size=10)
+    with pytest.raises(JWTError):
+        verifier.verify(jwt.encode({"sub": "1", "exp": int(time.time()) + 60}, "other", algorithm="HS256"))
+    with pytest.raises(JWTError):
+        verifier.verify(make_token(seconds=-1))
+    assert len(verifier.cache) == 0
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=5_000, error_rate=0.01)
+    for i in range(5_000):
+        bloom.add(f"revoked-{i}")
+    assert all(f"revoked-{i}" in bloom for i in range(5_000))
+    false_positives = sum(f"live-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+
+
+def revocation_list(redis_client=lambda: None, **settings):
+    return RevocationList(SessionLocal, Settings(jwt_revocation_sync_seconds=0, **settings), redis_client)
+
+
+def test_rebuild_forgets_expired_revocations():
+    revocations = revocation_list(jwt_revocation_rebuild_seconds=3600)
+    soon = datetime.utcnow() + timedelta(seconds=1)
+    revocations.revoke("short-lived", soon)
+    revocations.revoke("long-lived", datetime.utcnow() + timedelta(days=7))
+    assert revocations.is_revoked("short-lived") and revocations.is_revoked("long-lived")
+
+    with SessionLocal() as db:
+        assert revocations.rebuild(db) == 2
+        assert revocations.might_be_revoked("short-lived")
+        while datetime.utcnow() <= soon:
+            time.sleep(0.05)
+        assert revocations.rebuild(db) == 1
+    assert not revocations.might_be_revoked("short-lived")
+    assert revocations.is_revoked("long-lived")
+
+
+def test_filter_is_rebuilt_on_schedule(monkeypatch):
+    revocations = revocation_list(jwt_revocation_rebuild_seconds=0)
+    calls = []
+    monkeypatch.setattr(revocations, "sync", lambda db: calls.append("sync"))
+    monkeypatch.setattr(revocations, "rebuild", lambda db: calls.append("rebuild"))
+    revocations.maybe_sync()
+    assert calls == ["rebuild"]
+
+    revocations = revocation_list(jwt_revocation_rebuild_seconds=3600)
+    revocations._rebuilt_at = time.monotonic()
+    monkeypatch.setattr(revocations, "sync", lambda db: calls.append("sync"))
+    revocations.maybe_sync()
+    assert calls == ["rebuild", "sync"]
+
+
+def test_redis_bitmaps_share_recent_revocations_and_expire(monkeypatch):
+    redis = cache.get_redis()
+    writer = revocation_list(lambda: redis, jwt_revocation_rebuild_seconds=60)
+    reader = revocation_list(lambda: redis, jwt_revocation_rebuild_seconds=60)
+    monkeypatch.setattr(reader, "maybe_sync", lambda: None)  # only what Redis shares
+    generation = writer._generation() + 10  # ten windows ahead, so none ends mid-test
+    for revocations in (writer, reader):
+        monkeypatch.setattr(revocations, "_generation", lambda: generation)
+    writer.revoke("jti", datetime.utcnow() + timedelta(days=7))
+    assert reader.might_be_revoked("jti")
+
+    # Written to this window's bitmap and the next one's, each expiring with its window
+    for window in (generation, generation + 1):
+        expires_in = (window + 1) * 60 - time.time()
+        assert redis.pttl(writer._bitmap(window)) / 1000 == pytest.approx(expires_in, abs=1)
+    monkeypatch.setattr(reader, "_generation", lambda: generation + 2)
+    assert not reader.might_be_revoked("jti")  # by then every process has it from the database
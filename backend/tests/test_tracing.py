@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app import tracing
+from app.config import Settings
+from app.main import app
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """A local tracer exporting to memory (the global provider is left alone)."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("test"))
+    return exporter
+
+
+def test_disabled_tracing_is_a_no_op():
+    assert not tracing.init_tracing(Settings(tracing_enabled=False), app, [])
+    assert not tracing.enabled()
+    with tracing.span("anything", key="value") as current:
+        assert current is None
+    assert tracing.traced()(lambda: 42)() == 42
+
+
+def test_spans_and_traced_functions_nest(spans):
+    @tracing.traced()
+    def work():
+        with tracing.span("inner", **{"taskflow.count": 3}) as current:
+            current.set_attribute("taskflow.done", True)
+
+    work()
+    inner, outer = spans.get_finished_spans()
+    assert outer.name == "test_tracing.work"
+    assert inner.name == "inner" and inner.parent.span_id == outer.context.span_id
+    assert dict(inner.attributes) == {"taskflow.count": 3, "taskflow.done": True}
+
+
+def test_service_calls_are_traced(spans, client, auth_headers, create_task):
+    create_task("Traced")
+    assert client.post("/ai/prioritize-saved", headers=auth_headers).status_code == 200
+    names = [span.name for span in spans.get_finished_spans()]
+    assert "tasks.create_task" in names
+    assert {"scoring.score_saved_tasks", "ai.scan_tasks", "ai.write_scores"} <= set(names)
+    [write] = [span for span in spans.get_finished_spans() if span.name == "ai.write_scores"]
+    assert write.attributes["taskflow.task_count"] == 1
+
+
+def test_file_exporter_writes_json_lines(tmp_path, spans):
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing._exporter(Settings(tracing_exporter="file", tracing_file_path=str(path)))
+    with tracing.span("exported"):
+        pass
+    exporter.export(spans.get_finished_spans())
+    [line] = path.read_text().splitlines()
+    assert json.loads(line)["name"] == "exported"
+
+    with pytest.raises(ValueError):
+        tracing._exporter(Settings(tracing_exporter="zipkin"))
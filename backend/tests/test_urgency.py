@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.config import get_settings
+from app.deps import SessionLocal
+from app.models import Job, Task
+from app.services.ai import calculate_deadline_urgency, next_urgency_change
+from app.services import urgency
+from app.services.urgency import UrgencyChange, UrgencyIndex
+from app.worker import Worker
+
+NOW = datetime(2026, 1, 5, 12, 0, 0)
+HOUR = timedelta(hours=1)
+
+
+def test_next_urgency_change_walks_the_buckets():
+    due = NOW + 100 * HOUR
+    boundaries = []
+    at = NOW
+    while (at := next_urgency_change(due, at)) is not None:
+        boundaries.append(due - at)
+    assert boundaries == [72 * HOUR, 24 * HOUR, 6 * HOUR, HOUR, timedelta(0)]
+    assert next_urgency_change(NOW - HOUR, NOW) is None
+    assert next_urgency_change(None, NOW) is None
+
+
+def test_urgency_changes_exactly_at_boundaries():
+    due = NOW + 30 * HOUR
+    boundary = next_urgency_change(due, NOW)
+    tick = timedelta(microseconds=1)
+    assert calculate_deadline_urgency(due, boundary) == calculate_deadline_urgency(due, NOW)
+    assert calculate_deadline_urgency(due, boundary + tick) != calculate_deadline_urgency(due, NOW)
+
+
+def test_pop_due_emits_each_crossing_once_and_reschedules():
+    index = UrgencyIndex()
+    index.schedule(1, 10, NOW + 30 * HOUR, now=NOW)  # next: due - 24h, in 6h
+    index.schedule(2, 10, NOW + 2 * HOUR, now=NOW)  # next: due - 1h, in 1h
+    index.schedule(3, 11, NOW + 500 * HOUR, now=NOW)
+
+    assert index.next_fire_at() == NOW + HOUR
+    assert index.pop_due(NOW + HOUR - timedelta(seconds=1)) == []
+
+    [change] = index.pop_due(NOW + HOUR)
+    assert (change.task_id, change.user_id, change.crossed_at) == (2, 10, NOW + HOUR)
+    assert change.urgency == 0.95
+    assert index.pop_due(NOW + HOUR) == []
+    assert index.next_fire_at() == NOW + 2 * HOUR  # task 2 is now waiting for its due date
+
+    [change] = index.pop_due(NOW + 2 * HOUR)
+    assert change.task_id == 2 and change.urgency == 1.0
+    assert len(index) == 2  # overdue: nothing left to track for task 2
+
+
+def test_reschedule_and_discard_supersede_old_entries():
+    index = UrgencyIndex()
+    index.schedule(1, 10, NOW + 2 * HOUR, now=NOW)
+    index.schedule(1, 10, NOW + 200 * HOUR, now=NOW)  # due date pushed out
+    assert index.next_fire_at() == NOW + 128 * HOUR
+    assert index.pop_due(NOW + 2 * HOUR) == []
+
+    index.schedule(2, 10, NOW + 2 * HOUR, now=NOW)
+    index.discard(2)
+    assert index.pop_due(NOW + 3 * HOUR) == []
+    assert index.schedule(3, 10, NOW - HOUR, now=NOW) is None
+    assert len(index) == 1
+
+
+def test_stored_boundary_in_the_past_fires_immediately():
+    index = UrgencyIndex()
+    index.schedule(1, 10, NOW + 5 * HOUR, fire_at=NOW - timedelta(minutes=5))
+    [change] = index.pop_due(NOW)
+    assert change.urgency == 0.80
+    assert index.next_fire_at() == NOW + 4 * HOUR
+
+
+def test_dispatcher_wakes_for_an_earlier_boundary():
+    index = UrgencyIndex()
+    fired = threading.Event()
+    received = []
+    index.subscribe(lambda changes: (received.extend(changes), fired.set()))
+    index.start()
+    try:
+        now = datetime.utcnow()
+        index.schedule(1, 10, now + 500 * HOUR)  # far away: dispatcher sleeps
+        index.schedule(2, 10, now + HOUR + timedelta(milliseconds=50))  # crosses due - 1h almost at once
+        assert fired.wait(5)
+    finally:
+        index.stop()
+    assert [change.task_id for change in received] == [2]
+    assert not index.running
+
+
+def test_crossing_rescores_stored_scores_without_the_ai(create_task, fake_ai):
+    now = datetime.utcnow()
+    scored = create_task("Scored", due_at=now + 30 * HOUR, priority=3)
+    unscored = create_task("Unscored", due_at=now + 30 * HOUR)
+    with SessionLocal() as db:
+        db.execute(update(Task).where(Task.id == scored["id"]).values(ai_score=0.1))
+        db.commit()
+
+    Worker(get_settings()).urgency_changed([
+        UrgencyChange(task["id"], task["user_id"], now + 30 * HOUR, now, 0.8) for task in (scored, unscored)
+    ])
+
+    with SessionLocal() as db:
+        rows = {row.id: row for row in db.execute(select(Task.id, Task.ai_score, Task.version, Task.updated_at))}
+        assert db.scalar(select(func.count()).select_from(Job)) == 0
+    assert rows[scored["id"]].ai_score > 0.1
+    assert rows[scored["id"]].version == 1
+    assert rows[scored["id"]].updated_at > datetime.fromisoformat(scored["updated_at"])
+    assert rows[unscored["id"]].ai_score is None
+    assert fake_ai.calls == []
+
+
+def test_api_writes_reach_the_worker_index_before_its_next_tick(client, auth_headers, create_task):
+    # The API process doesn't run the index; the "worker" follows announcements
+    worker_index, stop = UrgencyIndex(), threading.Event()
+    fired = threading.Event()
+    received = []
+    worker_index.subscribe(lambda changes: (received.extend(changes), fired.set()))
+    worker_index.start()
+    follower = threading.Thread(target=urgency.follow_announcements, args=(worker_index, stop, 0.05))
+    follower.start()
+    try:
+        time.sleep(0.1)  # subscribed
+        create_task("Later", due_at=datetime.utcnow() + 30 * HOUR)  # boundary in 6h: left to load_window
+        task = create_task("Soon", due_at=datetime.utcnow() + 30 * HOUR)
+        due_at = datetime.utcnow() + HOUR + timedelta(milliseconds=300)  # crosses due - 1h in 0.3s
+        response = client.patch(f"/tasks/{task['id']}", json={"due_at": due_at.isoformat()}, headers=auth_headers)
+        assert response.status_code == 200
+        assert fired.wait(5)
+    finally:
+        stop.set()
+        follower.join()
+        worker_index.stop()
+    [change] = received
+    assert (change.task_id, change.crossed_at) == (task["id"], due_at - HOUR)
+    assert len(worker_index) == 1  # "Soon" waiting for its due date; "Later" is left to load_window
+    assert datetime.utcnow() - change.crossed_at < timedelta(seconds=5)
+
+
+def test_rolled_back_writes_are_not_announced(monkeypatch):
+    monkeypatch.setattr(urgency, "get_redis", lambda: pytest.fail("announced a rolled back write"))
+    with SessionLocal() as db:
+        db.execute(select(func.count()).select_from(Task))  # in a transaction, like sync_task
+        urgency.announce(db, 1, 1, datetime.utcnow() + HOUR, datetime.utcnow() + timedelta(seconds=5))
+        db.rollback()
+        db.execute(select(func.count()).select_from(Task))
+        db.commit()